@@ -0,0 +1,104 @@
+import time
+import random
+import logging
+from datetime import timedelta
+
+from kandilli_parser import kandilli_now
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePoller:
+    """
+    Son sismik etkinliğe göre bir sonraki Kandilli kontrolüne kadar beklenecek süreyi hesaplar.
+
+    Sakin dönemlerde `base_interval` ile yoklanır. Son `fast_window` içinde `trigger_magnitude`
+    ve üzeri bir deprem olduysa ya da `cluster_window` içinde en az `cluster_count` adet
+    `cluster_min_magnitude` üzeri deprem görüldüyse, pencere boyunca `fast_interval` kullanılır.
+    Kandilli hata verdiğinde aralık her ardışık hatada ikiye katlanır (`max_backoff` ile sınırlı);
+    devre kesici açıksa aralık en az deneme isteğine kalan süre kadardır.
+    Tüm aralıklara ±`jitter_ratio` oranında rastgele sapma eklenir.
+    """
+
+    def __init__(self, base_interval=300, fast_interval=25, fast_window=1800,
+                 trigger_magnitude=4.0, cluster_count=5, cluster_min_magnitude=2.5,
+                 cluster_window=600, jitter_ratio=0.1, max_backoff=900,
+                 clock=time.monotonic, now=kandilli_now):
+        self.base_interval = base_interval
+        self.fast_interval = fast_interval
+        self.fast_window = fast_window
+        self.trigger_magnitude = trigger_magnitude
+        self.cluster_count = cluster_count
+        self.cluster_min_magnitude = cluster_min_magnitude
+        self.cluster_window = cluster_window
+        self.jitter_ratio = jitter_ratio
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.now = now
+
+        self._fast_until = 0.0
+        self._consecutive_errors = 0
+        self._retry_at = 0.0
+        self._cluster_events = {}  # kandilli_id -> earthquake_time
+
+    @classmethod
+    def from_config(cls, config, clock=time.monotonic, now=kandilli_now):
+        return cls(
+            base_interval=config.CHECK_INTERVAL_MINUTES * 60,
+            fast_interval=config.FAST_POLL_SECONDS,
+            fast_window=config.FAST_POLL_WINDOW_MINUTES * 60,
+            trigger_magnitude=config.FAST_POLL_TRIGGER_MAGNITUDE,
+            cluster_count=config.FAST_POLL_CLUSTER_COUNT,
+            cluster_min_magnitude=config.FAST_POLL_CLUSTER_MIN_MAGNITUDE,
+            cluster_window=config.FAST_POLL_CLUSTER_WINDOW_MINUTES * 60,
+            jitter_ratio=config.POLL_JITTER_RATIO,
+            max_backoff=config.POLL_MAX_BACKOFF_SECONDS,
+            clock=clock,
+            now=now,
+        )
+
+    @property
+    def is_fast(self):
+        return self.clock() < self._fast_until
+
+    def record_success(self, earthquakes):
+        """Başarılı bir çekmede görülen (tüm büyüklüklerdeki) depremleri değerlendirir."""
+        self._consecutive_errors = 0
+
+        now = self.now()
+        was_fast = self.is_fast
+        for eq in earthquakes:
+            age = (now - eq['earthquake_time']).total_seconds()
+            if age > self.fast_window:
+                continue
+
+            if eq['magnitude'] >= self.trigger_magnitude:
+                self._extend_fast_window(self.fast_window - max(age, 0))
+            if eq['magnitude'] >= self.cluster_min_magnitude:
+                self._cluster_events[eq['kandilli_id']] = eq['earthquake_time']
+
+        # Küme penceresinin dışında kalanları at
+        cutoff = now - timedelta(seconds=self.cluster_window)
+        self._cluster_events = {k: t for k, t in self._cluster_events.items() if t >= cutoff}
+        if len(self._cluster_events) >= self.cluster_count:
+            self._extend_fast_window(self.fast_window)
+
+        if self.is_fast and not was_fast:
+            logger.info(f"Sismik etkinlik arttı, Kandilli {self.fast_interval} saniyede bir kontrol edilecek.")
+
+    def record_error(self, retry_after=0):
+        """Başarısız çekme. `retry_after` verilirse bir sonraki kontrol en erken o kadar saniye sonradır."""
+        self._consecutive_errors += 1
+        self._retry_at = self.clock() + retry_after
+
+    def _extend_fast_window(self, seconds):
+        self._fast_until = max(self._fast_until, self.clock() + seconds)
+
+    def next_delay(self):
+        """Bir sonraki kontrole kadar beklenecek süre (saniye)."""
+        interval = self.fast_interval if self.is_fast else self.base_interval
+        if self._consecutive_errors:
+            interval = min(self.max_backoff, interval * 2 ** self._consecutive_errors)
+            interval = max(interval, self._retry_at - self.clock())
+        jitter = interval * self.jitter_ratio
+        return max(1.0, interval + random.uniform(-jitter, jitter))
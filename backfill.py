@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import heapq
+import logging
+import argparse
+import itertools
+from datetime import datetime, timedelta
+
+# Kendi yazdığımız modülleri import edelim
+from kandilli_parser import iter_text_rows
+from database import EarthquakeDatabase, PostedIdCache
+from local_store import LocalEarthquakeStore
+from bot_runtime import BotRuntime, post_events
+import metrics
+from config import Config, configure_logging
+from log_pipeline import RATE_LIMITED
+
+READ_BLOCK_SIZE = 64 * 1024
+PROGRESS_EVERY = 10000  # Bu kadar satırda bir ilerleme logu yazılır
+
+
+def _read_lines(path, encoding):
+    with open(path, encoding=encoding, errors='replace') as f:
+        yield from f
+
+
+def _read_lines_reversed(path, encoding, block_size=READ_BLOCK_SIZE):
+    """Dosyanın satırlarını sondan başa doğru, sabit boyutlu bloklar halinde okuyarak üretir."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b''
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b'\n')
+            # İlk parça bir önceki bloğun devamı olabilir, bir sonraki tura kalır
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line.decode(encoding, errors='replace')
+        yield remainder.decode(encoding, errors='replace')
+
+
+def _is_newest_first(path, encoding):
+    """Dosyadaki depremlerin en yeniden eskiye (lst0.asp gibi) sıralı olup olmadığını anlar."""
+    first = None
+    for earthquake in itertools.islice(iter_text_rows(_read_lines(path, encoding)), 100):
+        if first is None:
+            first = earthquake['earthquake_time']
+        elif earthquake['earthquake_time'] != first:
+            return earthquake['earthquake_time'] < first
+    return False
+
+
+def iter_file_rows(path, chronological=False, encoding='utf-8'):
+    """
+    Kaydedilmiş bir lst0 sayfasındaki ya da aynı sütun düzenindeki katalog dosyasındaki depremleri
+    satır satır üretir. `chronological=True` ise en yeniden eskiye sıralı dosyalar sondan başa
+    okunur, böylece depremler eskiden yeniye sıralı gelir ve dosya belleğe alınmaz.
+    """
+    if chronological and _is_newest_first(path, encoding):
+        return iter_text_rows(_read_lines_reversed(path, encoding))
+    return iter_text_rows(_read_lines(path, encoding))
+
+
+def iter_catalog(paths, chronological=False, since=None, until=None, encoding='utf-8'):
+    """
+    Birden fazla dosyadaki depremleri tek akış olarak üretir. `chronological=True` ise dosyalar
+    zamana göre birleştirilir ve üst üste binen anlık görüntülerdeki aynı satırlar bir kez döner.
+    `since`/`until` ile zaman aralığı sınırlanabilir.
+    """
+    streams = [iter_file_rows(path, chronological, encoding) for path in paths]
+    if not chronological:
+        earthquakes = itertools.chain.from_iterable(streams)
+    else:
+        earthquakes = _drop_repeats(heapq.merge(*streams, key=lambda eq: eq['earthquake_time']))
+
+    for earthquake in earthquakes:
+        earthquake_time = earthquake['earthquake_time']
+        if since is not None and earthquake_time < since:
+            continue
+        if until is not None and earthquake_time > until:
+            if chronological:
+                return
+            continue
+        yield earthquake
+
+
+def _drop_repeats(earthquakes):
+    # Sıralı akışta aynı deprem sadece aynı saniyedeki satırlar arasında tekrar edebilir
+    current_time, seen = None, set()
+    for earthquake in earthquakes:
+        if earthquake['earthquake_time'] != current_time:
+            current_time, seen = earthquake['earthquake_time'], set()
+        if earthquake['kandilli_id'] in seen:
+            continue
+        seen.add(earthquake['kandilli_id'])
+        yield earthquake
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest(db, earthquakes, batch_size=Config.BACKFILL_BATCH_SIZE, min_magnitude=None):
+    """
+    Depremleri `batch_size` büyüklüğünde gruplar halinde veritabanına paylaşılmadı olarak yazar.
+    Veritabanında zaten olan kayıtlara dokunulmaz. (okunan, gönderilen) sayılarını döndürür.
+    """
+    read = written = 0
+    next_progress = PROGRESS_EVERY
+    for batch in _batched(earthquakes, batch_size):
+        read += len(batch)
+        if min_magnitude is not None:
+            batch = [eq for eq in batch if eq['magnitude'] >= min_magnitude]
+        written += db.save_earthquakes_bulk(batch)
+        if read >= next_progress:
+            logging.info(f"Geçmiş verisi: {read} deprem okundu, {written} kayıt gönderildi.")
+            next_progress += PROGRESS_EVERY
+    return read, written
+
+
+class ReplayClock:
+    """
+    Yeniden oynatmada kullanılan sanal saat. `speed` 0 ise zaman hiç beklemeden ilerler,
+    aksi halde sanal zamandaki her ilerleme gerçek zamanda `speed` kat hızlı beklenir.
+    """
+
+    def __init__(self, start: datetime, speed: float = 0):
+        self.start = start
+        self.current = start
+        self.speed = speed
+
+    def monotonic(self) -> float:
+        return (self.current - self.start).total_seconds()
+
+    def now(self) -> datetime:
+        return self.current
+
+    def advance_to(self, when: datetime):
+        if when <= self.current:
+            return
+        if self.speed > 0:
+            time.sleep((when - self.current).total_seconds() / self.speed)
+        self.current = when
+
+
+class ReplayScraper:
+    """Yeniden oynatmada Kandilli yerine, o kontrole kadar "yayınlanmış" depremleri döndürür."""
+
+    last_fetch_ok = True
+
+    def __init__(self):
+        self.batch = []
+
+    def get_new_earthquakes(self):
+        batch, self.batch = self.batch, []
+        return batch
+
+    get_latest_earthquakes = get_new_earthquakes
+
+
+def replay_config(base=Config):
+    """
+    Yeniden oynatmada diske, Supabase'e ve metrik sunucusuna dokunmayan bir Config alt sınıfı.
+    Aşamalar bellekte çalıştığı için süre sınırları (ve her çağrı için açılan iş parçacıkları) kapatılır.
+    """
+    return type('ReplayConfig', (base,), {
+        'SUPABASE_URL': None,
+        'SUPABASE_ANON_KEY': None,
+        'LOCAL_DB_PATH': ':memory:',
+        'POSTED_CACHE_PATH': '',
+        'OUTBOX_PATH': '',
+        'METRICS_PORT': 0,
+        'KANDILLI_INCREMENTAL': True,
+        'DEADLINE_FETCH_SECONDS': 0,
+        'DEADLINE_DB_LOOKUP_SECONDS': 0,
+        'DEADLINE_RENDER_SECONDS': 0,
+        'DEADLINE_UPLOAD_SECONDS': 0,
+        'DEADLINE_DB_SAVE_SECONDS': 0,
+    })
+
+
+def replay(earthquakes, config=Config, speed=0):
+    """
+    Eskiden yeniye sıralı depremleri, gerçek paylaşım yapmadan tekrar kontrolü, zamanlayıcı,
+    hız sınırı ve artçı fırtınası mantığından sanal zamanda geçirir. Kandilli kontrolleri
+    AdaptivePoller'ın belirlediği aralıklarla yapılır; her kontrolde o ana kadar gerçekleşmiş
+    depremler "yayınlanmış" sayılır. Paylaşımlar yerine sonuç özeti döndürülür.
+    """
+    earthquakes = iter(earthquakes)
+    upcoming = next(earthquakes, None)
+    summary = {
+        'events_read': 0, 'polls': 0, 'posts': 0, 'albums': 0, 'events_posted': 0,
+        'dropped': 0, 'revisions_skipped': 0, 'max_backlog': 0,
+        'delay_mean_seconds': None, 'delay_max_seconds': None,
+        'virtual_seconds': 0.0, 'wall_seconds': 0.0,
+    }
+    if upcoming is None:
+        return summary
+
+    config = replay_config(config)
+    clock = ReplayClock(upcoming['earthquake_time'], speed)
+    runtime = BotRuntime(config, clock=clock.monotonic, now=clock.now)
+    scraper = runtime._scraper = ReplayScraper()
+    runtime._db = EarthquakeDatabase(
+        url=None, key=None, posted_cache=runtime.posted_cache, local_store=LocalEarthquakeStore(':memory:')
+    )
+
+    revisions_before = metrics.DUPLICATES_SKIPPED.value(reason='revision')
+    delay_total = 0.0
+    started = time.perf_counter()
+
+    while upcoming is not None or len(runtime.scheduler) or (runtime.swarm is not None and len(runtime.swarm)):
+        delay = timedelta(seconds=runtime.poller.next_delay())
+        poll_at = clock.current + delay
+        idle = not (runtime._pending or len(runtime.scheduler) or (runtime.swarm is not None and len(runtime.swarm)))
+        if idle and upcoming is not None and upcoming['earthquake_time'] > poll_at:
+            # Bekleyen iş yokken boş kontrolleri atla: depremden sonraki ilk kontrol zamanına geç
+            poll_at = clock.current + delay * -(-(upcoming['earthquake_time'] - clock.current) // delay)
+        while upcoming is not None and upcoming['earthquake_time'] <= poll_at:
+            scraper.batch.append(upcoming)
+            summary['events_read'] += 1
+            upcoming = next(earthquakes, None)
+        clock.advance_to(poll_at)
+        summary['polls'] += 1
+
+        runtime.enqueue(runtime.collect_new_earthquakes())
+        summary['dropped'] += len(runtime.skip_dropped())
+        summary['max_backlog'] = max(summary['max_backlog'], len(runtime.scheduler))
+
+        while len(runtime.scheduler) and runtime.rate_limiter.try_consume():
+            earthquake = runtime.next_post()
+            if earthquake is None:
+                break
+            events = post_events(earthquake)
+            runtime.commit(earthquake)
+            summary['posts'] += 1
+            summary['albums'] += bool(earthquake.get('swarm_events'))
+            summary['events_posted'] += len(events)
+            for event in events:
+                delay = (clock.current - event['earthquake_time']).total_seconds()
+                delay_total += delay
+                summary['delay_max_seconds'] = max(summary['delay_max_seconds'] or 0.0, delay)
+            logging.info(
+                "[%s] Paylaşım: M%s %s (%d deprem)", clock.current,
+                earthquake['magnitude'], earthquake['location'], len(events), extra=RATE_LIMITED,
+            )
+
+    if summary['events_posted']:
+        summary['delay_mean_seconds'] = delay_total / summary['events_posted']
+    summary['revisions_skipped'] = metrics.DUPLICATES_SKIPPED.value(reason='revision') - revisions_before
+    summary['virtual_seconds'] = clock.monotonic()
+    summary['wall_seconds'] = time.perf_counter() - started
+    return summary
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Geçersiz zaman (YYYY-MM-DD[THH:MM:SS] bekleniyor): {value}")
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Kandilli geçmiş verisini veritabanına yükler ya da geçmiş günleri paylaşmadan yeniden oynatır."
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', help="lst0 düzenindeki kayıtlı sayfa ya da katalog dosyaları")
+    common.add_argument('--since', type=_parse_time, help="Bu zamandan önceki depremleri atla (Kandilli saatiyle)")
+    common.add_argument('--until', type=_parse_time, help="Bu zamandan sonraki depremleri atla (Kandilli saatiyle)")
+    common.add_argument('--encoding', default='utf-8', help="Dosya karakter kodlaması (varsayılan utf-8)")
+
+    ingest_parser = subparsers.add_parser('ingest', parents=[common], help="Depremleri toplu olarak veritabanına yaz")
+    ingest_parser.add_argument('--batch-size', type=int, default=Config.BACKFILL_BATCH_SIZE)
+    ingest_parser.add_argument('--min-magnitude', type=float, help="Sadece bu büyüklük ve üzerini yaz")
+
+    replay_parser = subparsers.add_parser('replay', parents=[common], help="Depremleri paylaşmadan sanal zamanda yeniden oynat")
+    replay_parser.add_argument('--speed', type=float, default=0,
+                               help="Gerçek zamana göre hız katı (0: beklemeden, varsayılan)")
+    replay_parser.add_argument('--json', action='store_true', help="Özeti JSON olarak yazdır")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        local_store = LocalEarthquakeStore(Config.LOCAL_DB_PATH) if Config.LOCAL_DB_PATH else None
+        try:
+            db = EarthquakeDatabase(
+                Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY, posted_cache=PostedIdCache(), local_store=local_store
+            )
+        except (ValueError, ImportError) as e:
+            logging.error(f"Veritabanına bağlanılamadı: {e}")
+            return 1
+        earthquakes = iter_catalog(args.paths, since=args.since, until=args.until, encoding=args.encoding)
+        read, written = ingest(db, earthquakes, args.batch_size, args.min_magnitude)
+        logging.info(f"Geçmiş verisi yüklendi: {read} deprem okundu, {written} kayıt gönderildi.")
+        return 0
+
+    earthquakes = iter_catalog(args.paths, chronological=True, since=args.since, until=args.until, encoding=args.encoding)
+    summary = replay(earthquakes, Config, args.speed)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print(f"{key:>20}: {value:.1f}" if isinstance(value, float) else f"{key:>20}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    configure_logging()
+    sys.exit(main())
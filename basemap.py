@@ -0,0 +1,223 @@
+import os
+import json
+import math
+import mmap
+import logging
+import threading
+
+from PIL import Image, ImageDraw
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASEMAP_PATH = os.path.join(BASE_DIR, "basemap", "turkey_basemap.raw")
+
+# Raster hücre değerleri (renkler çizimde tablo ile verilir)
+SEA, LAND, TURKEY, BORDER = 0, 1, 2, 3
+PALETTE = {
+    SEA: (214, 230, 242),
+    LAND: (236, 236, 232),
+    TURKEY: (250, 247, 238),
+    BORDER: (150, 150, 150),
+}
+MARKER_COLOR = (200, 0, 0)
+FRAME_COLOR = (100, 100, 100)
+
+# Harita sınırları (derece) ve çözünürlük: eş dikdörtgen izdüşüm, boylam ölçeği orta enlemin kosinüsüyle
+LON_MIN, LON_MAX = 25.0, 45.5
+LAT_MIN, LAT_MAX = 34.5, 42.5
+PIXELS_PER_DEGREE = 48
+
+# Elle sayısallaştırılmış, sadeleştirilmiş kıyı ve sınır çizgileri (boylam, enlem).
+# Harita küçük bir konum göstergesi içindir; ölçüm amaçlı kullanılmamalıdır.
+ANATOLIA_COAST = [
+    # Karadeniz (İstanbul Boğazı'ndan Sarp'a)
+    (29.10, 41.20), (29.60, 41.17), (30.70, 41.10), (31.40, 41.28), (31.80, 41.45), (32.40, 41.75),
+    (33.00, 41.90), (33.75, 41.98), (35.15, 42.02), (35.95, 41.72), (36.33, 41.29), (37.28, 41.13),
+    (37.88, 40.98), (38.39, 40.92), (39.72, 41.00), (40.52, 41.02), (41.43, 41.39), (41.55, 41.52),
+]
+EASTERN_BORDER = [
+    # Gürcistan, Ermenistan, Nahçıvan, İran, Irak ve Suriye sınırları (Sarp'tan Hatay'a)
+    (41.55, 41.52), (42.00, 41.50), (42.80, 41.58), (43.45, 41.10), (43.60, 40.90), (43.75, 40.60),
+    (43.60, 40.45), (44.00, 40.15), (44.77, 39.70), (44.40, 39.40), (44.05, 39.00), (44.30, 38.40),
+    (44.45, 37.95), (44.75, 37.35), (44.80, 37.15), (44.20, 37.25), (43.50, 37.25), (42.80, 37.35),
+    (42.35, 37.10), (41.20, 37.07), (40.00, 36.80), (39.20, 36.68), (38.20, 36.90), (37.10, 36.65),
+    (36.70, 36.83), (36.60, 36.50), (36.40, 36.20), (36.15, 35.95), (35.92, 35.92),
+]
+SOUTHERN_COAST = [
+    # Akdeniz ve Ege (Hatay'dan Çanakkale'ye)
+    (35.92, 35.92), (35.97, 36.08), (35.88, 36.40), (36.17, 36.60), (35.78, 36.77), (35.38, 36.56),
+    (34.63, 36.78), (34.30, 36.60), (33.93, 36.38), (32.80, 36.02), (32.00, 36.54), (31.45, 36.75),
+    (30.70, 36.88), (30.57, 36.60), (30.40, 36.20), (29.64, 36.20), (29.10, 36.65), (28.80, 36.70),
+    (28.27, 36.85), (27.40, 36.70), (27.40, 37.03), (27.60, 37.24), (27.25, 37.37), (27.26, 37.86),
+    (26.30, 38.30), (26.45, 38.65), (26.75, 38.72), (26.90, 39.07), (26.70, 39.32), (27.00, 39.57),
+    (26.07, 39.48), (26.18, 39.98), (26.40, 40.15),
+]
+MARMARA_SOUTH_COAST = [
+    (26.70, 40.35), (27.00, 40.40), (27.97, 40.35), (28.88, 40.38), (29.10, 40.43), (29.90, 40.73),
+    (29.40, 40.80), (29.30, 40.82), (29.02, 40.99), (29.06, 41.10),
+]
+THRACE_COAST = [
+    # İstanbul'dan Bulgaristan sınırına Karadeniz, ardından Marmara ve Saros kıyıları
+    (29.00, 41.00), (29.07, 41.22), (28.67, 41.35), (28.08, 41.63), (27.98, 41.87), (28.02, 41.97),
+]
+WESTERN_BORDER = [
+    # Bulgaristan ve Yunanistan (Meriç) sınırları
+    (28.02, 41.97), (27.55, 41.95), (27.10, 42.08), (26.55, 41.85), (26.35, 41.72), (26.60, 41.35),
+    (26.35, 41.00), (26.03, 40.73),
+]
+THRACE_SOUTH_COAST = [
+    (26.03, 40.73), (26.08, 40.72), (26.60, 40.60), (26.20, 40.05), (26.40, 40.20), (26.68, 40.42),
+    (27.10, 40.60), (27.50, 40.97), (28.25, 41.07), (28.60, 41.00), (28.87, 40.97), (29.00, 41.00),
+]
+NEIGHBOR_COASTS = {
+    # Bulgaristan ve Yunanistan kıyıları (harita kenarına kadar)
+    'north_west': [(28.02, 41.97), (27.90, 42.50)],
+    'greece': [(25.00, 40.85), (25.50, 40.90), (26.03, 40.73)],
+    # Gürcistan ve Suriye kıyıları
+    'georgia': [(41.55, 41.52), (41.65, 42.00), (41.50, 42.50)],
+    'syria': [(35.92, 35.92), (35.80, 35.50), (35.90, 34.50)],
+}
+ISLANDS = [
+    [(32.27, 35.10), (32.90, 35.40), (33.60, 35.37), (34.58, 35.69), (34.00, 35.00), (33.00, 34.60), (32.40, 34.75)],  # Kıbrıs
+    [(25.85, 39.25), (26.15, 39.38), (26.60, 39.30), (26.45, 39.00), (26.00, 39.05)],  # Midilli
+    [(25.85, 38.60), (26.15, 38.55), (26.10, 38.20), (25.90, 38.25)],  # Sakız
+    [(26.55, 37.80), (27.05, 37.75), (26.95, 37.65), (26.60, 37.68)],  # Sisam
+    [(27.70, 36.45), (28.25, 36.45), (28.10, 36.10), (27.75, 36.10)],  # Rodos
+]
+LAKES = [
+    [(42.30, 38.90), (43.00, 38.95), (43.30, 38.60), (42.95, 38.35), (42.50, 38.45)],  # Van Gölü
+    [(33.20, 38.95), (33.50, 38.85), (33.55, 38.60), (33.30, 38.70)],  # Tuz Gölü
+]
+
+
+def _header_path(raster_path):
+    return os.path.splitext(raster_path)[0] + '.json'
+
+
+def build_basemap(output_path=BASEMAP_PATH, pixels_per_degree=PIXELS_PER_DEGREE):
+    """
+    Haritayı çizer ve tek baytlık hücre değerleri olarak ham (sıkıştırılmamış) dosyaya yazar;
+    boyut ve dönüşüm bilgileri yanındaki JSON dosyasına yazılır. Çalışma anında dosya
+    belleğe eşlenir (mmap) ve sadece gereken bölge okunur.
+    """
+    lon_scale = pixels_per_degree * math.cos(math.radians((LAT_MIN + LAT_MAX) / 2))
+    transform = (LON_MIN, lon_scale, LAT_MAX, pixels_per_degree)
+    width = int(round((LON_MAX - LON_MIN) * lon_scale))
+    height = int(round((LAT_MAX - LAT_MIN) * pixels_per_degree))
+
+    def project(points):
+        return [((lon - LON_MIN) * lon_scale, (LAT_MAX - lat) * pixels_per_degree) for lon, lat in points]
+
+    image = Image.new('L', (width, height), SEA)
+    draw = ImageDraw.Draw(image)
+
+    # Komşu ülkeler: Türkiye sınırı ile harita kenarı arasında kalan kara parçaları
+    north_west = (
+        NEIGHBOR_COASTS['north_west'] + [(LON_MIN, LAT_MAX)] + NEIGHBOR_COASTS['greece'] + WESTERN_BORDER[::-1]
+    )
+    east = (
+        NEIGHBOR_COASTS['georgia'] + [(LON_MAX, LAT_MAX), (LON_MAX, LAT_MIN)]
+        + NEIGHBOR_COASTS['syria'][::-1] + EASTERN_BORDER[::-1]
+    )
+    for polygon in (north_west, east):
+        draw.polygon(project(polygon), fill=LAND)
+
+    anatolia = ANATOLIA_COAST + EASTERN_BORDER[1:] + SOUTHERN_COAST[1:] + MARMARA_SOUTH_COAST
+    thrace = THRACE_COAST + WESTERN_BORDER[1:] + THRACE_SOUTH_COAST[1:]
+    for polygon in (anatolia, thrace):
+        draw.polygon(project(polygon), fill=TURKEY)
+    for polygon in ISLANDS:
+        draw.polygon(project(polygon), fill=LAND)
+    for polygon in LAKES:
+        draw.polygon(project(polygon), fill=SEA)
+
+    for border in (EASTERN_BORDER, WESTERN_BORDER):
+        draw.line(project(border), fill=BORDER, width=1)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(image.tobytes())
+    with open(_header_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump({'width': width, 'height': height, 'transform': transform}, f)
+    return output_path
+
+
+class Basemap:
+    """
+    Önceden çizilmiş, belleğe eşlenen (mmap) harita. Dosya açılışta okunmaz; deprem başına
+    sadece merkez üssü çevresindeki küçük bölge kırpılır ve renk tablosundan geçirilir,
+    bu yüzden harita eklemek görsel başına birkaç milisaniyedir.
+
+    `transform` (boylam0, boylam başına piksel, enlem0, enlem başına piksel) ile
+    enlem/boylam doğrudan piksele çevrilir.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path=BASEMAP_PATH):
+        with open(_header_path(path), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        self.width = header['width']
+        self.height = header['height']
+        self.lon0, self.lon_scale, self.lat0, self.lat_scale = header['transform']
+
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Pikseller kopyalanmaz, görsel doğrudan eşlenmiş belleği okur
+        self.raster = Image.frombuffer('L', (self.width, self.height), self._map, 'raw', 'L', 0, 1)
+        self._luts = [[PALETTE.get(value, PALETTE[SEA])[channel] for value in range(256)] for channel in range(3)]
+
+    @classmethod
+    def shared(cls, path=BASEMAP_PATH):
+        """Yol başına bir kez açılan haritayı döndürür; dosya yoksa ya da okunamazsa None."""
+        with cls._lock:
+            if path not in cls._instances:
+                try:
+                    cls._instances[path] = cls(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logging.warning(f"Harita dosyası '{path}' açılamadı, görsellerde harita olmayacak: {e}")
+                    cls._instances[path] = None
+            return cls._instances[path]
+
+    def to_pixel(self, latitude, longitude):
+        return (longitude - self.lon0) * self.lon_scale, (self.lat0 - latitude) * self.lat_scale
+
+    def inset(self, latitude, longitude, size, zoom=1):
+        """
+        Merkez üssünü ortalayan (harita kenarında kaydırılan) `size` boyutunda renkli bir harita
+        parçası döndürür. `zoom` > 1 ise daha küçük bir bölge büyütülür. Merkez üssü harita
+        dışındaysa None döner.
+        """
+        x, y = self.to_pixel(latitude, longitude)
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+
+        width, height = size
+        crop_width = min(self.width, int(width / zoom))
+        crop_height = min(self.height, int(height / zoom))
+        left = int(min(max(x - crop_width / 2, 0), self.width - crop_width))
+        top = int(min(max(y - crop_height / 2, 0), self.height - crop_height))
+
+        cells = self.raster.crop((left, top, left + crop_width, top + crop_height))
+        if cells.size != (width, height):
+            cells = cells.resize((width, height), Image.NEAREST)
+        image = Image.merge('RGB', [cells.point(lut) for lut in self._luts])
+
+        draw = ImageDraw.Draw(image)
+        scale_x, scale_y = width / crop_width, height / crop_height
+        marker_x, marker_y = (x - left) * scale_x, (y - top) * scale_y
+        for radius, fill in ((14, None), (7, MARKER_COLOR)):
+            draw.ellipse(
+                (marker_x - radius, marker_y - radius, marker_x + radius, marker_y + radius),
+                outline=MARKER_COLOR, fill=fill, width=3,
+            )
+        draw.rectangle((0, 0, width - 1, height - 1), outline=FRAME_COLOR, width=2)
+        return image
+
+
+if __name__ == "__main__":
+    from config import configure_logging
+
+    configure_logging()
+    path = build_basemap()
+    logging.info(f"Harita oluşturuldu: {path}")
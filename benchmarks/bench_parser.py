@@ -0,0 +1,86 @@
+"""
+Kandilli liste parser'ı için mikro benchmark.
+
+fixtures/kandilli altındaki örnek lst0.asp sayfaları üzerinde eski yol (BeautifulSoup + KandilliScraper.parse_earthquake_line)
+ile sabit sütunlu kandilli_parser.parse_listing'i karşılaştırır ve saniyedeki satır sayısını yazar.
+
+Kullanım (eski yol için `pip install -r requirements-dev.txt`):
+    python benchmarks/bench_parser.py [--repeat 20] [sayfa.html ...]
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from kandilli_parser import parse_listing
+from kandilli_scraper import KandilliScraper
+
+FIXTURE_DIR = os.path.join(ROOT_DIR, 'fixtures', 'kandilli')
+
+
+def legacy_parse(scraper, page_html):
+    """Değişiklikten önceki get_latest_earthquakes parse yolu."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_html, 'html.parser')
+    pre_tag = soup.find('pre')
+    lines = pre_tag.text.strip().split('\n')
+    earthquakes = []
+    for line in lines[7:]:
+        earthquake = scraper.parse_earthquake_line(line)
+        if earthquake:
+            earthquakes.append(earthquake)
+    return earthquakes
+
+
+def measure(func, page_html, repeat):
+    rows = len(func(page_html))  # Isınma turu
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(page_html)
+    elapsed = time.perf_counter() - start
+    return rows, elapsed / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kandilli parser benchmark'ı")
+    parser.add_argument('pages', nargs='*', help="lst0.asp sayfaları (varsayılan: fixtures/kandilli/*.html)")
+    parser.add_argument('--repeat', type=int, default=20, help="Her ölçüm için tekrar sayısı")
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(
+        os.path.join(FIXTURE_DIR, name) for name in os.listdir(FIXTURE_DIR) if name.endswith('.html')
+    )
+    scraper = KandilliScraper()
+
+    for path in pages:
+        with open(path, 'r', encoding='utf-8') as f:
+            page_html = f.read()
+
+        print(f"\n--- {os.path.basename(path)} ---")
+        new_rows, new_time = measure(parse_listing, page_html, args.repeat)
+        print(f"Sabit sütunlu parser : {new_rows:5d} satır, {new_time * 1000:8.2f} ms/sayfa, {new_rows / new_time:12,.0f} satır/sn")
+
+        try:
+            old_rows, old_time = measure(lambda p: legacy_parse(scraper, p), page_html, args.repeat)
+        except ImportError:
+            print("Eski parser ölçülemedi: 'beautifulsoup4' kurulu değil.")
+            continue
+        print(f"Eski parser (bs4)    : {old_rows:5d} satır, {old_time * 1000:8.2f} ms/sayfa, {old_rows / old_time:12,.0f} satır/sn")
+        print(f"Hızlanma             : {old_time / new_time:.1f}x")
+
+        # İki parser'ın farklı büyüklük okuduğu satırlar (0 olmalı; büyüklük kandilli_id'ye girer)
+        old_by_time = {(eq['earthquake_time'], eq['latitude'], eq['longitude']): eq for eq in legacy_parse(scraper, page_html)}
+        mismatched = sum(
+            1 for eq in parse_listing(page_html)
+            if (eq['earthquake_time'], eq['latitude'], eq['longitude']) in old_by_time
+            and old_by_time[(eq['earthquake_time'], eq['latitude'], eq['longitude'])]['magnitude'] != eq['magnitude']
+        )
+        print(f"Büyüklüğü farklı okunan satır: {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Görsel oluşturma için mikro benchmark.
+
+Eski yol (her çağrıda font/ikon yükleyip sabit dosyaya yazan create_earthquake_image)
+ile şablonu önbelleğe alan EarthquakeImageRenderer'ı karşılaştırır.
+
+Kullanım:
+    python benchmarks/bench_render.py [--repeat 30]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from PIL import Image, ImageDraw, ImageFont
+
+from image_renderer import EarthquakeImageRenderer, FONT_PATH, ICON_PATH
+
+SAMPLE_EARTHQUAKE = {
+    'magnitude': 4.2,
+    'location': 'İZMİR AÇIKLARI (EGE DENİZİ)',
+    'depth': 8.5,
+    'earthquake_time': datetime(2024, 8, 20, 14, 30, 15),
+}
+
+
+def legacy_render(earthquake_data, output_path):
+    """Değişiklikten önceki InstagramPoster.create_earthquake_image akışı."""
+    width, height = 1080, 1080
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    font_large = ImageFont.truetype(FONT_PATH, size=90)
+    font_medium = ImageFont.truetype(FONT_PATH, size=60)
+    font_footer = ImageFont.truetype(FONT_PATH, size=30)
+
+    warning_icon = Image.open(ICON_PATH).convert("RGBA").resize((100, 100))
+    image.paste(warning_icon, (int((width - warning_icon.width) / 2), 200), warning_icon)
+
+    magnitude_text = f"M {earthquake_data['magnitude']}"
+    mag_bbox = draw.textbbox((0, 0), magnitude_text, font=font_large)
+    draw.text(((width - (mag_bbox[2] - mag_bbox[0])) / 2, 450), magnitude_text, font=font_large, fill=(200, 0, 0))
+
+    location_text = earthquake_data['location'].upper()
+    loc_bbox = draw.textbbox((0, 0), location_text, font=font_medium)
+    draw.text(((width - (loc_bbox[2] - loc_bbox[0])) / 2, 350), location_text, font=font_medium, fill=(0, 0, 0))
+
+    date_str = earthquake_data['earthquake_time'].strftime('%d.%m.%Y %H:%M:%S')
+    draw.text((150, 650), f"Derinlik: {earthquake_data['depth']} km", font=font_medium, fill=(0, 0, 0))
+    draw.text((150, 750), f"Tarih: {date_str}", font=font_medium, fill=(0, 0, 0))
+
+    footer_text = "Kaynak: Kandilli Rasathanesi"
+    footer_bbox = draw.textbbox((0, 0), footer_text, font=font_footer)
+    draw.text(((width - (footer_bbox[2] - footer_bbox[0])) / 2, 980), footer_text, font=font_footer, fill=(100, 100, 100))
+
+    image.save(output_path)
+    return output_path
+
+
+def measure(func, repeat):
+    func()  # Isınma turu
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Görsel oluşturma benchmark'ı")
+    parser.add_argument('--repeat', type=int, default=30, help="Her ölçüm için tekrar sayısı")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, "earthquake_post.jpg")
+        old_p50, old_p95 = measure(lambda: legacy_render(SAMPLE_EARTHQUAKE, legacy_path), args.repeat)
+
+        start = time.perf_counter()
+        renderer = EarthquakeImageRenderer()
+        setup_time = time.perf_counter() - start
+
+        new_p50, new_p95 = measure(lambda: renderer.render_jpeg(SAMPLE_EARTHQUAKE), args.repeat)
+        file_p50, file_p95 = measure(lambda: os.remove(renderer.render_to_file(SAMPLE_EARTHQUAKE)), args.repeat)
+
+    print(f"Eski create_earthquake_image  : p50 {old_p50 * 1000:7.2f} ms, p95 {old_p95 * 1000:7.2f} ms")
+    print(f"Şablonlu çizici (bellek)      : p50 {new_p50 * 1000:7.2f} ms, p95 {new_p95 * 1000:7.2f} ms")
+    print(f"Şablonlu çizici (geçici dosya): p50 {file_p50 * 1000:7.2f} ms, p95 {file_p95 * 1000:7.2f} ms")
+    print(f"Şablon hazırlama (bir kez)    : {setup_time * 1000:7.2f} ms")
+    print(f"Hızlanma (p50)                : {old_p50 / new_p50:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
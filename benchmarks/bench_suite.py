@@ -0,0 +1,933 @@
+"""
+Çevrimdışı benchmark ve yük testi paketi.
+
+Senaryolar:
+    parse      Kandilli sayfasını parse etme
+    render     görsel çizme
+    dedup      tekrar kontrolü
+    gazetteer  en yakın yerleşim araması
+    fetch      hatalı/yavaş kaynaktan çekme
+    e2e        tam döngü (Kandilli → veritabanı → Instagram)
+    fanout     ek kanallara (webhook, Telegram) eşzamanlı gönderim
+    failover   çok örnekli çalışmada lider devri ve talep çakışması
+    watchdog   asılı kalan servislerde aşama süre sınırları ve bekçi
+    profile    döngü profillemenin maliyeti
+    logging    fırtına yeniden oynatmasında log hacmi ve loglamanın maliyeti
+    backfill   geçmiş verisi yükleme/yeniden oynatma için verim ve gecikme
+    startup    komutların açılışı için import süresi (`python -X importtime`)
+
+Canlı servisler yerine benchmarks/fakes.py'deki sahte Kandilli sunucusu,
+bellekteki Supabase tablosu ve sahte instagrapi istemcisi kullanılır.
+
+Senaryolar "gerçekçi" (elle hazırlanmış sakin gün örnek sayfası) ve "fırtına" (tek sayfada 1000 yeni deprem)
+yükleriyle çalışır. `--json` ile sonuçlar kaydedilir; `--baseline` ile önceki sonuçla
+karşılaştırılır ve verim `--max-regression` oranından fazla düşerse çıkış kodu 1 olur.
+
+Kullanım:
+    python benchmarks/bench_suite.py [--only parse,render,dedup,gazetteer,fetch,e2e,fanout,failover,watchdog,profile,logging,backfill,startup] [--swarm-size 1000]
+        [--upload-latency 0.0] [--supabase-latency 0.0] [--kandilli-latency 0.0]
+        [--json sonuc.json] [--baseline onceki.json] [--max-regression 0.2] [--profile-dir profiles]
+
+Yavaş bir fırtına döngüsünü yerelde incelemek için: `--only profile --profile-dir profiles` profil
+dosyalarını (.collapsed, .prof, .spans.json) saklar.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import (  # noqa: E402  (fakes, ROOT_DIR'i sys.path'e ekler)
+    ROOT_DIR, FakeKandilliServer, FakeSinkServer, FakeInstagramClient, InMemorySupabase,
+    build_offline_runtime, load_fixture, offline_config, synthetic_earthquakes, build_page,
+)
+
+SCENARIOS = ('parse', 'render', 'dedup', 'gazetteer', 'fetch', 'e2e', 'fanout', 'failover', 'watchdog', 'profile', 'logging', 'backfill', 'startup')
+
+# main.py komutlarının açılışta import ettiği modüller (komut fonksiyonlarındaki import'lar)
+STARTUP_COMMANDS = {
+    'run': ('main', 'bot_runtime', 'metrics', 'asyncio', 'pipeline'),
+    'check-source': ('main', 'kandilli_scraper', 'gazetteer'),
+    'render-preview': ('main', 'image_renderer', 'gazetteer'),
+    'backfill': ('main', 'backfill'),
+}
+# Açılışı yavaşlatan üçüncü parti paketler; hangi komutun hangisini yüklediği raporlanır
+HEAVY_PACKAGES = ('instagrapi', 'supabase', 'PIL', 'requests', 'bs4', 'asyncio')
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples, items_per_sample=1):
+    """Süre örneklerinden (saniye) gecikme yüzdelikleri ve verim hesaplar."""
+    total = sum(samples)
+    return {
+        'samples': len(samples),
+        'p50_ms': percentile(samples, 0.5) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'ops_per_sec': (len(samples) * items_per_sample) / total if total else 0.0,
+    }
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_parse(pages, repeat):
+    from kandilli_parser import parse_listing
+
+    results = {}
+    for name, page_html in pages.items():
+        rows = len(parse_listing(page_html))  # Isınma turu
+        results[f'parse/{name}'] = dict(summarize(timed(lambda: parse_listing(page_html), repeat), rows), rows=rows)
+    return results
+
+
+def bench_render(earthquakes, repeat):
+    from image_renderer import EarthquakeImageRenderer
+
+    renderer = EarthquakeImageRenderer()
+    sample = earthquakes[:repeat]
+    renderer.render_jpeg(sample[0])  # Isınma turu
+    iterator = iter(sample)
+    results = {'render/jpeg': summarize(timed(lambda: renderer.render_jpeg(next(iterator)), len(sample)))}
+
+    # Akış + hikaye + önizleme tek geçişte, paralel kodlamayla
+    renderer.render_variants(sample[0])
+    iterator = iter(sample)
+    results['render/variants'] = summarize(timed(lambda: renderer.render_variants(next(iterator)), len(sample)))
+    return results
+
+
+def bench_dedup(earthquakes, repeat):
+    from database import EarthquakeDatabase, PostedIdCache
+    from dedup_index import SpatioTemporalIndex
+
+    results = {}
+
+    # Yarısı daha önce paylaşılmış bir sayfanın ID'lerini soğuk önbellekle tek sorguda çöz
+    supabase = InMemorySupabase()
+    table = supabase.table('earthquakes')
+    for eq in earthquakes[::2]:
+        table.rows[eq['kandilli_id']] = {'kandilli_id': eq['kandilli_id']}
+    ids = [eq['kandilli_id'] for eq in earthquakes]
+
+    def lookup():
+        db = EarthquakeDatabase(None, None, posted_cache=PostedIdCache(), client=supabase)
+        db.filter_unposted(ids)
+
+    results['dedup/filter_unposted'] = dict(summarize(timed(lookup, repeat), len(ids)), ids=len(ids))
+
+    # Revizyon indeksinde aday başına eşleştirme
+    index = SpatioTemporalIndex()
+    index.rebuild(earthquakes[::2])
+    candidates = earthquakes[1::2]
+
+    def match_all():
+        for eq in candidates:
+            index.match(eq)
+
+    results['dedup/index_match'] = dict(summarize(timed(match_all, repeat), len(candidates)), indexed=len(index))
+    return results
+
+
+def bench_gazetteer(earthquakes, repeat):
+    """Yerleşim listesinin ilk (CSV'den dizin oluşturarak) ve sonraki açılışları ile deprem başına arama."""
+    import tempfile
+    import gazetteer
+
+    work_dir = tempfile.mkdtemp(prefix='deprem-gazetteer-')
+    path = os.path.join(work_dir, os.path.basename(gazetteer.GAZETTEER_PATH))
+    shutil.copyfile(gazetteer.GAZETTEER_PATH, path)
+    try:
+        cold = timed(lambda: (gazetteer.build_index(path), gazetteer.Gazetteer(path)), 1)
+        index = gazetteer.Gazetteer(path)
+        warm = timed(lambda: gazetteer.Gazetteer(path), repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def lookup_all():
+        for eq in earthquakes:
+            gazetteer.enrich(eq, gazetteer=index)
+
+    lookup_all()  # Isınma turu
+    found = sum(1 for eq in earthquakes if eq['nearest_place'])
+    return {
+        'gazetteer/load': {'cold_ms': cold[0] * 1000, 'cached_ms': percentile(warm, 0.5) * 1000, 'places': len(index)},
+        'gazetteer/lookup': dict(summarize(timed(lookup_all, repeat), len(earthquakes)), found=found),
+    }
+
+
+def _fetch_samples(client, url, calls):
+    """İstemciyle `calls` kez çeker; süre örneklerini ve sonuç durumlarının sayısını döndürür."""
+    samples, statuses = [], {}
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = client.get(url)
+        samples.append(time.perf_counter() - start)
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+        if result.response is not None:
+            result.response.close()
+    return samples, statuses
+
+
+def bench_fetch(page_html, calls):
+    """
+    Kandilli istemcisini hatalı, yavaş ve kapalı sahte sunucuya karşı tek denemeli istemciyle
+    karşılaştırır: erişilebilirlik oranı, gecikme yüzdelikleri ve kesintide çağrı başına süre.
+    """
+    from http_client import ResilientHttpClient, CircuitBreaker, OK
+
+    def client(resilient, hedge_after=None):
+        if not resilient:
+            return ResilientHttpClient(connect_timeout=0.5, read_timeout=2, budget=2, max_attempts=1,
+                                       breaker=CircuitBreaker(failure_threshold=10 ** 9))
+        return ResilientHttpClient(connect_timeout=0.5, read_timeout=2, budget=2, max_attempts=4, backoff_base=0.01,
+                                   hedge_after=hedge_after, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+    results = {}
+    # %30 hata (503) veren kaynak
+    for name, resilient in (('single', False), ('retry', True)):
+        with FakeKandilliServer(page_html, failure_rate=0.3, seed=1) as server:
+            samples, statuses = _fetch_samples(client(resilient), server.url, calls)
+        results[f'fetch/flaky_{name}'] = dict(summarize(samples), availability=statuses.get(OK, 0) / calls)
+
+    # İsteklerin %15'i 1 sn geciken (uzun kuyruklu) yavaş kaynak
+    for name, hedge_after in (('single', None), ('hedged', 0.15)):
+        with FakeKandilliServer(page_html, latency=0.02, jitter=0.05, spike_rate=0.15, spike_latency=1.0, seed=2) as server:
+            samples, statuses = _fetch_samples(client(hedge_after is not None, hedge_after), server.url, calls)
+        results[f'fetch/slow_{name}'] = dict(summarize(samples), availability=statuses.get(OK, 0) / calls)
+
+    # Kapalı kaynak: devre kesici açıldıktan sonra istek yapılmaz
+    with FakeKandilliServer(page_html) as server:
+        url = server.url
+    for name, resilient in (('single', False), ('breaker', True)):
+        samples, statuses = _fetch_samples(client(resilient), url, calls)
+        results[f'fetch/outage_{name}'] = dict(summarize(samples), short_circuited=statuses.get('circuit_open', 0))
+    return results
+
+
+def _histogram_totals(histogram, label=None):
+    """Histogramın (`label` verilirse, ör. 'sink=webhook', sadece o etiketli serilerin) gözlem sayısı ve toplamı."""
+    count = total = 0
+    for key, value in histogram.snapshot().items():
+        if label is not None and label not in key.split(','):
+            continue
+        count += value['count']
+        total += value['sum']
+    return count, total
+
+
+def bench_e2e(name, page_html, args):
+    """Sahte servislerle tam döngüler: ilk döngü sayfanın tamamını işler, sonrakiler boştur (304)."""
+    import metrics
+
+    stages = {
+        'fetch': metrics.FETCH_SECONDS, 'parse': metrics.PARSE_SECONDS, 'dedup': metrics.DEDUP_SECONDS,
+        'render': metrics.RENDER_SECONDS, 'upload': metrics.UPLOAD_SECONDS, 'db_save': metrics.DB_SAVE_SECONDS,
+    }
+    before = {stage: _histogram_totals(h) for stage, h in stages.items()}
+
+    config = offline_config()
+    supabase = InMemorySupabase(latency=args.supabase_latency)
+    instagram = FakeInstagramClient(latency=args.upload_latency)
+
+    with FakeKandilliServer(page_html, latency=args.kandilli_latency) as server:
+        runtime = build_offline_runtime(config, server.url, supabase=supabase, instagram=instagram)
+
+        start = time.perf_counter()
+        runtime.run_cycle()
+        first_cycle = time.perf_counter() - start
+
+        idle_samples = timed(runtime.run_cycle, 5)
+
+    runtime.outbox.close()
+    shutil.rmtree(config.WORK_DIR, ignore_errors=True)
+    saved_rows = len(supabase.table('earthquakes').rows)
+    result = {
+        'first_cycle_ms': first_cycle * 1000,
+        'idle_cycle_p50_ms': percentile(idle_samples, 0.5) * 1000,
+        'uploads': len(instagram.media),
+        'saved_rows': saved_rows,
+        'ops_per_sec': saved_rows / first_cycle if first_cycle else 0.0,
+    }
+    for stage, histogram in stages.items():
+        count, total = _histogram_totals(histogram)
+        count -= before[stage][0]
+        total -= before[stage][1]
+        result[f'{stage}_mean_ms'] = (total / count * 1000) if count else 0.0
+    return {f'e2e/{name}': result}
+
+
+def bench_fanout(page_html, args):
+    """
+    Aynı döngüyü sadece Instagram'la ve Instagram + hızlı webhook + yavaş ve %30 hata veren
+    Telegram benzeri kanalla çalıştırır. Ek kanallar döngüyü uzatmamalı; kanal başına gönderim
+    sayısı, kuyrukta bekleme süresi ve tüm kanalların boşalma süresi raporlanır.
+    """
+    import metrics
+    from publishers import SinkWorker, WebhookPublisher, TelegramPublisher
+
+    results = {}
+    for name in ('instagram_only', 'fanout'):
+        config = offline_config()
+        instagram = FakeInstagramClient(latency=max(args.upload_latency, 0.05))
+        webhook = FakeSinkServer(latency=0.01).start()
+        telegram = FakeSinkServer(latency=0.3, failure_rate=0.3, seed=3).start()
+
+        with FakeKandilliServer(page_html) as server:
+            runtime = build_offline_runtime(config, server.url, instagram=instagram)
+            runtime._sinks = []
+            if name == 'fanout':
+                runtime._sinks = [
+                    SinkWorker(WebhookPublisher(webhook.webhook_url), workers=2, posts_per_hour=10 ** 9, retry_base=0.05),
+                    SinkWorker(TelegramPublisher('BENCH', '1', telegram.base_url), workers=2, posts_per_hour=10 ** 9,
+                               retry_base=0.05),
+                ]
+            before = {sink.name: _histogram_totals(metrics.SINK_DELIVERY_DELAY_SECONDS, f'sink={sink.name}') for sink in runtime.sinks}
+
+            start = time.perf_counter()
+            runtime.run_cycle()
+            first_cycle = time.perf_counter() - start
+            for sink in runtime.sinks:
+                sink.drain(timeout=30)
+            drained = time.perf_counter() - start
+
+        result = {'first_cycle_ms': first_cycle * 1000, 'uploads': len(instagram.media)}
+        if runtime.sinks:
+            result['all_sinks_drained_ms'] = drained * 1000
+        for sink, fake in zip(runtime.sinks, (webhook, telegram)):
+            count, total = _histogram_totals(metrics.SINK_DELIVERY_DELAY_SECONDS, f'sink={sink.name}')
+            count -= before[sink.name][0]
+            total -= before[sink.name][1]
+            result[f'{sink.name}_delivered'] = len(fake.received)
+            result[f'{sink.name}_failed_requests'] = fake.failures
+            result[f'{sink.name}_mean_delay_ms'] = total / count * 1000 if count else 0.0
+            sink.close()
+        webhook.stop()
+        telegram.stop()
+        runtime.outbox.close()
+        shutil.rmtree(config.WORK_DIR, ignore_errors=True)
+        results[f'fanout/{name}'] = result
+    return results
+
+
+def _claim_stores(backend, work_dir, count):
+    from coordination import SqliteClaimStore, SupabaseClaimStore
+
+    if backend == 'sqlite':
+        path = os.path.join(work_dir, 'coordination.db')
+        return [SqliteClaimStore(path) for _ in range(count)]
+    supabase = InMemorySupabase()
+    return [SupabaseClaimStore(supabase) for _ in range(count)]
+
+
+def bench_claims(earthquakes, replicas=4, batch_size=10):
+    """
+    `replicas` örnek aynı depremleri farklı sırayla, `batch_size`lık gruplar halinde aynı anda
+    talep eder: talep gecikmesi, çakışma sayısı ve birden fazla örneğe verilen talep (0 olmalı).
+    """
+    import random
+    import threading
+    import tempfile
+
+    results = {}
+    for backend in ('sqlite', 'supabase'):
+        work_dir = tempfile.mkdtemp(prefix='deprem-bench-')
+        stores = _claim_stores(backend, work_dir, replicas)
+        owned = [set() for _ in stores]
+        samples = [[] for _ in stores]
+
+        def claimer(i):
+            order = list(earthquakes)
+            random.Random(i).shuffle(order)
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                began = time.perf_counter()
+                owned[i] |= stores[i].claim(batch, f'replica-{i}', time.time())
+                samples[i].append(time.perf_counter() - began)
+
+        threads = [threading.Thread(target=claimer, args=(i,)) for i in range(replicas)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        claimed = sum(len(ids) for ids in owned)
+        all_samples = [sample for replica in samples for sample in replica]
+        results[f'failover/claims_{backend}'] = dict(
+            summarize(all_samples, batch_size),
+            claimed=claimed,
+            conflicts=replicas * len(earthquakes) - claimed,
+            double_claims=claimed - len(set().union(*owned)),
+            unclaimed=len(earthquakes) - len(set().union(*owned)),
+            wall_ms=elapsed * 1000,
+        )
+        for store in stores:
+            store.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _wait_for(condition, timeout=30, interval=0.005):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def bench_leader_failover(rounds=5, lease_seconds=1.0, renew_seconds=0.2):
+    """
+    İki örnek aynı SQLite kirası için yarışır. Lider ya çöker (kirayı bırakmadan durur) ya da
+    düzgün kapanır (kirayı bırakır); yedeğin lider olmasına kadar geçen süre ölçülür.
+    """
+    import tempfile
+    from coordination import Coordinator
+
+    results = {}
+    for name, release in (('crash', False), ('graceful', True)):
+        work_dir = tempfile.mkdtemp(prefix='deprem-bench-')
+        stores = _claim_stores('sqlite', work_dir, 2)
+        samples = []
+        for round_number in range(rounds):
+            leader, standby = (
+                Coordinator(store, holder=f'{name}-{round_number}-{i}', lease_seconds=lease_seconds,
+                            renew_seconds=renew_seconds)
+                for i, store in enumerate(stores)
+            )
+            leader.start()
+            standby.start()
+            _wait_for(leader.is_leader)
+            began = time.perf_counter()
+            leader.stop(release=release)
+            if _wait_for(standby.is_leader, timeout=lease_seconds * 10):
+                samples.append(time.perf_counter() - began)
+            standby.stop()
+        results[f'failover/lease_{name}'] = {
+            'rounds': rounds,
+            'taken_over': len(samples),
+            'p50_ms': percentile(samples, 0.5) * 1000,
+            'max_ms': max(samples, default=0.0) * 1000,
+            'lease_ms': lease_seconds * 1000,
+        }
+        for store in stores:
+            store.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def bench_replicas(page_html, args, lease_seconds=1.0, renew_seconds=0.2, crash_after=4):
+    """
+    İki örnek aynı sahte Supabase (veritabanı ve talepler) ve Instagram hesabıyla çalışır.
+    Lider `crash_after` paylaşım yaptıktan sonra çöker; yedek devralır ve kalan depremleri paylaşır.
+    Aynı başlıkla iki kez yapılan paylaşım sayısı 0 olmalıdır.
+    """
+    import threading
+    import metrics
+    from collections import Counter
+
+    supabase = InMemorySupabase(latency=args.supabase_latency)
+    instagram = FakeInstagramClient(latency=max(args.upload_latency, 0.05))
+    conflicts_before = metrics.CLAIM_CONFLICTS.value()
+
+    with FakeKandilliServer(page_html) as server:
+        runtimes = []
+        for i in range(2):
+            config = offline_config(
+                COORDINATION_BACKEND='supabase', INSTANCE_ID=f'replica-{i}',
+                LEADER_LEASE_SECONDS=lease_seconds, LEADER_RENEW_SECONDS=renew_seconds,
+            )
+            runtimes.append(build_offline_runtime(config, server.url, supabase=supabase, instagram=instagram))
+            runtimes[-1].coordinator  # Kira yarışına hemen katıl; ilk kurulan lider olur
+
+        stopped = [threading.Event() for _ in runtimes]
+
+        def run(i):
+            runtime = runtimes[i]
+            while not stopped[i].is_set():
+                runtime.run_cycle()
+                stopped[i].wait(min(runtime.next_delay(), renew_seconds))
+
+        threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(2)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        leader, standby = runtimes
+        _wait_for(lambda: len(instagram.media) >= crash_after)
+        # Lider çöker: kira yenilenmez, yeni döngü başlamaz (süren yükleme tamamlanabilir)
+        crashed_at = time.perf_counter()
+        stopped[0].set()
+        leader.coordinator.stop(release=False)
+        _wait_for(standby.is_active)
+        failover = time.perf_counter() - crashed_at
+
+        # Yedek, kalan depremleri paylaşıp boşta kalana kadar bekle
+        last = -1
+        while last != len(instagram.media):
+            last = len(instagram.media)
+            time.sleep(1.0)
+        elapsed = time.perf_counter() - start
+        stopped[1].set()
+        for thread in threads:
+            thread.join(5)
+
+    captions = Counter(media.caption_text for media in instagram.media)
+    posted_claims = sum(1 for row in supabase.table('event_claims').rows.values() if row['state'] == 'posted')
+    for runtime in runtimes:
+        runtime.close()
+        shutil.rmtree(runtime.config.WORK_DIR, ignore_errors=True)
+    return {'failover/replicas_crash': {
+        'failover_ms': failover * 1000,
+        'uploads': len(instagram.media),
+        'duplicate_uploads': sum(count - 1 for count in captions.values()),
+        'posted_claims': posted_claims,
+        'claim_conflicts': metrics.CLAIM_CONFLICTS.value() - conflicts_before,
+        'total_ms': elapsed * 1000,
+    }}
+
+
+def bench_deadlines(page_html, args):
+    """
+    Instagram yüklemelerinin %30'u ve Supabase sorgularının %10'u 3 sn asılı kalırken döngüleri
+    süre sınırlarıyla ve sınırsız çalıştırır. Süre sınırıyla en uzun döngü sınırlı kalmalı,
+    bırakılan yüklemeler Instagram'da doğrulanıp tamamlanmalı ve hiçbir deprem iki kez paylaşılmamalıdır.
+    """
+    import metrics
+    from collections import Counter
+    from health import stage_deadlines
+
+    deadlines = {
+        'DEADLINE_FETCH_SECONDS': 2, 'DEADLINE_DB_LOOKUP_SECONDS': 0.3, 'DEADLINE_RENDER_SECONDS': 5,
+        'DEADLINE_UPLOAD_SECONDS': 0.5, 'DEADLINE_DB_SAVE_SECONDS': 0.3,
+    }
+    results = {}
+    for name in ('no_deadlines', 'deadlines'):
+        overrides = deadlines if name == 'deadlines' else {key: 0 for key in deadlines}
+        config = offline_config(ABANDONED_UPLOAD_GRACE_SECONDS=10, **overrides)
+        supabase = InMemorySupabase(latency=args.supabase_latency, spike_rate=0.1, spike_latency=3.0, seed=4)
+        instagram = FakeInstagramClient(latency=max(args.upload_latency, 0.02), spike_rate=0.3, spike_latency=3.0, seed=5)
+        timeouts_before = {
+            stage: metrics.STAGE_TIMEOUTS.value(stage=stage)
+            for stage, seconds in stage_deadlines(config).items() if seconds
+        }
+
+        with FakeKandilliServer(page_html) as server:
+            runtime = build_offline_runtime(config, server.url, supabase=supabase, instagram=instagram)
+            start = time.perf_counter()
+            cycles = []
+            # Açık günlük kaydı ve bırakılan yükleme kalmayana kadar döngü çalıştır
+            while True:
+                cycle_start = time.perf_counter()
+                runtime.run_cycle()
+                cycles.append(time.perf_counter() - cycle_start)
+                if not runtime.outbox.in_flight_ids() and not runtime._abandoned_uploads and len(cycles) > 1:
+                    break
+                time.sleep(0.2)
+            elapsed = time.perf_counter() - start
+
+        captions = Counter(media.caption_text for media in instagram.media)
+        result = {
+            'first_cycle_ms': cycles[0] * 1000,
+            'max_cycle_ms': max(cycles) * 1000,
+            'cycles': len(cycles),
+            'all_posted_ms': elapsed * 1000,
+            'uploads': len(instagram.media),
+            'duplicate_uploads': sum(count - 1 for count in captions.values()),
+            'saved_rows': len(supabase.table('earthquakes').rows),
+        }
+        for stage, before in timeouts_before.items():
+            result[f'{stage}_timeouts'] = metrics.STAGE_TIMEOUTS.value(stage=stage) - before
+        runtime.close()
+        shutil.rmtree(config.WORK_DIR, ignore_errors=True)
+        results[f'watchdog/{name}'] = result
+    return results
+
+
+def bench_stall_detection(rounds=5, stall_seconds=0.3, interval_seconds=0.05):
+    """
+    Süre sınırı olmayan bir aşama asılı kaldığında bekçinin bunu fark etme süresini, canlılık
+    durumunun düşmesini ve aşama bitince yeniden yükselmesini ölçer.
+    """
+    import threading
+    from health import Watchdog
+
+    # Bekçinin yığın izi dökümleri ölçümü gölgelemesin
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    detections, restarts, recovered = [], [], 0
+    for _ in range(rounds):
+        stalled = threading.Event()
+        watchdog = Watchdog(
+            stall_seconds=stall_seconds, interval_seconds=interval_seconds,
+            on_stall=lambda stages: (restarts.append(stages), stalled.set()),
+        ).start()
+        release = threading.Event()
+
+        def hang():
+            with watchdog.track('hung'):
+                release.wait()
+
+        thread = threading.Thread(target=hang, daemon=True)
+        start = time.perf_counter()
+        thread.start()
+        stalled.wait(10)
+        detections.append(time.perf_counter() - start)
+        alive_while_stalled = watchdog.status()['alive']
+        release.set()
+        thread.join()
+        recovered += (not alive_while_stalled) and watchdog.status()['alive']
+        watchdog.stop()
+    logging.disable(previous)
+
+    return {'watchdog/stall_detection': {
+        'detect_p50_ms': percentile(detections, 0.5) * 1000,
+        'detect_max_ms': max(detections) * 1000,
+        'restarts': len(restarts),
+        'recovered': recovered,
+        'rounds': rounds,
+    }}
+
+
+def bench_profile(page_html, args):
+    """
+    Fırtına sayfasının ilk döngüsünü profilsiz, 'collapsed' (örnekleme) ve 'pstats' (cProfile)
+    kipinde çalıştırır; profilin döngüye eklediği süreyi, kapalıyken bir aşama ölçümünün maliyetini
+    ve aşama sürelerini raporlar. `--profile-dir` verilirse profil dosyaları orada saklanır.
+    """
+    from profiling import CycleProfiler
+
+    idle = CycleProfiler()
+    calls = 100_000
+    start = time.perf_counter()
+    for _ in range(calls):
+        with idle.span('fetch'):
+            pass
+    results = {'profile/disabled_span': {'ns_per_span': (time.perf_counter() - start) / calls * 1e9}}
+
+    # İlk döngü fontları, yerleşim listesini vb. yükler; ölçülmez
+    baseline = None
+    for mode in ('warmup', None, 'collapsed', 'pstats'):
+        config = offline_config(PROFILE_MODE=mode if mode in ('collapsed', 'pstats') else 'collapsed')
+        output_dir = args.profile_dir or os.path.join(config.WORK_DIR, 'profiles')
+        with FakeKandilliServer(page_html, latency=args.kandilli_latency) as server:
+            runtime = build_offline_runtime(
+                config, server.url,
+                supabase=InMemorySupabase(latency=args.supabase_latency),
+                instagram=FakeInstagramClient(latency=args.upload_latency),
+            )
+            runtime.profiler.output_dir = output_dir
+            if mode in ('collapsed', 'pstats'):
+                runtime.profiler.request(1)
+            start = time.perf_counter()
+            runtime.run_cycle()
+            elapsed = time.perf_counter() - start
+
+        result = {'first_cycle_ms': elapsed * 1000}
+        if mode is None:
+            baseline = elapsed
+        elif baseline is not None:
+            result['overhead_pct'] = (elapsed / baseline - 1) * 100
+            result['files'] = len(runtime.profiler.written)
+            for stage, ms in sorted(runtime.profiler.stage_totals().items()):
+                result[f'{stage}_ms'] = ms
+            if args.profile_dir:
+                for path in runtime.profiler.written:
+                    print(f"profil dosyası: {path}")
+        runtime.close()
+        shutil.rmtree(config.WORK_DIR, ignore_errors=True)
+        if mode != 'warmup':
+            results[f'profile/{mode or "off"}'] = result
+    return results
+
+
+def bench_logging(page_html, repeat=5):
+    """
+    Fırtına sayfasını sanal zamanda INFO seviyesinde loglayarak yeniden oynatır: loglar kapalı,
+    eski düzen (kök loglayıcıda eşzamanlı metin işleyicisi), kuyruklu JSON ve satır başına hız
+    sınırı olmadan kuyruklu JSON. Çıktı /dev/null'a yazılır; oynatma başına kayıt sayısı, bayt ve
+    loglamanın yeniden oynatmaya eklediği süre (`repeat` oynatmanın ortancası) raporlanır.
+    """
+    import tempfile
+    import backfill
+    from log_pipeline import LogPipeline, CountingStream, TEXT_FORMAT
+
+    fd, path = tempfile.mkstemp(prefix='deprem-logging-', suffix='.html')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(page_html)
+
+    root = logging.getLogger()
+    saved_handlers, saved_level, saved_disable = root.handlers[:], root.level, logging.root.manager.disable
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+
+    def replay_once(name):
+        root.handlers = []
+        logging.disable(logging.CRITICAL if name == 'disabled' else logging.NOTSET)
+        pipeline = None
+        if name == 'sync_text':
+            handler = logging.StreamHandler(CountingStream(devnull))
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            records = []
+            handler.addFilter(lambda record: records.append(1) or True)
+            root.addHandler(handler)
+            root.setLevel(logging.INFO)
+        elif name.startswith('queue_json'):
+            pipeline = LogPipeline(
+                level=logging.INFO, style='json', stream=devnull,
+                rate_burst=0 if name.endswith('unlimited') else 10,
+            ).start()
+
+        start = time.perf_counter()
+        summary = backfill.replay(backfill.iter_catalog([path], chronological=True))
+        elapsed = time.perf_counter() - start
+        stats = {'events': summary['events_read']}
+        if pipeline is not None:
+            # Kuyrukta kalanların yazılması oynatma süresine sayılmaz, ayrıca raporlanır
+            pipeline.stop()
+            stats['flush_ms'] = (time.perf_counter() - start - elapsed) * 1000
+            stats.update(pipeline.stats())
+        elif name == 'sync_text':
+            stats.update(records=len(records), bytes=handler.stream.bytes)
+        return elapsed, stats
+
+    results, baseline = {}, None
+    try:
+        replay_once('disabled')  # Modülleri ve önbellekleri ısıtır
+        for name in ('disabled', 'sync_text', 'queue_json', 'queue_json_unlimited'):
+            samples = []
+            for _ in range(repeat):
+                elapsed, stats = replay_once(name)
+                samples.append(elapsed)
+            median = statistics.median(samples)
+            result = {'replay_ms': median * 1000, **stats}
+            if baseline is None:
+                baseline = median
+            else:
+                result['overhead_pct'] = (median / baseline - 1) * 100
+            results[f'logging/{name}'] = result
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+        logging.disable(saved_disable)
+        devnull.close()
+        os.remove(path)
+    return results
+
+
+def bench_backfill(name, page_html):
+    """
+    Örnek sayfayı dosyadan akış olarak okuyup toplu yükleme (satır/sn) ve sanal zamanda
+    yeniden oynatma (deprem/sn ve gerçek zamana göre hızlanma) ölçer.
+    """
+    import tempfile
+    import backfill
+    from database import EarthquakeDatabase, PostedIdCache
+    from local_store import LocalEarthquakeStore
+
+    fd, path = tempfile.mkstemp(prefix='deprem-backfill-', suffix='.html')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(page_html)
+
+    try:
+        supabase = InMemorySupabase()
+        db = EarthquakeDatabase(
+            url=None, key=None, posted_cache=PostedIdCache(), local_store=LocalEarthquakeStore(':memory:'), client=supabase
+        )
+        start = time.perf_counter()
+        read, written = backfill.ingest(db, backfill.iter_catalog([path]))
+        ingest_seconds = time.perf_counter() - start
+
+        summary = backfill.replay(backfill.iter_catalog([path], chronological=True))
+    finally:
+        os.remove(path)
+
+    wall = summary['wall_seconds']
+    return {
+        f'backfill/ingest_{name}': {
+            'rows': read,
+            'written': written,
+            'saved_rows': len(supabase.table('earthquakes').rows),
+            'ops_per_sec': read / ingest_seconds if ingest_seconds else 0.0,
+        },
+        f'backfill/replay_{name}': {
+            'events': summary['events_read'],
+            'posts': summary['posts'],
+            'albums': summary['albums'],
+            'events_posted': summary['events_posted'],
+            'max_backlog': summary['max_backlog'],
+            'speedup': summary['virtual_seconds'] / wall if wall else 0.0,
+            'ops_per_sec': summary['events_read'] / wall if wall else 0.0,
+        },
+    }
+
+
+def import_profile(modules):
+    """
+    Modülleri yeni bir Python sürecinde `-X importtime` ile import eder. İstenen modüllerin
+    toplam import süresini (µs), yorumlayıcı açılışı dahil süreç süresini ve yüklenen ağır
+    paketleri döndürür.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    process_seconds = time.perf_counter() - start
+
+    total_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # Başlık satırı
+        package = name.strip().split('.')[0]
+        loaded.add(package)
+        # Girintisiz satırlar doğrudan istenen (ya da yorumlayıcının yüklediği) modüllerdir
+        if name.strip() in modules and not name.startswith('  ', 1):
+            total_us += int(cumulative)
+    return total_us, process_seconds, sorted(loaded & set(HEAVY_PACKAGES))
+
+
+def bench_startup(repeat):
+    """main.py komutlarının soğuk açılışta import maliyeti (her ölçüm yeni bir süreçte)."""
+    results = {}
+    for command, modules in STARTUP_COMMANDS.items():
+        profiles = [import_profile(modules) for _ in range(repeat)]
+        import_ms = statistics.median(profile[0] for profile in profiles) / 1000
+        results[f'startup/{command}'] = {
+            'import_ms': import_ms,
+            'process_ms': statistics.median(profile[1] for profile in profiles) * 1000,
+            'heavy': ','.join(profiles[0][2]) or '-',
+            'ops_per_sec': 1000 / import_ms if import_ms else 0.0,
+        }
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """Verimi baseline'a göre `max_regression` oranından fazla düşen senaryoları döndürür."""
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key, {}).get('ops_per_sec')
+        new = result.get('ops_per_sec')
+        if old and new is not None and new < old * (1 - max_regression):
+            regressions.append((key, old, new))
+    return regressions
+
+
+def print_results(results):
+    for key, result in results.items():
+        details = ', '.join(
+            f"{name}={value:,.2f}" if isinstance(value, float) else f"{name}={value}"
+            for name, value in result.items()
+        )
+        print(f"{key:28s} {details}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çevrimdışı benchmark ve yük testi paketi")
+    parser.add_argument('--only', default=','.join(SCENARIOS), help="Çalıştırılacak senaryolar (virgülle)")
+    parser.add_argument('--repeat', type=int, default=20, help="Mikro benchmark tekrar sayısı")
+    parser.add_argument('--swarm-size', type=int, default=1000, help="Fırtına sayfasındaki deprem sayısı")
+    parser.add_argument('--kandilli-latency', type=float, default=0.0, help="Sahte Kandilli yanıt gecikmesi (sn)")
+    parser.add_argument('--supabase-latency', type=float, default=0.0, help="Sahte Supabase sorgu gecikmesi (sn)")
+    parser.add_argument('--upload-latency', type=float, default=0.0, help="Sahte Instagram yükleme gecikmesi (sn)")
+    parser.add_argument('--json', dest='json_path', help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument('--baseline', help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="İzin verilen en büyük verim düşüşü (oran)")
+    parser.add_argument('--profile-dir', help="'profile' senaryosunun profil dosyalarının saklanacağı dizin")
+    parser.add_argument('--verbose', action='store_true', help="Bot loglarını göster")
+    args = parser.parse_args()
+
+    if args.verbose:
+        from config import configure_logging
+        configure_logging()
+    else:
+        logging.disable(logging.INFO)
+    selected = [name.strip() for name in args.only.split(',') if name.strip()]
+
+    from kandilli_parser import parse_listing
+
+    realistic_page = load_fixture('lst0_sample.html')
+    swarm_page = build_page(synthetic_earthquakes(args.swarm_size))
+    swarm_earthquakes = parse_listing(swarm_page)
+
+    results = {}
+    if 'parse' in selected:
+        results.update(bench_parse({
+            'realistic': realistic_page,
+            'feb2023': load_fixture('lst0_20230206.html'),
+            f'swarm{args.swarm_size}': swarm_page,
+        }, args.repeat))
+    if 'render' in selected:
+        results.update(bench_render(swarm_earthquakes, args.repeat))
+    if 'dedup' in selected:
+        results.update(bench_dedup(swarm_earthquakes, args.repeat))
+    if 'gazetteer' in selected:
+        results.update(bench_gazetteer(swarm_earthquakes, args.repeat))
+    if 'fetch' in selected:
+        results.update(bench_fetch(realistic_page, max(args.repeat, 20)))
+    if 'e2e' in selected:
+        results.update(bench_e2e('realistic', realistic_page, args))
+        results.update(bench_e2e(f'swarm{args.swarm_size}', swarm_page, args))
+    if 'fanout' in selected:
+        results.update(bench_fanout(realistic_page, args))
+    if 'failover' in selected:
+        results.update(bench_claims(swarm_earthquakes))
+        results.update(bench_leader_failover())
+        results.update(bench_replicas(realistic_page, args))
+    if 'watchdog' in selected:
+        results.update(bench_deadlines(realistic_page, args))
+        results.update(bench_stall_detection())
+    if 'profile' in selected:
+        results.update(bench_profile(swarm_page, args))
+    if 'logging' in selected:
+        results.update(bench_logging(swarm_page))
+    if 'backfill' in selected:
+        results.update(bench_backfill('feb2023', load_fixture('lst0_20230206.html')))
+        results.update(bench_backfill(f'swarm{args.swarm_size}', swarm_page))
+    if 'startup' in selected:
+        results.update(bench_startup(min(args.repeat, 5)))
+
+    print_results(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        for key, old, new in regressions:
+            print(f"GERİLEME: {key} {old:,.1f} -> {new:,.1f} işlem/sn")
+        if regressions:
+            sys.exit(1)
+        print("Baseline'a göre gerileme yok.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""
+Benchmark ve yük testleri için canlı servislerin yerine geçen sahte bileşenler.
+
+- FakeKandilliServer: Örnek ya da sentetik lst0.asp sayfalarını yerel HTTP sunucusundan sunar.
+- InMemorySupabase: Supabase istemcisinin bot tarafından kullanılan sorgu zincirini bellekte taklit eder.
+- FakeInstagramClient: instagrapi Client'ın bot tarafından kullanılan metotlarını taklit eder.
+
+Üçünde de gecikme ve hata oranı ayarlanabilir. `build_offline_runtime` bunlarla çalışan bir
+BotRuntime kurar; böylece tam döngü ağa çıkmadan ölçülebilir.
+"""
+import os
+import sys
+import time
+import random
+import json
+import hashlib
+import tempfile
+import threading
+import itertools
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+FIXTURE_DIR = os.path.join(ROOT_DIR, 'fixtures', 'kandilli')
+
+PAGE_HEADER = """<HTML>
+<HEAD>
+<meta http-equiv="Content-Type" content="text/html; charset=utf-8">
+<TITLE>SON DEPREMLER</TITLE>
+</HEAD>
+<BODY BGCOLOR="#FFFFFF">
+<pre>
+
+RECENT EARTHQUAKES IN TURKIYE
+KOERI REGIONAL EARTHQUAKE-TSUNAMI MONITORING CENTER
+(QUICK EPICENTER DETERMINATIONS)
+Magnitude Types;  ML : Local Magnitude, MD : Duration Magnitude,
+                  Mw : Moment Magnitude, Mb : Body-Wave Magnitude
+Date       Time      Latit(N)  Long(E)   Depth(km)     MD   ML   Mw    Region                                    Solution Type
+---------- --------  --------  -------   ----------    ------------    --------------                            --------------
+"""
+PAGE_FOOTER = """</pre>
+</BODY>
+</HTML>
+"""
+
+# Sentetik depremler için bölgeler: (yer, enlem, boylam)
+SYNTHETIC_REGIONS = (
+    ('PAZARCIK (KAHRAMANMARAS)', 37.288, 37.043),
+    ('NURDAGI (GAZIANTEP)', 37.174, 36.738),
+    ('ANTAKYA (HATAY)', 36.202, 36.160),
+    ('ELBISTAN (KAHRAMANMARAS)', 38.089, 37.239),
+    ('SINDIRGI (BALIKESIR)', 39.206, 28.173),
+    ('MARMARA DENIZI', 40.836, 28.207),
+    ('KUSADASI KORFEZI (EGE DENIZI)', 37.958, 27.157),
+    ('AKDENIZ', 35.640, 28.344),
+)
+
+
+def _format_magnitude(value):
+    return '-.-' if value is None else f'{value:3.1f}'
+
+
+def format_row(earthquake):
+    """Depremi Kandilli'nin sabit sütun düzeninde bir satıra çevirir."""
+    region = earthquake.get('region') or earthquake['location']
+    quality = earthquake.get('quality') or 'İlksel'
+    return (
+        f"{earthquake['earthquake_time'].strftime('%Y.%m.%d %H:%M:%S')}  "
+        f"{earthquake['latitude']:7.4f}   {earthquake['longitude']:7.4f}   "
+        f"{earthquake['depth']:10.1f}      "
+        f"{_format_magnitude(earthquake.get('md'))}  {_format_magnitude(earthquake.get('ml'))}  "
+        f"{_format_magnitude(earthquake.get('mw'))}   "
+        f"{region:<42}{quality}"
+    )
+
+
+def build_page(earthquakes):
+    """Depremlerden (en yeniden eskiye sıralanarak) bir lst0.asp sayfası üretir."""
+    rows = sorted(earthquakes, key=lambda eq: eq['earthquake_time'], reverse=True)
+    return PAGE_HEADER + ''.join(format_row(eq) + '\n' for eq in rows) + PAGE_FOOTER
+
+
+def synthetic_earthquakes(count, end_time=None, swarm=True, seed=0, base_magnitude=None, mean_gap_seconds=None):
+    """
+    Sentetik depremler üretir. Büyüklükler Gutenberg-Richter dağılımına (b=1) uyar.
+
+    `swarm=True` ise depremler tek bir merkez çevresinde ve sık aralıklarla (artçı fırtınası),
+    aksi halde farklı bölgelere seyrek aralıklarla dağılır.
+    """
+    rng = random.Random(seed)
+    end_time = end_time or datetime(2023, 2, 6, 12, 0, 0)
+    base_magnitude = base_magnitude if base_magnitude is not None else (3.0 if swarm else 1.0)
+    mean_gap_seconds = mean_gap_seconds or (20 if swarm else 240)
+
+    earthquakes = []
+    current = end_time
+    for _ in range(count):
+        location, lat, lon = SYNTHETIC_REGIONS[0] if swarm else rng.choice(SYNTHETIC_REGIONS)
+        spread = 0.3 if swarm else 0.1
+        magnitude = round(min(base_magnitude + rng.expovariate(2.302585), 7.8), 1)
+        earthquakes.append({
+            'earthquake_time': current,
+            'latitude': lat + rng.uniform(-spread, spread),
+            'longitude': lon + rng.uniform(-spread, spread),
+            'depth': round(rng.uniform(2, 25), 1),
+            'ml': magnitude,
+            'location': location,
+        })
+        current -= timedelta(seconds=max(1, int(rng.expovariate(1 / mean_gap_seconds))))
+    return earthquakes
+
+
+def synthetic_page(count, **kwargs):
+    return build_page(synthetic_earthquakes(count, **kwargs))
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class _FaultInjector:
+    """
+    Gecikme ve rastgele hata ekleyen ortak yardımcı. `spike_rate` oranındaki çağrılara ayrıca
+    `spike_latency` kadar gecikme eklenir (uzun kuyruklu gecikme dağılımı).
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, spike_rate=0.0, spike_latency=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def delay_and_fail(self):
+        """Gecikmeyi uygular; hata üretilmesi gerekiyorsa True döner."""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            if self.spike_rate and self._rng.random() < self.spike_rate:
+                delay += self.spike_latency
+            fail = self.failure_rate and self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+        return bool(fail)
+
+
+class _LocalHttpServer(_FaultInjector):
+    """Arka planda çalışan yerel bir ThreadingHTTPServer; `with` bloğunda başlatılıp durdurulur."""
+
+    def _serve(self, handler, name, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=name, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeKandilliServer(_LocalHttpServer):
+    """
+    lst0.asp sayfasını yerel bir HTTP sunucusundan sunar. ETag ile koşullu istekleri (304) destekler.
+    Hata üretildiğinde 503 döner.
+    """
+
+    def __init__(self, page, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, host='127.0.0.1', port=0,
+                 spike_rate=0.0, spike_latency=0.0):
+        super().__init__(latency, jitter, failure_rate, seed, spike_rate, spike_latency)
+        self.set_page(page)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if fake.delay_and_fail():
+                    self.send_error(503)
+                    return
+                body, etag = fake._body, fake._etag
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._serve(Handler, 'fake-kandilli', host, port)
+
+    def set_page(self, page):
+        self._body = page.encode('utf-8')
+        self._etag = '"' + hashlib.sha1(self._body).hexdigest() + '"'
+
+    @property
+    def url(self):
+        return f'{self.base_url}/scripts/lst0.asp'
+
+
+class FakeSinkServer(_LocalHttpServer):
+    """
+    Webhook ve Telegram Bot API'si yerine geçen yerel sunucu. Gelen POST isteklerini
+    `received` listesine (yol, gövde boyutu, zaman) kaydeder. '/bot<token>/sendPhoto' ve
+    '/bot<token>/sendMediaGroup' yollarına Telegram biçiminde, diğer yollara webhook
+    biçiminde ({"id": n}) yanıt verir. Hata üretildiğinde 503 döner.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, host='127.0.0.1', port=0,
+                 spike_rate=0.0, spike_latency=0.0):
+        super().__init__(latency, jitter, failure_rate, seed, spike_rate, spike_latency)
+        self.received = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if fake.delay_and_fail():
+                    self.send_error(503)
+                    return
+                with fake._lock:
+                    fake.received.append((self.path, len(body), time.monotonic()))
+                    message_id = len(fake.received)
+                if '/bot' in self.path:
+                    result = {'message_id': message_id}
+                    if self.path.endswith('/sendMediaGroup'):
+                        result = [result]
+                    response = {'ok': True, 'result': result}
+                else:
+                    response = {'id': message_id}
+                data = json.dumps(response).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._serve(Handler, 'fake-sink', host, port)
+
+    @property
+    def webhook_url(self):
+        return f'{self.base_url}/hooks/deprem'
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+    def __init__(self, table, action, payload=None, on_conflict=None):
+        self._table = table
+        self._action = action
+        self._payload = payload
+        self._on_conflict = on_conflict
+        self._columns = None
+        self._filters = []
+        self._ignore_duplicates = False
+
+    def select(self, columns='*', head=False):
+        self._columns = None if columns == '*' else [c.strip() for c in columns.split(',')]
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) < value)
+        return self
+
+    def execute(self):
+        return self._table.execute(self)
+
+
+class InMemoryTable:
+    def __init__(self, owner, key='kandilli_id'):
+        self._owner = owner
+        self.key = key
+        self.rows = {}
+
+    def select(self, columns='*', head=False):
+        return _FakeQuery(self, 'select').select(columns, head)
+
+    def insert(self, record):
+        return _FakeQuery(self, 'insert', record)
+
+    def upsert(self, records, on_conflict=None, ignore_duplicates=False):
+        query = _FakeQuery(self, 'upsert', records, on_conflict)
+        query._ignore_duplicates = ignore_duplicates
+        return query
+
+    def update(self, fields):
+        return _FakeQuery(self, 'update', fields)
+
+    def delete(self):
+        return _FakeQuery(self, 'delete')
+
+    def _matches(self, query):
+        return [row for row in self.rows.values() if all(f(row) for f in query._filters)]
+
+    def execute(self, query):
+        if self._owner.delay_and_fail():
+            raise ConnectionError("Sahte Supabase: bağlantı hatası")
+
+        with self._owner._lock:
+            if query._action == 'select':
+                rows = self._matches(query)
+                if query._columns:
+                    rows = [{c: row.get(c) for c in query._columns} for row in rows]
+                else:
+                    rows = [dict(row) for row in rows]
+                return FakeResponse(rows)
+
+            if query._action == 'insert':
+                records = query._payload if isinstance(query._payload, list) else [query._payload]
+                for record in records:
+                    if record[self.key] in self.rows:
+                        raise ValueError(f"duplicate key value violates unique constraint ({record[self.key]})")
+                for record in records:
+                    self.rows[record[self.key]] = dict(record)
+                return FakeResponse([dict(record) for record in records])
+
+            if query._action == 'upsert':
+                records = query._payload if isinstance(query._payload, list) else [query._payload]
+                written = []
+                for record in records:
+                    # PostgREST gibi, çakışıp atlanan satırlar yanıtta dönmez
+                    if query._ignore_duplicates and record[self.key] in self.rows:
+                        continue
+                    self.rows.setdefault(record[self.key], {}).update(record)
+                    written.append(dict(record))
+                return FakeResponse(written)
+
+            if query._action == 'update':
+                rows = self._matches(query)
+                for row in rows:
+                    row.update(query._payload)
+                return FakeResponse([dict(row) for row in rows])
+
+            if query._action == 'delete':
+                rows = self._matches(query)
+                for row in rows:
+                    del self.rows[row[self.key]]
+                return FakeResponse([dict(row) for row in rows])
+
+        raise ValueError(f"Desteklenmeyen işlem: {query._action}")
+
+
+class InMemorySupabase(_FaultInjector):
+    """Supabase istemcisinin `table(...).select/insert/upsert/update/delete(...).in_/eq/gte/lt(...).execute()` zincirini taklit eder."""
+
+    # Birincil anahtarı kandilli_id olmayan tablolar
+    TABLE_KEYS = {'bot_leases': 'name'}
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, spike_rate=0.0, spike_latency=0.0):
+        super().__init__(latency, jitter, failure_rate, seed, spike_rate, spike_latency)
+        self._tables = {}
+
+    def table(self, name):
+        if name not in self._tables:
+            self._tables[name] = InMemoryTable(self, self.TABLE_KEYS.get(name, 'kandilli_id'))
+        return self._tables[name]
+
+
+class FakeMedia:
+    def __init__(self, pk, caption_text):
+        self.pk = pk
+        self.caption_text = caption_text
+
+
+class FakeInstagramClient(_FaultInjector):
+    """
+    instagrapi Client yerine geçen sahte istemci. Yüklenen görseller okunmaz, sadece
+    başlıkları saklanır; `user_medias` en yeni paylaşımları döndürür.
+    """
+
+    _ids = itertools.count(1_000_000)
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, spike_rate=0.0, spike_latency=0.0):
+        super().__init__(latency, jitter, failure_rate, seed, spike_rate, spike_latency)
+        self.user_id = 1
+        self.media = []
+        self.stories = []
+        self._settings = {'uuids': {}}
+
+    def login(self, username, password):
+        return True
+
+    def load_settings(self, path):
+        return self._settings
+
+    def dump_settings(self, path):
+        return True
+
+    def get_settings(self):
+        return dict(self._settings)
+
+    def set_uuids(self, uuids):
+        self._settings['uuids'] = uuids
+
+    def _publish(self, caption):
+        if self.delay_and_fail():
+            raise ConnectionError("Sahte Instagram: yükleme başarısız")
+        media = FakeMedia(next(self._ids), caption)
+        with self._lock:
+            self.media.append(media)
+        return media
+
+    def photo_upload(self, path, caption=''):
+        return self._publish(caption)
+
+    def album_upload(self, paths, caption=''):
+        return self._publish(caption)
+
+    def photo_upload_to_story(self, path, caption=''):
+        if self.delay_and_fail():
+            raise ConnectionError("Sahte Instagram: hikaye yüklemesi başarısız")
+        media = FakeMedia(next(self._ids), caption)
+        with self._lock:
+            self.stories.append(media)
+        return media
+
+    def user_medias(self, user_id, amount=20):
+        with self._lock:
+            return list(reversed(self.media[-amount:]))
+
+
+def offline_config(base=None, **overrides):
+    """Canlı servislere gitmeyen, geçici dosyalar kullanan bir Config alt sınıfı döndürür."""
+    if base is None:
+        from config import Config as base
+
+    work_dir = tempfile.mkdtemp(prefix='deprem-bench-')
+    attributes = {
+        'SUPABASE_URL': None,
+        'SUPABASE_ANON_KEY': None,
+        'INSTAGRAM_USERNAME': 'bench',
+        'INSTAGRAM_PASSWORD': 'bench',
+        'INSTAGRAM_SESSION_PATH': '',
+        'LOCAL_DB_PATH': '',
+        'POSTED_CACHE_PATH': '',
+        'OUTBOX_PATH': os.path.join(work_dir, 'posting_outbox.jsonl'),
+        'POSTS_PER_HOUR': 10 ** 9,
+        'POST_BURST': 10 ** 9,
+        'METRICS_PORT': 0,
+        'WEBHOOK_URLS': '',
+        'COORDINATION_BACKEND': '',
+        'TELEGRAM_BOT_TOKEN': None,
+        'WORK_DIR': work_dir,
+    }
+    attributes.update(overrides)
+    return type('OfflineConfig', (base,), attributes)
+
+
+def build_offline_runtime(config, kandilli_url, supabase=None, instagram=None, local_store=None):
+    """
+    Sahte servislerle çalışan bir BotRuntime kurar. `supabase` ve `instagram` verilmezse
+    gecikmesiz sahte istemciler kullanılır. `local_store` verilirse yerel SQLite deposu da devrededir.
+    """
+    from bot_runtime import BotRuntime
+    from database import EarthquakeDatabase
+    from instagram_poster import InstagramPoster
+    from kandilli_scraper import KandilliScraper
+    from http_client import ResilientHttpClient
+
+    supabase = supabase if supabase is not None else InMemorySupabase()
+    instagram = instagram if instagram is not None else FakeInstagramClient()
+
+    runtime = BotRuntime(config)
+    runtime._scraper = KandilliScraper(
+        kandilli_url, ResilientHttpClient.from_config(config), config.KANDILLI_LOOKBACK_MINUTES
+    )
+    runtime._db = EarthquakeDatabase(
+        url=None, key=None, posted_cache=runtime.posted_cache, local_store=local_store, client=supabase
+    )
+    runtime._poster = InstagramPoster(
+        config.INSTAGRAM_USERNAME, config.INSTAGRAM_PASSWORD, client_factory=lambda: instagram
+    )
+    return runtime
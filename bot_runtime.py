@@ -0,0 +1,868 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+# Kendi yazdığımız modülleri import edelim
+from database import EarthquakeDatabase, PostedIdCache
+from local_store import LocalEarthquakeStore, BackgroundSyncer
+from outbox import PostingOutbox, PENDING, UPLOADED
+from instagram_poster import InstagramPoster
+from publishers import Publication, ImageLease, build_sinks
+from coordination import Coordinator
+from health import Watchdog, StageTimeout, call_with_deadline, stage_deadlines, when_finished
+from profiling import CycleProfiler
+from log_pipeline import RATE_LIMITED, log_context, record_stage
+from posting_scheduler import PostingScheduler, TokenBucket
+from adaptive_polling import AdaptivePoller
+from dedup_index import SpatioTemporalIndex
+from swarm import SwarmAggregator
+from gazetteer import enrich
+import metrics
+from kandilli_parser import kandilli_now
+from config import Config
+
+
+def post_events(earthquake: dict) -> list:
+    """Bir paylaşımın kapsadığı tüm depremler: kendisi, albümdeki ve başlığa eklenen depremler."""
+    return [earthquake] + earthquake.get('swarm_events', []) + earthquake.get('merged_events', [])
+
+
+def discard_images(images: dict):
+    """Paylaşım için çizilmiş tüm geçici görsel dosyalarını siler."""
+    for paths in images.values():
+        for image_path in paths:
+            os.remove(image_path)
+
+
+def _caption_markers(location, earthquake_time):
+    """Bir depremin paylaşım başlığında mutlaka geçen metinler (Instagram'da paylaşım aramak için)."""
+    # Albüm ve birleştirilmiş deprem satırlarında tarih olmadan saat yazılır
+    return [location, earthquake_time.strftime('%H:%M:%S')]
+
+
+def build_caption(earthquake: dict) -> str:
+    """Deprem büyüklüğüne göre Instagram başlığını (caption) oluşturur."""
+    magnitude = earthquake['magnitude']
+
+    swarm_events = earthquake.get('swarm_events')
+    if swarm_events:
+        caption_text = f"🚨 DEPREM FIRTINASI: {len(swarm_events) + 1} deprem\n\n"
+        caption_text += "En büyüğü:\n"
+    else:
+        caption_text = f"🚨 DEPREM BİLDİRİMİ\n\n"
+    caption_text += f"📍 Lokasyon: {earthquake['location']}\n"
+    if earthquake.get('nearest_place'):
+        caption_text += f"🏘️ {earthquake['nearest_place']}\n"
+    caption_text += f"📊 Büyüklük: M {magnitude}\n"
+    caption_text += f"📏 Derinlik: {earthquake['depth']} km\n"
+    caption_text += f"📅 Tarih: {earthquake['earthquake_time'].strftime('%d.%m.%Y %H:%M:%S')}\n\n"
+    if swarm_events:
+        caption_text += "📋 Albümdeki depremler:\n"
+        for member in sorted([earthquake] + swarm_events, key=lambda eq: eq['earthquake_time']):
+            caption_text += f"• {member['earthquake_time'].strftime('%H:%M:%S')} M {member['magnitude']} {member['location']}\n"
+        caption_text += "\n"
+
+    caption_text += "ℹ️ Kandilli Rasathanesi verisidir.\n\n"
+
+    # Yoğun dönemlerde ayrıca paylaşılmayan küçük depremler
+    merged_events = earthquake.get('merged_events')
+    if merged_events:
+        caption_text += "🕒 Bu sırada kaydedilen diğer depremler:\n"
+        for merged in sorted(merged_events, key=lambda eq: eq['earthquake_time']):
+            caption_text += f"• {merged['earthquake_time'].strftime('%H:%M:%S')} M {merged['magnitude']} {merged['location']}\n"
+        caption_text += "\n"
+
+    if 4 <= magnitude < 5:
+        caption_text += "⚠️ Sevdiklerinize ulaşmakta zorlanıyorsanız, internet tabanlı mesajlaşma uygulamalarını kullanmayı deneyin.\n\n"
+    elif 5 <= magnitude < 6:
+        caption_text += "⚠️ Lütfen sığınaklara veya güvenli toplanma alanlarına gidin.\n"
+        caption_text += "⚠️ Sevdiklerinize ulaşmakta zorlanıyorsanız, internet tabanlı mesajlaşma uygulamalarını kullanmayı deneyin.\n\n"
+    elif magnitude >= 6:
+        caption_text += "⚠️ ACİL DURUM UYARISI! Lütfen güvenli bir yerde kalın ve konumunuzu güvendiğiniz kişilerle paylaşın.\n"
+        caption_text += "⚠️ Sığınaklara veya güvenli toplanma alanlarına gidin.\n"
+        caption_text += "⚠️ Sevdiklerinize ulaşmakta zorlanıyorsanız, internet tabanlı mesajlaşma uygulamalarını kullanın.\n\n"
+
+    caption_text += "#deprem #kandilli #türkiye #earthquake"
+    return caption_text
+
+
+class BotRuntime:
+    """
+    Botun uzun ömürlü çalışma ortamı.
+
+    Scraper, veritabanı ve Instagram nesneleri ilk ihtiyaç duyulduğunda bir kez oluşturulur
+    ve döngüler arasında yeniden kullanılır. Oluşturma başarısız olursa bir sonraki döngüde
+    tekrar denenir.
+
+    `clock` (saniye) ve `now` (Kandilli saatiyle şimdiki zaman) verilirse zamanlayıcı, hız sınırı,
+    kontrol sıklığı ve tekrar kontrol indeksi bu saatlere göre çalışır; geçmiş depremleri
+    hızlandırılmış zamanda yeniden oynatmak için kullanılır.
+
+    Boru hattında kontrol ve kayıt aşamaları ayrı iş parçacıklarında aynı anda çalışır. Bekleyen
+    depremler, zamanlayıcı, fırtına toplayıcı, tekrar kontrol indeksi ve yükleme kayıtları sadece
+    `_state_lock` tutulurken değiştirilir; kilit ağ ve disk çağrıları sırasında tutulmaz.
+    """
+
+    def __init__(self, config=Config, clock=time.monotonic, now=kandilli_now):
+        self.config = config
+        self.now = now
+        self.posted_cache = PostedIdCache(
+            max_size=config.POSTED_CACHE_MAX_SIZE,
+            ttl_seconds=config.POSTED_CACHE_TTL_HOURS * 3600,
+            path=config.POSTED_CACHE_PATH or None,
+        )
+        self._scraper = None
+        self._db = None
+        self._poster = None
+        self._sinks = None
+        self._syncer = None
+        self._coordinator = None
+        self._coordinator_ready = False
+        # Yükleme ile veritabanı kaydı arasındaki çökme boşluğunu kapatan günlük
+        self.outbox = PostingOutbox(config.OUTBOX_PATH) if config.OUTBOX_PATH else None
+        self._outbox_recovered = False
+        # Aşağıdaki bellek içi durumu iş parçacıkları arasında koruyan kilit (bkz. sınıf açıklaması)
+        self._state_lock = threading.Lock()
+        # Artımlı modda henüz paylaşılamamış depremler bir sonraki döngüde tekrar denenir
+        self._pending = {}
+        # Paylaşım sırası (büyüklük ve yeniliğe göre) ve hız sınırı
+        self.scheduler = PostingScheduler(
+            max_backlog=config.SCHEDULER_MAX_BACKLOG,
+            stale_age_seconds=config.SCHEDULER_STALE_AGE_MINUTES * 60,
+            stale_max_magnitude=config.SCHEDULER_STALE_MAX_MAGNITUDE,
+            policy=config.SCHEDULER_STALE_POLICY,
+            clock=clock,
+        )
+        self.rate_limiter = TokenBucket(config.POSTS_PER_HOUR, config.POST_BURST, clock=clock)
+        # Bir sonraki Kandilli kontrolüne kadar beklenecek süre
+        self.poller = AdaptivePoller.from_config(config, clock=clock, now=now)
+        # Revize edilen depremlerin tekrar paylaşılmaması için yakın zamanda paylaşılanların indeksi
+        self.dedup_index = self._new_dedup_index()
+        self._dedup_index_ready = False
+        # Artçı fırtınasında yakın depremleri tek albümde toplar
+        self.swarm = SwarmAggregator.from_config(config, clock=clock) if config.SWARM_ENABLED else None
+        # Çizilecek görsel biçimleri; hikaye, akış görseli paylaşıldıktan sonra arka planda yüklenir
+        self.post_formats = ('feed', 'story') if config.POST_STORY else ('feed',)
+        self._story_executor = None
+        # Aşama süre sınırları ve takılan döngüleri bulan bekçi (iş parçacığını main başlatır)
+        self.stage_deadlines = stage_deadlines(config)
+        self.watchdog = Watchdog.from_config(config, on_stall=self.restart_clients, ready_check=self.readiness)
+        # Yüklenmekte ya da yüklenip commit ile kaydedilmeyi bekleyen kandilli_id'ler (günlük kurtarması dokunmaz)
+        self._uploading = set()
+        # İstendiğinde (SIGUSR1, --profile-cycles) sonraki döngüleri profiller
+        self.profiler = CycleProfiler.from_config(config)
+        self._abandoned_uploads = []  # Süre sınırını aşıp bırakılan yüklemeler: (iş parçacığı, zaman)
+
+    @property
+    def scraper(self) -> 'KandilliScraper':
+        if self._scraper is None:
+            # requests sadece canlı kaynaktan çekerken yüklenir (yeniden oynatmada sahte kaynak verilir)
+            from kandilli_scraper import KandilliScraper
+            from http_client import ResilientHttpClient
+
+            self._scraper = KandilliScraper(
+                self.config.KANDILLI_URL, ResilientHttpClient.from_config(self.config), self.config.KANDILLI_LOOKBACK_MINUTES
+            )
+        return self._scraper
+
+    @property
+    def db(self) -> EarthquakeDatabase:
+        if self._db is None:
+            local_store = LocalEarthquakeStore(self.config.LOCAL_DB_PATH) if self.config.LOCAL_DB_PATH else None
+            db = EarthquakeDatabase(
+                url=self.config.SUPABASE_URL,
+                key=self.config.SUPABASE_ANON_KEY,
+                posted_cache=self.posted_cache,
+                local_store=local_store,
+            )
+            if local_store is not None and db.supabase is not None:
+                # Açılışta eşitle, ardından yeni kayıtları arka planda toplu gönder
+                db.reconcile(self.now() - timedelta(hours=self.config.LOCAL_DB_RECONCILE_HOURS))
+                self._syncer = BackgroundSyncer(
+                    db, self.config.SYNC_INTERVAL_SECONDS, self.config.SYNC_BATCH_SIZE
+                ).start()
+            self._db = db
+        return self._db
+
+    @property
+    def poster(self) -> InstagramPoster:
+        if self._poster is None:
+            self._poster = InstagramPoster(
+                self.config.INSTAGRAM_USERNAME,
+                self.config.INSTAGRAM_PASSWORD,
+                session_path=self.config.INSTAGRAM_SESSION_PATH or None,
+            )
+        return self._poster
+
+    @property
+    def sinks(self) -> list:
+        """
+        Instagram dışındaki yayın kanalları (webhook, Telegram); her birinin kendi kuyruğu vardır.
+        Instagram neden kuyruğa verilmez: bkz. publishers.Publisher.
+        """
+        if self._sinks is None:
+            self._sinks = build_sinks(self.config)
+        return self._sinks
+
+    @property
+    def coordinator(self) -> Coordinator:
+        """Birden fazla örnek çalışırken lider kirası ve deprem talepleri; koordinasyon kapalıysa None."""
+        if not self._coordinator_ready:
+            supabase = self.db.supabase if self.config.COORDINATION_BACKEND == 'supabase' else None
+            coordinator = Coordinator.from_config(self.config, supabase=supabase)
+            self._coordinator = coordinator.start() if coordinator is not None else None
+            self._coordinator_ready = True
+        return self._coordinator
+
+    def is_active(self):
+        """Bu örnek paylaşım yapabilir mi? Koordinasyon kapalıysa her zaman, açıksa sadece liderken."""
+        coordinator = self.coordinator
+        return coordinator is None or coordinator.is_leader()
+
+    def next_delay(self):
+        """Bir sonraki kontrole kadar beklenecek süre; yedek örnek liderliği sık aralıklarla yoklar."""
+        if not self.is_active():
+            return self.coordinator.renew_seconds
+        return self.poller.next_delay()
+
+    def readiness(self):
+        """Hazırlık kontrolü: son Kandilli çekmesi başarısız olmadıysa hazırdır."""
+        return self._scraper is None or self._scraper.last_fetch_ok is not False
+
+    def restart_clients(self, stages):
+        """
+        Süre sınırını aşan ya da takılan aşamaların istemcilerini yenileriyle değiştirir; asılı
+        kalan çağrılar eski istemcide biter ve sonuçları atılır. Bilinmeyen aşamalarda hepsi yenilenir.
+        """
+        stages = set(stages)
+        restart_all = not stages <= {'fetch', 'db_lookup', 'db_save', 'upload', 'render'}
+        if self._scraper is not None and (restart_all or 'fetch' in stages):
+            self._scraper = self._scraper.restarted()
+        if self._db is not None and (restart_all or stages & {'db_lookup', 'db_save'}):
+            self._db.reset()
+        if self._poster is not None and (restart_all or 'upload' in stages):
+            self._poster.reset()
+        logging.warning(f"İstemciler yeniden kuruldu: {', '.join(sorted(stages))}")
+
+    def _run_stage(self, stage, func, *args):
+        """
+        `func`'ı bekçinin izlediği `stage` aşaması olarak, Config'te süre sınırı varsa o sınırla
+        çalıştırır. Süre dolarsa aşamanın istemcileri yeniden kurulur ve StageTimeout fırlatılır.
+        """
+        seconds = self.stage_deadlines.get(stage)
+        started = time.perf_counter()
+        with self.watchdog.track(stage), self.profiler.span(stage), log_context(stage=stage):
+            try:
+                # cProfile sadece döngü iş parçacığını görür: profillenirken aşama burada çalışır
+                if not seconds or self.profiler.deterministic:
+                    return func(*args)
+                return call_with_deadline(stage, seconds, func, *args)
+            except StageTimeout as e:
+                metrics.STAGE_TIMEOUTS.inc(stage=stage)
+                logging.error(f"{e}, çağrı bırakılıyor.")
+                self.restart_clients([stage])
+                raise
+            finally:
+                record_stage(stage, time.perf_counter() - started)
+
+    def close(self):
+        """
+        Bekçiyi durdurur, lider kirasını bırakır (yedek örnek beklemeden devralır), ek kanalları
+        kapatır ve sürmekte olan hikaye yüklemesini bekler. Son olarak bekleyen yerel kayıtları
+        Supabase'e gönderir, yerel veritabanını ve paylaşım günlüğünü kapatır, paylaşılan ID önbelleğini yazar.
+        """
+        self.watchdog.stop()
+        if self._coordinator is not None:
+            self._coordinator.stop()
+        for sink in self._sinks or ():
+            sink.close()
+        if self._story_executor is not None:
+            # Sürmekte olan hikaye yüklemesi bitince görselleri silinir
+            self._story_executor.shutdown(wait=True)
+
+        synced = True
+        if self._syncer is not None:
+            synced = self._syncer.stop()
+            if not synced:
+                logging.warning("Supabase senkronizasyonu zamanında bitmedi, yerel veritabanı açık bırakılıyor.")
+            self._syncer = None
+        if self._db is not None and synced:
+            self._db.close()
+        if self.outbox:
+            self.outbox.close()
+        self.posted_cache.save()
+
+    def run_cycle(self):
+        """
+        Tek bir kontrol döngüsü: Depremleri kontrol eder ve yenilerini Instagram'a gönderir.
+        Birden fazla örnek çalışıyorsa sadece lider örnek kontrol yapar.
+        """
+        self.watchdog.beat()
+        if not self.is_active():
+            logging.debug("Yedek örnek: lider kirası başka bir örnekte, döngü atlanıyor.")
+            return
+
+        with self.profiler.cycle():
+            self._check_and_post()
+
+    def _check_and_post(self):
+        logging.info("--- Yeni deprem kontrol döngüsü başlatıldı ---")
+
+        try:
+            new_earthquakes_to_post = self.collect_new_earthquakes()
+            if not new_earthquakes_to_post:
+                return
+
+            # Instagram'a giriş yapılamadıysa, paylaşımı bu döngüde atla (giriş gerektikçe yapılır)
+            if not self.ensure_poster():
+                logging.error("Instagram'a giriş yapılamadığı için bu döngü atlanıyor.")
+                return
+
+            # Paylaşılacak depremleri büyüklük ve yeniliğe göre sırala
+            self.enqueue(new_earthquakes_to_post)
+            self.skip_dropped()
+
+            while len(self.scheduler):
+                # Instagram'dan ban yememek için jeton kovasından izin bekle
+                while not self.rate_limiter.try_consume():
+                    self.watchdog.beat()
+                    time.sleep(self.rate_limiter.wait_time())
+
+                earthquake = self.next_post()
+                if earthquake is None:
+                    continue
+                # Bu paylaşımın logları deprem ID'si ve aşama süreleriyle yazılır
+                with log_context(event_id=earthquake['kandilli_id']):
+                    self.post(earthquake)
+
+        except Exception as e:
+            metrics.ERRORS.inc(stage='cycle')
+            logging.critical(f"!!! ANA DÖNGÜDE KRİTİK HATA: {e}", exc_info=True)
+
+        logging.info("--- Kontrol döngüsü tamamlandı ---")
+
+    def post(self, earthquake):
+        """Sıradaki paylaşımı talep eder, görsellerini çizer, yükler ve kaydeder."""
+        earthquake = self.claim(earthquake)
+        if earthquake is None:
+            return
+        images = self.render_image(earthquake)
+        if not images:
+            self.release_claim(earthquake)
+            return
+
+        if self.publish(earthquake, images):
+            self.commit(earthquake)
+
+    def collect_new_earthquakes(self):
+        """
+        Kandilli'den depremleri çeker, büyüklüğe göre filtreler ve henüz paylaşılmamış olanları
+        en yeniden eskiye sıralı döndürür.
+        """
+        # Önceki döngüde öğrenilen ve paylaşılan ID'ler döngü başına bir kez diske yazılır
+        self.posted_cache.save()
+
+        # 1. Kandilli'den son depremleri çek
+        latest_earthquakes = self.fetch_earthquakes()
+
+        if not latest_earthquakes and not self._pending:
+            logging.info("Kandilli'den yeni veri çekilemedi veya deprem yok.", extra=RATE_LIMITED)
+            return []
+
+        # 2. Sadece belirli büyüklük ve üzerindeki depremleri filtrele
+        significant_earthquakes = self._with_pending(
+            eq for eq in latest_earthquakes if eq['magnitude'] >= self.config.MIN_MAGNITUDE
+        )
+
+        if not significant_earthquakes:
+            logging.info(
+                "%s büyüklüğünde veya daha büyük yeni deprem bulunamadı.", self.config.MIN_MAGNITUDE, extra=RATE_LIMITED
+            )
+            return []
+
+        logging.info(
+            "%d adet %s+ büyüklüğünde deprem bulundu.", len(significant_earthquakes), self.config.MIN_MAGNITUDE,
+            extra=RATE_LIMITED,
+        )
+
+        # 3. Bu depremlerden hangilerinin daha önce paylaşılmadığını tek seferde kontrol et
+        #    (yüklenmekte ya da kaydedilmeyi bekleyen depremler de paylaşılmış sayılır)
+        self.recover_outbox()
+        self.recover_claims()
+        in_flight = self.outbox.in_flight_ids() if self.outbox else set()
+        candidates = [eq['kandilli_id'] for eq in significant_earthquakes if eq['kandilli_id'] not in in_flight]
+        try:
+            with metrics.DEDUP_SECONDS.time():
+                unposted_ids = self._run_stage('db_lookup', self.db.filter_unposted, candidates)
+        except StageTimeout:
+            # Paylaşılıp paylaşılmadığı bilinmeyen depremler bu döngüde paylaşılmaz
+            unposted_ids = set()
+        new_earthquakes_to_post = [eq for eq in significant_earthquakes if eq['kandilli_id'] in unposted_ids]
+        metrics.DUPLICATES_SKIPPED.inc(len(significant_earthquakes) - len(new_earthquakes_to_post), reason='posted')
+        self._forget_posted()
+
+        # Başka bir örneğin talep ettiği (paylaştığı ya da paylaşmakta olduğu) depremler
+        if self.coordinator is not None and new_earthquakes_to_post:
+            unclaimed = self.coordinator.filter_unclaimed(eq['kandilli_id'] for eq in new_earthquakes_to_post)
+            metrics.DUPLICATES_SKIPPED.inc(len(new_earthquakes_to_post) - len(unclaimed), reason='claimed')
+            new_earthquakes_to_post = [eq for eq in new_earthquakes_to_post if eq['kandilli_id'] in unclaimed]
+
+        # 4. Kandilli'nin revize ettiği (ID'si değişmiş) depremleri ayıkla
+        with self.profiler.span('revisions'):
+            new_earthquakes_to_post = self._resolve_revisions(new_earthquakes_to_post)
+
+        if not new_earthquakes_to_post:
+            logging.info("Bulunan tüm önemli depremler daha önce paylaşılmış.", extra=RATE_LIMITED)
+            return []
+
+        # 5. Kandilli'nin kısa yer adlarını en yakın yerleşime göre tarifle zenginleştir
+        if self.config.GAZETTEER_ENABLED:
+            with self.profiler.span('gazetteer'):
+                for earthquake in new_earthquakes_to_post:
+                    enrich(earthquake, self.config.GAZETTEER_MAX_DISTANCE_KM)
+
+        logging.info("Paylaşılacak %d yeni deprem var!", len(new_earthquakes_to_post), extra=RATE_LIMITED)
+        return new_earthquakes_to_post
+
+    def enqueue(self, earthquakes):
+        """
+        Depremleri paylaşım zamanlayıcısına ekler. Devam eden bir artçı fırtınasındaki küçük
+        depremler kısa süre bekletilir; süresi dolanlar da eklenir. Eklenen depremleri döndürür.
+        """
+        with self._state_lock:
+            ready = self.swarm.admit(earthquakes) if self.swarm is not None else list(earthquakes)
+            return [earthquake for earthquake in ready if self.scheduler.push(earthquake)]
+
+    def next_post(self):
+        """Sıradaki paylaşımı döndürür; fırtınadaysa kuyruktaki yakın depremler albüme eklenir."""
+        with self._state_lock:
+            earthquake = self.scheduler.pop()
+            if earthquake is not None and self.swarm is not None:
+                earthquake = self.swarm.group(earthquake, self.scheduler)
+            return earthquake
+
+    def claim(self, earthquake):
+        """
+        Koordinasyon açıksa paylaşımın depremlerini görsel çizilmeden önce bu örnek adına talep eder.
+        Başka örneğin talep ettiği depremler albümden ve başlıktan çıkarılır; ana deprem talep
+        edilemezse (başka örnekte ya da bu örnek lider değil) None döner.
+        """
+        if earthquake is None or self.coordinator is None:
+            return earthquake
+        owned = self.coordinator.claim(post_events(earthquake))
+        if earthquake['kandilli_id'] not in owned:
+            if owned:
+                self.coordinator.release(owned)
+            logging.info("Deprem talep edilemedi (başka örnekte ya da lider değil), atlanıyor: %s", earthquake['location'])
+            return None
+        for key in ('swarm_events', 'merged_events'):
+            if key in earthquake:
+                earthquake[key] = [eq for eq in earthquake[key] if eq['kandilli_id'] in owned]
+        return earthquake
+
+    def release_claim(self, earthquake):
+        """
+        Yüklemeye geçmeden vazgeçilen paylaşımın taleplerini bırakır; depremler stale talep
+        süresini beklemeden sonraki kontrolde (ya da başka örnekte) tekrar paylaşılabilir.
+        """
+        if self.coordinator is not None:
+            self.coordinator.release([eq['kandilli_id'] for eq in post_events(earthquake)])
+
+    def ensure_poster(self):
+        """Instagram istemcisinin hazır olduğundan emin olur, gerekirse giriş yapar."""
+        poster = self.poster
+        return bool(poster.client) or poster.login()
+
+    def render_image(self, earthquake):
+        """
+        Paylaşımın görsellerini benzersiz geçici dosyalara çizer ve biçim adından ('feed', 'story')
+        yollara bir sözlük döndürür, başarısızsa None döner. Albümlerde birden fazla akış görseli olur.
+        """
+        logging.info("Yeni deprem paylaşılıyor: %s - M%s", earthquake['location'], earthquake['magnitude'])
+        try:
+            with metrics.RENDER_SECONDS.time():
+                images = self._run_stage('render', self.poster.create_post_images, earthquake, self.post_formats)
+        except StageTimeout:
+            images = None
+        if not images:
+            metrics.ERRORS.inc(stage='render')
+            logging.error("Görsel oluşturulamadı, bu deprem atlanıyor.")
+        return images
+
+    def publish(self, earthquake, images):
+        """
+        Akış görsellerini deprem başlığıyla Instagram'a (birden fazlaysa albüm olarak) gönderir.
+        Aynı görseller ve başlık, Instagram yüklemesi başlamadan ek kanalların kuyruklarına da
+        verilir; kanallar kendi iş parçacıklarında gönderir, Instagram'ı beklemez ve bekletmez.
+        Hikaye görseli varsa, akış paylaşımı medya ID'si döndükten sonra ayrı bir iş parçacığında
+        yüklenir: akış yüklemesi başarısız olup deprem tekrar paylaşılırsa aynı hikaye ikinci kez
+        gitmez. Hikayenin başarısız olması paylaşımı etkilemez. Geçici dosyalar tüm kanallar
+        (hikaye dahil) işini bitirince silinir.
+        Medya ID'sini, Instagram'da paylaşılamadıysa None döndürür. Yüklemeden önce ve sonra
+        günlüğe yazılır.
+
+        Yükleme süre sınırını aşarsa da None döner, ancak deprem günlükte "pending" ve talep
+        açık kalır: bırakılan yükleme arka planda bitebileceği için deprem, Instagram'da
+        aranıp doğrulanana kadar (bkz. recover_outbox) tekrar paylaşılmaz. Bırakılan yükleme
+        görselleri okumaya devam edebileceği için görseller o iş parçacığı bitince silinir.
+
+        Medya ID'si döndüğünde depremler, kaydı yapacak `commit` bitene kadar yüklenmekte sayılır;
+        arada çalışan recover_outbox aynı "uploaded" kaydı ikinci kez kaydetmez.
+        """
+        events = post_events(earthquake)
+        ids = [eq['kandilli_id'] for eq in events]
+        publication = Publication(earthquake, build_caption(earthquake), images)
+        story = images.get('story')
+
+        sinks = self.sinks
+        lease = ImageLease(images, len(sinks) + 1 + bool(story), discard_images)
+        for sink in sinks:
+            if not sink.submit(publication, lease.release):
+                lease.release()
+
+        media_id = None
+        abandoned = None
+        with self._state_lock:
+            self._uploading.update(ids)
+        try:
+            if self.outbox:
+                self.outbox.mark_pending(events)
+            with metrics.UPLOAD_SECONDS.time():
+                media_id = self._run_stage('upload', self.poster.publish, publication)
+        except StageTimeout as e:
+            abandoned = e.thread
+            with self._state_lock:
+                self._abandoned_uploads.append((e.thread, time.monotonic()))
+            self._outbox_recovered = False
+            metrics.ERRORS.inc(stage='upload')
+            logging.error(f"Yükleme yanıt vermedi, Instagram'da doğrulanana kadar tekrar paylaşılmayacak: {earthquake['location']}")
+            return None
+        finally:
+            if not media_id:
+                with self._state_lock:
+                    self._uploading.difference_update(ids)
+                if story:
+                    lease.release()
+            when_finished(abandoned, lease.release)
+
+        if not media_id:
+            metrics.ERRORS.inc(stage='upload')
+            if self.outbox:
+                self.outbox.release(ids)
+            if self.coordinator is not None:
+                self.coordinator.release(ids)
+            logging.error(f"Deprem paylaşılamadı, veritabanına kaydedilmeyecek: {earthquake['location']}")
+            return None
+
+        if self.outbox:
+            self.outbox.mark_uploaded(ids, media_id)
+        if self.coordinator is not None:
+            self.coordinator.mark_posted(ids, media_id)
+        if story:
+            self._story_uploader().submit(self._upload_story, story[0], lease.release)
+        return media_id
+
+    def _story_uploader(self):
+        if self._story_executor is None:
+            self._story_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='story')
+        return self._story_executor
+
+    def _upload_story(self, image_path, on_done):
+        abandoned = None
+        try:
+            story_id = self._run_stage('upload', self.poster.upload_story, image_path)
+        except StageTimeout as e:
+            story_id, abandoned = None, e.thread
+        except Exception as e:
+            story_id = None
+            logging.error(f"Hikaye yüklemesi sırasında hata: {e}")
+        finally:
+            when_finished(abandoned, on_done)
+        if story_id:
+            metrics.STORIES_POSTED.inc()
+        else:
+            metrics.ERRORS.inc(stage='story_upload')
+        return story_id
+
+    def commit(self, earthquake):
+        """Paylaşılan depremi (ve albümdeki ya da başlığına eklenen depremleri) veritabanına kaydeder ve bekleyenlerden çıkarır."""
+        metrics.EVENTS_POSTED.inc(1 + len(earthquake.get('swarm_events', [])))
+        if earthquake.get('swarm_events'):
+            metrics.SWARM_ALBUMS_POSTED.inc()
+        metrics.DETECTION_TO_POST_SECONDS.set((self.now() - earthquake['earthquake_time']).total_seconds())
+
+        committed = []
+        events = post_events(earthquake)
+        try:
+            for eq in events:
+                try:
+                    with metrics.DB_SAVE_SECONDS.time():
+                        saved = self._run_stage('db_save', self.db.save_earthquake, eq)
+                except StageTimeout:
+                    # Bırakılan kayıt arka planda tamamlanabilir: günlük veritabanıyla yeniden karşılaştırılır
+                    self._outbox_recovered = False
+                    saved = False
+                if saved:
+                    committed.append(eq['kandilli_id'])
+                else:
+                    metrics.ERRORS.inc(stage='db_save')
+            if self.outbox and committed:
+                # Kaydedilemeyenler günlükte "uploaded" kalır ve sonraki döngüde tekrar kaydedilir
+                self.outbox.mark_committed(committed)
+        finally:
+            with self._state_lock:
+                for eq in events:
+                    self._pending.pop(eq['kandilli_id'], None)
+                    self.dedup_index.add(eq)
+                if self.swarm is not None:
+                    self.swarm.record_posted(events)
+                # Günlükte kapanmamış olanlar artık günlük kurtarmasına bırakılır
+                self._uploading.difference_update(eq['kandilli_id'] for eq in events)
+        if self._syncer is not None:
+            self._syncer.wake()
+        logging.info("Deprem başarıyla paylaşıldı ve veritabanına kaydedildi: %s", earthquake['location'])
+
+    def recover_outbox(self):
+        """
+        Günlükteki açık kayıtları yeniden yüklemeden tamamlar:
+          - "uploaded" kayıtlar veritabanına kaydedilir (her döngüde denenir).
+          - "pending" kayıtlar (açılışta ve süre sınırını aşan bir yüklemeden sonra bir kez)
+            Instagram'daki son paylaşımlarda aranır; bulunursa kaydedilir, bulunmazsa serbest
+            bırakılır. Instagram'a sorulamazsa kayıt açık kalır ve deprem paylaşılmaz.
+            Bırakılan yükleme hâlâ sürüyorsa (en fazla ABANDONED_UPLOAD_GRACE_SECONDS) beklenir.
+        """
+        if not self.outbox:
+            return
+
+        # Yükleyicinin hâlâ üzerinde çalıştığı (yüklenen ya da commit bekleyen) kayıtlara dokunulmaz
+        with self._state_lock:
+            owned = set(self._uploading)
+
+        recovering = not self._outbox_recovered and self._uploads_settled()
+        if recovering:
+            # Kaydı veritabanına ulaşmış ama günlükte kapanmamış olanlar
+            open_ids = self.outbox.in_flight_ids() - owned
+            if open_ids:
+                try:
+                    saved = open_ids - self.db.filter_unposted(open_ids, raise_errors=True)
+                except Exception as e:
+                    logging.warning(f"Paylaşım günlüğü veritabanıyla karşılaştırılamadı, sonra tekrar denenecek: {e}")
+                    return
+                if saved:
+                    self.outbox.mark_committed(saved)
+
+            pending = self.outbox.open_entries(PENDING)
+            if pending:
+                self._verify_pending_uploads(pending)
+
+        uploaded = self.outbox.open_entries(UPLOADED)
+
+        committed = []
+        for kandilli_id, entry in uploaded.items():
+            # Yükleyicinin sahip olduğu ya da bu arada kapanmış kayıtlar atlanır; sahiplik günlük
+            # kapandıktan sonra bırakıldığı için ikisine birden uymayan kaydı commit kaydetmeyecektir
+            with self._state_lock:
+                if kandilli_id in self._uploading or self.outbox.state(kandilli_id) != UPLOADED:
+                    continue
+            earthquake = entry['earthquake']
+            if self.db.save_earthquake(earthquake):
+                with self._state_lock:
+                    self.dedup_index.add(earthquake)
+                    self._pending.pop(kandilli_id, None)
+                committed.append(kandilli_id)
+                logging.info(f"Günlükten kurtarıldı, veritabanına kaydedildi: {earthquake['location']} (medya {entry.get('media_id')})")
+        if committed:
+            self.outbox.mark_committed(committed)
+
+        if recovering:
+            self.outbox.compact()
+            self._outbox_recovered = True
+
+    def _uploads_settled(self):
+        """Süre sınırını aşıp bırakılan yüklemeler bitti mi (ya da beklenecek süre doldu mu)?"""
+        now = time.monotonic()
+        with self._state_lock:
+            self._abandoned_uploads = [
+                (thread, abandoned_at) for thread, abandoned_at in self._abandoned_uploads
+                if thread.is_alive() and now - abandoned_at < self.config.ABANDONED_UPLOAD_GRACE_SECONDS
+            ]
+            return not self._abandoned_uploads
+
+    def _verify_pending_uploads(self, pending):
+        # Şu an yüklenmekte olanlar yarım kalmış sayılmaz
+        with self._state_lock:
+            pending = {kandilli_id: entry for kandilli_id, entry in pending.items() if kandilli_id not in self._uploading}
+        if not pending:
+            return
+        if not self.ensure_poster():
+            logging.warning(f"Instagram'a giriş yapılamadı, {len(pending)} yarım kalmış paylaşım doğrulanamadı.")
+            return
+
+        released = []
+        for kandilli_id, entry in pending.items():
+            earthquake = entry['earthquake']
+            try:
+                media_id = self.poster.find_recent_media(_caption_markers(earthquake['location'], earthquake['earthquake_time']))
+            except Exception as e:
+                logging.warning(f"Yarım kalmış paylaşım doğrulanamadı ({kandilli_id}): {e}")
+                continue
+
+            if media_id:
+                self.outbox.mark_uploaded([kandilli_id], media_id)
+                if self.coordinator is not None:
+                    self.coordinator.mark_posted([kandilli_id], media_id)
+            else:
+                released.append(kandilli_id)
+        if released:
+            logging.info(f"{len(released)} yarım kalmış paylaşım Instagram'da bulunamadı, tekrar paylaşılabilir.")
+            self.outbox.release(released)
+            if self.coordinator is not None:
+                self.coordinator.release(released)
+
+    def recover_claims(self):
+        """
+        Paylaşımı CLAIM_STALE_MINUTES süresinden uzun süredir tamamlanmamış talepleri (talebi alan
+        örnek yükleme sırasında ölmüş olabilir) Instagram'daki son paylaşımlarda arar: bulunursa
+        talep paylaşıldı olarak kapatılır, bulunmazsa serbest bırakılır ve deprem yeniden
+        paylaşılabilir. Instagram'a sorulamazsa talep açık kalır ve deprem paylaşılmaz.
+        """
+        coordinator = self.coordinator
+        if coordinator is None or not coordinator.is_leader():
+            return
+        stale = coordinator.stale_claims()
+        if not stale:
+            return
+        if not self.ensure_poster():
+            logging.warning(f"Instagram'a giriş yapılamadı, {len(stale)} yarım kalmış talep doğrulanamadı.")
+            return
+
+        for claim in stale:
+            markers = _caption_markers(claim['location'], datetime.fromisoformat(claim['earthquake_time']))
+            try:
+                media_id = self.poster.find_recent_media(markers)
+            except Exception as e:
+                logging.warning(f"Yarım kalmış talep doğrulanamadı ({claim['kandilli_id']}): {e}")
+                continue
+            if media_id:
+                coordinator.mark_posted([claim['kandilli_id']], media_id, holder=claim['holder'])
+            else:
+                logging.info(f"Yarım kalmış talep Instagram'da bulunamadı, tekrar paylaşılabilir: {claim['location']}")
+                coordinator.release([claim['kandilli_id']], holder=claim['holder'])
+
+    def skip_dropped(self):
+        """
+        Zamanlayıcının attığı depremleri paylaşılmadı olarak kaydeder, böylece
+        sonraki kontrollerde tekrar kuyruğa girmezler. Atılan depremleri döndürür.
+        """
+        with self._state_lock:
+            dropped = self.scheduler.drain_dropped()
+            for earthquake in dropped:
+                self._pending.pop(earthquake['kandilli_id'], None)
+        # Paylaşılmayan depremler tekrar kontrol indeksine eklenmez: yakınlarındaki depremler
+        # hiç yayımlanmamış bir depremin revizyonu sayılıp atlanmamalı
+        for earthquake in dropped:
+            logging.info("Yoğunluk nedeniyle paylaşılmayacak: %s - M%s", earthquake['location'], earthquake['magnitude'])
+            self.db.save_earthquake(earthquake, posted_to_instagram=False)
+        return dropped
+
+    def _new_dedup_index(self):
+        return SpatioTemporalIndex(
+            time_tolerance_seconds=self.config.DEDUP_TIME_TOLERANCE_SECONDS,
+            distance_km=self.config.DEDUP_DISTANCE_KM,
+            magnitude_tolerance=self.config.DEDUP_MAGNITUDE_TOLERANCE,
+            unmarked_time_tolerance_seconds=self.config.DEDUP_UNMARKED_TIME_TOLERANCE_SECONDS,
+            unmarked_distance_km=self.config.DEDUP_UNMARKED_DISTANCE_KM,
+        )
+
+    def _ensure_dedup_index(self):
+        """İndeksi ilk kullanımda veritabanındaki son paylaşılmış depremlerden kurar, eski kayıtları atar."""
+        since = self.now() - timedelta(hours=self.config.DEDUP_INDEX_RETENTION_HOURS)
+        if not self._dedup_index_ready:
+            try:
+                records = self.db.fetch_recent_earthquakes(since)
+                with self._state_lock:
+                    self.dedup_index.rebuild(records)
+                self._dedup_index_ready = True
+            except Exception as e:
+                logging.warning(f"Tekrar kontrol indeksi veritabanından kurulamadı, sonraki döngüde denenecek: {e}")
+        with self._state_lock:
+            self.dedup_index.prune(since)
+
+    def _resolve_revisions(self, earthquakes):
+        """
+        Paylaşılmış bir depremin revizyonu olan adayları paylaşmak yerine kaydını günceller;
+        geriye gerçekten yeni olan depremleri döndürür.
+
+        Aynı partide başka bir adayın revizyonu olduğu için elenen depremler bekleyenlerde
+        kalır: partide kalan deprem paylaşıldıktan sonra onun revizyonu olarak kaydedilirler.
+        """
+        if not earthquakes:
+            return earthquakes
+        self._ensure_dedup_index()
+
+        unique = SpatioTemporalIndex.dedupe_batch(earthquakes, self._new_dedup_index)
+        metrics.DUPLICATES_SKIPPED.inc(len(earthquakes) - len(unique), reason='revision')
+
+        fresh = []
+        revisions = []
+        with self._state_lock:
+            for eq in unique:
+                original = self.dedup_index.match(eq)
+                if original is None:
+                    fresh.append(eq)
+                else:
+                    self._pending.pop(eq['kandilli_id'], None)
+                    revisions.append((eq, original))
+
+        for eq, original in revisions:
+            logging.info("Revize deprem algılandı, tekrar paylaşılmayacak: %s -> %s", eq['kandilli_id'], original['kandilli_id'])
+            metrics.DUPLICATES_SKIPPED.inc(reason='revision')
+            if not eq.get('is_revised'):
+                # İşaretsiz eşleşme aynı satırın farklı ID'li tekrarıdır; paylaşılmış kayıt değiştirilmez
+                self.posted_cache.add(eq['kandilli_id'])
+                continue
+            if self.db.update_earthquake_revision(original['kandilli_id'], eq):
+                with self._state_lock:
+                    self.dedup_index.update(original['kandilli_id'], eq)
+        return fresh
+
+    def fetch_earthquakes(self):
+        """Ayara göre artımlı ya da tam listeyi çeker ve sonucu kontrol sıklığına yansıtır."""
+        scraper = self.scraper
+        fetch = scraper.get_new_earthquakes if self.config.KANDILLI_INCREMENTAL else scraper.get_latest_earthquakes
+        try:
+            earthquakes = self._run_stage('fetch', fetch)
+        except StageTimeout:
+            self.poller.record_error()
+            return []
+
+        if scraper.last_fetch_ok is False:
+            # Kaynağa ulaşılamadı ("yeni deprem yok" değil): aralığı uzat, devre açıksa
+            # deneme isteğinin zamanından önce tekrar kontrol etme
+            result = getattr(scraper, 'last_result', None)
+            self.poller.record_error(retry_after=result.retry_after if result is not None else 0)
+        else:
+            self.poller.record_success(earthquakes)
+        return earthquakes
+
+    def _with_pending(self, earthquakes):
+        """
+        Yeni depremleri bekleyenlere ekler ve hepsini döndürür. Artımlı modda bir deprem
+        sadece bir kez döndüğü için, paylaşıldığı kesinleşene kadar burada tutulur.
+        """
+        if not self.config.KANDILLI_INCREMENTAL:
+            return list(earthquakes)
+        with self._state_lock:
+            for eq in earthquakes:
+                self._pending[eq['kandilli_id']] = eq
+            pending = list(self._pending.values())
+        return sorted(pending, key=lambda eq: eq['earthquake_time'], reverse=True)
+
+    def _forget_posted(self):
+        """Paylaşıldığı önbellekten anlaşılan depremleri bekleyenlerden çıkarır."""
+        with self._state_lock:
+            for kandilli_id in [k for k in self._pending if k in self.posted_cache]:
+                del self._pending[kandilli_id]
@@ -1,8 +1,34 @@
 import os
-from dotenv import load_dotenv
+import atexit
+
+# python-dotenv yoksa ayarlar sadece ortam değişkenlerinden okunur
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+# .env dosyasını bul ve içindeki değişkenleri yükle (tüm modüller ayarları buradan okur)
+if load_dotenv is not None:
+    load_dotenv()
+
+_log_pipeline = None
+
+
+def configure_logging(level=None, stream=None):
+    """
+    Loglamayı ayarlar. Modüller kendi ayarlarını yapmaz; giriş noktaları bunu bir kez çağırır.
+    Loglar bir kuyruğa atılır ve ayrı bir iş parçacığında (Config.LOG_STYLE'a göre JSON ya da
+    metin olarak) yazılır; log atan iş parçacığı G/Ç beklemez. Kuyrukta kalanlar çıkışta yazılır.
+    Tekrar çağrılırsa mevcut düzeni döndürür.
+    """
+    global _log_pipeline
+    if _log_pipeline is None:
+        from log_pipeline import LogPipeline
+
+        _log_pipeline = LogPipeline.from_config(Config, level=level, stream=stream).start()
+        atexit.register(_log_pipeline.stop)
+    return _log_pipeline
 
-# .env dosyasını bul ve içindeki değişkenleri yükle
-load_dotenv()
 
 class Config:
     """
@@ -11,6 +37,7 @@ class Config:
     # Instagram ayarları
     INSTAGRAM_USERNAME = os.getenv('INSTAGRAM_USERNAME')
     INSTAGRAM_PASSWORD = os.getenv('INSTAGRAM_PASSWORD')
+    INSTAGRAM_SESSION_PATH = os.getenv('INSTAGRAM_SESSION_PATH', 'instagram_session.json')  # instagrapi oturum dosyası
     
     # Supabase ayarları
     SUPABASE_URL = os.getenv('SUPABASE_URL')
@@ -18,7 +45,140 @@ class Config:
     
     # Bot ayarları
     MIN_MAGNITUDE = 4.0  # Paylaşım yapılacak minimum deprem büyüklüğü
-    CHECK_INTERVAL_MINUTES = 5  # Depremleri kontrol etme sıklığı (dakika)
+    CHECK_INTERVAL_MINUTES = 5  # Sakin dönemde depremleri kontrol etme sıklığı (dakika)
+
+    # Uyarlanabilir kontrol sıklığı ayarları
+    FAST_POLL_SECONDS = 25  # Hareketli dönemde kontrol sıklığı (saniye)
+    FAST_POLL_WINDOW_MINUTES = 30  # Tetikleyici depremden sonra hızlı kontrolün süresi (dakika)
+    FAST_POLL_TRIGGER_MAGNITUDE = 4.0  # Tek başına hızlı kontrolü başlatan büyüklük
+    FAST_POLL_CLUSTER_COUNT = 5  # Hızlı kontrolü başlatan küçük deprem kümesindeki en az deprem sayısı
+    FAST_POLL_CLUSTER_MIN_MAGNITUDE = 2.5  # Kümeye sayılan en küçük deprem büyüklüğü
+    FAST_POLL_CLUSTER_WINDOW_MINUTES = 10  # Küme için depremlerin düşmesi gereken zaman aralığı (dakika)
+    POLL_JITTER_RATIO = 0.1  # Kontrol aralığına eklenen rastgele sapma oranı (±)
+    POLL_MAX_BACKOFF_SECONDS = 900  # Kandilli hata verdiğinde en uzun bekleme süresi (saniye)
+
+    # Revize depremler için tekrar kontrol ayarları
+    DEDUP_TIME_TOLERANCE_SECONDS = 90  # REVIZE satırının aynı deprem sayılacağı en büyük zaman farkı (saniye)
+    DEDUP_DISTANCE_KM = 30  # REVIZE satırının aynı deprem sayılacağı en büyük merkez üssü uzaklığı (km)
+    DEDUP_MAGNITUDE_TOLERANCE = 0.6  # Aynı deprem sayılacak en büyük büyüklük farkı
+    DEDUP_UNMARKED_TIME_TOLERANCE_SECONDS = 5  # REVIZE işaretsiz satırlar için zaman farkı (ayrı artçılar elenmesin)
+    DEDUP_UNMARKED_DISTANCE_KM = 10  # REVIZE işaretsiz satırlar için merkez üssü uzaklığı (km)
+    DEDUP_INDEX_RETENTION_HOURS = 48  # İndekste tutulacak paylaşımların yaşı (saat)
+
+    # Paylaşım zamanlayıcısı ayarları (Instagram'dan ban yememek için jeton kovası)
+    POSTS_PER_HOUR = 60  # Saatte en fazla paylaşım sayısı
+    POST_BURST = 3  # Art arda hemen yapılabilecek en fazla paylaşım
+    SCHEDULER_MAX_BACKLOG = 20  # Bu sayının üstünde bekleyen deprem olursa eski küçükler için politika uygulanır
+    SCHEDULER_STALE_AGE_MINUTES = 30  # Kuyrukta bu süreden uzun bekleyen deprem "bayat" sayılır
+    SCHEDULER_STALE_MAX_MAGNITUDE = 5.0  # Bu büyüklüğün altındaki bayat depremler atılabilir/birleştirilebilir
+    SCHEDULER_STALE_POLICY = 'merge'  # 'drop': paylaşmadan atla, 'merge': bir sonraki paylaşımın başlığına ekle
+
+    # Artçı fırtınası albümleri (yakın depremler tek carousel paylaşımında toplanır)
+    SWARM_ENABLED = True
+    SWARM_DISTANCE_KM = 50  # Aynı fırtınaya sayılacak en büyük merkez üssü uzaklığı (km)
+    SWARM_WINDOW_MINUTES = 30  # Aynı fırtınaya sayılacak en büyük zaman farkı (dakika)
+    SWARM_MIN_EVENTS = 3  # Albüm paylaşımı için gereken en az deprem sayısı
+    SWARM_MAX_EVENTS = 9  # Bir albümde toplanacak en fazla deprem sayısı (özet görseliyle 10 görsellik albüm sınırı; en fazla 9)
+    SWARM_HOLD_SECONDS = 120  # Devam eden fırtınada yeni depremlerin birlikte paylaşılmak üzere bekletilme süresi
+    SWARM_HOLD_MAX_MAGNITUDE = 5.0  # Bu büyüklük ve üzerindeki depremler hiç bekletilmez
+
+    # Hikaye (story) paylaşımı: akış görseli paylaşıldıktan sonra 1080x1920 hikaye görseli de paylaşılır
+    POST_STORY = False
+
+    # En yakın yerleşim (gazetteer/tr_settlements.csv): başlık ve görselde "X'in 12 km kuzeyi" yazılır
+    GAZETTEER_ENABLED = True
+    GAZETTEER_MAX_DISTANCE_KM = 50  # Bu uzaklıktan uzak ilçe merkezleri (açık deniz) kullanılmaz
+
+    # Boru hattı (pipeline) ayarları
+    USE_PIPELINE = True  # Çekme, çizme ve yüklemeyi ayrı aşamalarda eşzamanlı çalıştır
+    PIPELINE_UPLOAD_QUEUE_SIZE = 1  # Çizilmiş ve yüklenmeyi bekleyen en fazla görsel
+    PIPELINE_RENDER_WORKERS = 1  # Görsel çizen iş parçacığı/süreç sayısı
+    PIPELINE_RENDER_IN_PROCESSES = False  # True ise görseller ayrı süreçlerde çizilir
+
+    # Yerel veritabanı (SQLite) ayarları (boş yol verilirse doğrudan Supabase kullanılır)
+    LOCAL_DB_PATH = os.getenv('LOCAL_DB_PATH', 'earthquakes_local.db')
+    LOCAL_DB_RECONCILE_HOURS = 7 * 24  # Açılışta Supabase'den alınacak kayıtların yaşı (saat)
+    SYNC_INTERVAL_SECONDS = 15  # Yerel kayıtların Supabase'e gönderilme sıklığı (saniye)
+    SYNC_BATCH_SIZE = 100  # Tek seferde Supabase'e gönderilecek en fazla kayıt
+
+    # Ek yayın kanalları: her paylaşım Instagram'la eşzamanlı olarak bunlara da gönderilir
+    WEBHOOK_URLS = os.getenv('WEBHOOK_URLS', '')  # Virgülle ayrılmış webhook adresleri (boş: kapalı)
+    TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+    WEBHOOK_POSTS_PER_HOUR = 3600  # Webhook başına saatte en fazla gönderim
+    TELEGRAM_POSTS_PER_HOUR = 1200  # Telegram'ın grup başına dakikada ~20 mesaj sınırı
+    SINK_BURST = 5  # Kanal başına art arda hemen yapılabilecek en fazla gönderim
+    SINK_WORKERS = 2  # Kanal başına eşzamanlı gönderim sayısı
+    SINK_MAX_ATTEMPTS = 5  # Bir paylaşımın kanala gönderilmesi için en fazla deneme
+    SINK_RETRY_BASE_SECONDS = 2  # Denemeler arası beklemenin başlangıç değeri (üstel artar)
+    SINK_RETRY_MAX_SECONDS = 300  # Denemeler arası en uzun bekleme (saniye)
+    SINK_TIMEOUT_SECONDS = 10  # Kanal isteklerinin zaman aşımı (saniye)
+
+    # Aşama süre sınırları (saniye, 0: sınırsız). Süresi dolan çağrı arka planda bırakılır ve
+    # ilgili istemci yeniden kurulur; süresi dolan Instagram yüklemesi sonradan Instagram'da doğrulanır.
+    DEADLINE_FETCH_SECONDS = 30  # Kandilli (istemcinin kendi gecikme bütçesi dahil)
+    DEADLINE_DB_LOOKUP_SECONDS = 15  # Paylaşılmış deprem kontrolü
+    DEADLINE_RENDER_SECONDS = 30
+    DEADLINE_UPLOAD_SECONDS = 180
+    DEADLINE_DB_SAVE_SECONDS = 15
+    ABANDONED_UPLOAD_GRACE_SECONDS = 600  # Bırakılan yüklemenin bitmesi en fazla bu kadar beklenir, sonra doğrulanır
+
+    # Bekçi (watchdog) ve sağlık kontrolü: takılan aşamada yığın izleri loglanır, istemciler yeniden kurulur
+    WATCHDOG_INTERVAL_SECONDS = 5
+    WATCHDOG_GRACE_SECONDS = 30  # Aşama süre sınırının üzerine tanınan ek süre
+    WATCHDOG_STALL_SECONDS = 300  # Süre sınırı olmayan aşamalar için takılma süresi
+    WATCHDOG_LIVENESS_SECONDS = 900  # Bu süre boyunca hiç ilerleme olmazsa süreç canlı sayılmaz
+    HEALTH_FILE = os.getenv('HEALTH_FILE', '')  # Durumun JSON olarak yazılacağı dosya (boş: yazılmaz)
+
+    # Loglama: kuyruk üzerinden ayrı iş parçacığında yazılır
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_STYLE = os.getenv('LOG_STYLE', 'json')  # 'json' (satır başına bir JSON nesnesi) ya da 'text'
+    LOG_QUEUE_SIZE = 10000  # Kuyruk doluysa yeni loglar atılır (log atan beklemez)
+    LOG_RATE_BURST = 10  # RATE_LIMITED işaretli bir satırdan pencere başına en fazla bu kadar log (0: sınırsız); hatalar sınırlanmaz
+    LOG_RATE_INTERVAL_SECONDS = 60
+
+    # Profil: SIGUSR1 ya da `main.py run --profile-cycles N` ile sonraki döngüler profillenir
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')  # Profil ve aşama süresi dosyalarının dizini
+    PROFILE_MODE = os.getenv('PROFILE_MODE', 'collapsed')  # 'collapsed' (örnekleme, tüm iş parçacıkları) ya da 'pstats' (cProfile)
+    PROFILE_SIGNAL_CYCLES = 3  # SIGUSR1 gelince profillenecek döngü sayısı
+    PROFILE_SAMPLE_INTERVAL_MS = 5  # Örnekleme aralığı
+
+    # Birden fazla örnek (replika): sadece lider kirasını tutan örnek paylaşım yapar, her deprem
+    # paylaşılmadan önce ortak depoda talep edilir. Her örneğin OUTBOX_PATH'i ayrı olmalıdır.
+    COORDINATION_BACKEND = os.getenv('COORDINATION_BACKEND', '')  # '' (tek örnek), 'sqlite' ya da 'supabase'
+    COORDINATION_DB_PATH = os.getenv('COORDINATION_DB_PATH', 'coordination.db')  # 'sqlite' için ortak dosya
+    INSTANCE_ID = os.getenv('INSTANCE_ID')  # Boşsa makine adı ve süreç numarasından üretilir
+    LEADER_LEASE_SECONDS = 10  # Yenilenmeyen lider kirasının dolma süresi (yedeğin devralma süresi)
+    LEADER_RENEW_SECONDS = 2  # Kiranın yenilenme / yedeğin kirayı deneme sıklığı (saniye)
+    CLAIM_STALE_MINUTES = 10  # Bu süreden uzun tamamlanmayan talepler Instagram'da doğrulanır
+
+    # Paylaşım günlüğü (outbox): yükleme ile veritabanı kaydı arasındaki çökmelere karşı
+    OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'posting_outbox.jsonl')
+
+    # Geçmiş verisiyle doldurma (backfill.py) ayarları
+    BACKFILL_BATCH_SIZE = 500  # Tek istekte veritabanına yazılacak en fazla kayıt
+
+    # Paylaşılan ID önbelleği ayarları (boş yol verilirse diske yazılmaz)
+    POSTED_CACHE_PATH = os.getenv('POSTED_CACHE_PATH', 'posted_ids_cache.json')
+    POSTED_CACHE_MAX_SIZE = 5000  # Önbellekte tutulacak en fazla ID sayısı
+    POSTED_CACHE_TTL_HOURS = 7 * 24  # Bir ID'nin önbellekte kalma süresi (saat)
     
+    # Metrik uç noktası (port 0 verilirse sunucu başlatılmaz)
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+
     # Kandilli ayarları
-    KANDILLI_URL = "http://www.koeri.boun.edu.tr/scripts/lst0.asp"
\ No newline at end of file
+    KANDILLI_URL = "http://www.koeri.boun.edu.tr/scripts/lst0.asp"
+    KANDILLI_INCREMENTAL = True  # Sadece bir önceki kontrolden sonra eklenen depremleri işle
+    KANDILLI_LOOKBACK_MINUTES = 30  # Geç yayımlanan depremler için en yeni deprem zamanının altında taranan süre (dakika)
+
+    # Kandilli HTTP istemcisi: bir kontrol en fazla KANDILLI_FETCH_BUDGET_SECONDS sürer
+    KANDILLI_CONNECT_TIMEOUT_SECONDS = 3.05  # Bağlantı kurma zaman aşımı (saniye)
+    KANDILLI_READ_TIMEOUT_SECONDS = 10  # Yanıt okuma zaman aşımı (saniye)
+    KANDILLI_FETCH_BUDGET_SECONDS = 20  # Tekrar denemeler dahil toplam süre sınırı (saniye)
+    KANDILLI_MAX_ATTEMPTS = 3  # Bir kontroldeki en fazla deneme sayısı
+    KANDILLI_BACKOFF_BASE_SECONDS = 0.5  # Denemeler arası beklemenin başlangıç değeri (üstel artar)
+    KANDILLI_HEDGE_AFTER_SECONDS = 4  # Yanıt bu süreden uzun sürerse yedek istek gönderilir (0: kapalı)
+    KANDILLI_BREAKER_FAILURES = 3  # Devre kesicinin açılması için art arda başarısız kontrol sayısı
+    KANDILLI_BREAKER_RESET_SECONDS = 120  # Devre açıldıktan sonra deneme isteğine kadar beklenecek süre (saniye)
@@ -0,0 +1,389 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Set
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LEADER_LEASE = 'leader'
+
+CLAIMED = 'claimed'  # Talep alındı, paylaşım sürüyor
+POSTED = 'posted'    # Instagram'a yüklendi
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_claims (
+    kandilli_id TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    state TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    media_id TEXT,
+    location TEXT,
+    earthquake_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_event_claims_state ON event_claims (state, claimed_at);
+"""
+
+# SQLite'ın tek sorguda kabul ettiği parametre sayısının güvenli altı
+QUERY_CHUNK_SIZE = 500
+
+
+def default_instance_id():
+    """Makine adı, süreç numarası ve rastgele bir ekten oluşan örnek kimliği."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _claim_row(earthquake, holder, now):
+    return {
+        'kandilli_id': earthquake['kandilli_id'],
+        'holder': holder,
+        'state': CLAIMED,
+        'claimed_at': now,
+        'media_id': None,
+        'location': earthquake['location'],
+        'earthquake_time': earthquake['earthquake_time'].isoformat(),
+    }
+
+
+class SqliteClaimStore:
+    """
+    Kira ve talepleri bir SQLite dosyasında tutar; aynı makinedeki (ya da dosyayı paylaşan)
+    örnekler için. Her işlem `BEGIN IMMEDIATE` ile yazma kilidi alınarak yapılır.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements):
+        """(sql, parametreler) listesini tek işlemde çalıştırır; son ifadenin rowcount'unu döndürür."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rowcount = 0
+                for sql, parameters in statements:
+                    rowcount = self._conn.execute(sql, parameters).rowcount
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return rowcount
+
+    def acquire_lease(self, name, holder, now, ttl) -> bool:
+        # Kira yoksa, süresi dolduysa ya da zaten bizdeyse al/yenile
+        return self._write([(
+            """
+            INSERT INTO bot_leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE bot_leases.holder = excluded.holder OR bot_leases.expires_at < ?
+            """,
+            (name, holder, now + ttl, now),
+        )]) == 1
+
+    def release_lease(self, name, holder):
+        self._write([('UPDATE bot_leases SET expires_at = 0 WHERE name = ? AND holder = ?', (name, holder))])
+
+    def claim(self, earthquakes, holder, now) -> Set[str]:
+        rows = [_claim_row(eq, holder, now) for eq in earthquakes]
+        if not rows:
+            return set()
+        columns = list(rows[0])
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO event_claims ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    "ON CONFLICT (kandilli_id) DO NOTHING",
+                    [tuple(row[c] for c in columns) for row in rows],
+                )
+                owned = self._select_ids([row['kandilli_id'] for row in rows], 'AND holder = ? AND state = ?', (holder, CLAIMED))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return owned
+
+    def _select_ids(self, kandilli_ids, condition='', parameters=()):
+        found = set()
+        for i in range(0, len(kandilli_ids), QUERY_CHUNK_SIZE):
+            chunk = kandilli_ids[i:i + QUERY_CHUNK_SIZE]
+            rows = self._conn.execute(
+                f"SELECT kandilli_id FROM event_claims WHERE kandilli_id IN ({','.join('?' * len(chunk))}) {condition}",
+                list(chunk) + list(parameters),
+            ).fetchall()
+            found.update(row['kandilli_id'] for row in rows)
+        return found
+
+    def claimed_ids(self, kandilli_ids) -> Set[str]:
+        with self._lock:
+            return self._select_ids(list(set(kandilli_ids)))
+
+    def mark_posted(self, kandilli_ids, holder, media_id):
+        self._write([
+            ('UPDATE event_claims SET state = ?, media_id = ? WHERE kandilli_id = ? AND holder = ?',
+             (POSTED, media_id, kandilli_id, holder))
+            for kandilli_id in kandilli_ids
+        ])
+
+    def release(self, kandilli_ids, holder):
+        self._write([
+            ('DELETE FROM event_claims WHERE kandilli_id = ? AND holder = ? AND state = ?', (kandilli_id, holder, CLAIMED))
+            for kandilli_id in kandilli_ids
+        ])
+
+    def stale_claims(self, older_than) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM event_claims WHERE state = ? AND claimed_at < ?', (CLAIMED, older_than)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class SupabaseClaimStore:
+    """
+    Kira ve talepleri Supabase'deki `bot_leases` ve `event_claims` tablolarında tutar. Koşullu
+    UPDATE'ler ve birincil anahtar çakışması, Postgres'te satır düzeyinde atomiktir. Tablolar:
+
+        create table bot_leases (
+            name text primary key, holder text not null, expires_at double precision not null
+        );
+        create table event_claims (
+            kandilli_id text primary key, holder text not null, state text not null,
+            claimed_at double precision not null, media_id text, location text, earthquake_time text
+        );
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire_lease(self, name, holder, now, ttl) -> bool:
+        leases = self.client.table('bot_leases')
+        fields = {'holder': holder, 'expires_at': now + ttl}
+        # Kira bizdeyse yenile, süresi dolduysa devral
+        if leases.update(fields).eq('name', name).eq('holder', holder).execute().data:
+            return True
+        if leases.update(fields).eq('name', name).lt('expires_at', now).execute().data:
+            return True
+        # Kira satırı hiç yoksa oluştur; varsa (başka örnekte) birincil anahtar çakışır
+        try:
+            return bool(leases.insert(dict(fields, name=name)).execute().data)
+        except Exception as e:
+            logger.debug(f"Lider kirası başka bir örnekte: {e}")
+            return False
+
+    def release_lease(self, name, holder):
+        self.client.table('bot_leases').update({'expires_at': 0}).eq('name', name).eq('holder', holder).execute()
+
+    def claim(self, earthquakes, holder, now) -> Set[str]:
+        rows = [_claim_row(eq, holder, now) for eq in earthquakes]
+        if not rows:
+            return set()
+        claims = self.client.table('event_claims')
+        claims.upsert(rows, on_conflict='kandilli_id', ignore_duplicates=True).execute()
+        response = (
+            claims.select('kandilli_id')
+            .in_('kandilli_id', [row['kandilli_id'] for row in rows])
+            .eq('holder', holder)
+            .eq('state', CLAIMED)
+            .execute()
+        )
+        return {row['kandilli_id'] for row in response.data}
+
+    def claimed_ids(self, kandilli_ids) -> Set[str]:
+        response = self.client.table('event_claims').select('kandilli_id').in_('kandilli_id', sorted(set(kandilli_ids))).execute()
+        return {row['kandilli_id'] for row in response.data}
+
+    def mark_posted(self, kandilli_ids, holder, media_id):
+        self.client.table('event_claims').update({'state': POSTED, 'media_id': media_id}).in_(
+            'kandilli_id', list(kandilli_ids)
+        ).eq('holder', holder).execute()
+
+    def release(self, kandilli_ids, holder):
+        self.client.table('event_claims').delete().in_('kandilli_id', list(kandilli_ids)).eq(
+            'holder', holder
+        ).eq('state', CLAIMED).execute()
+
+    def stale_claims(self, older_than) -> List[Dict]:
+        return self.client.table('event_claims').select('*').eq('state', CLAIMED).lt('claimed_at', older_than).execute().data
+
+    def close(self):
+        pass
+
+
+class Coordinator:
+    """
+    Birden fazla bot örneği (replika) için lider seçimi ve deprem başına paylaşım talepleri.
+
+    Örnekler ortak bir depoda kısa süreli lider kirası (lease) için yarışır; kirayı tutan örnek
+    Kandilli'yi kontrol edip paylaşım yapar, diğerleri yedekte bekler ve kira yenilenmediğinde
+    (lider öldüğünde) birkaç saniye içinde devralır. Kira arka planda `renew_seconds` aralıklarla
+    alınır ya da yenilenir; süreler örneklerin duvar saatiyle yazıldığından saatler (NTP ile)
+    kira süresinden çok küçük bir farkla eşit olmalıdır.
+
+    Ayrıca her deprem görseli çizilmeden önce ortak depoda atomik olarak talep edilir; kirası
+    elinden gitmiş eski lider ile yeni lider kısa süre birlikte çalışsa bile bir depremi sadece
+    talebi alan örnek paylaşır. Yüklemesi sürerken ölen örneğin talebi `stale_claim_seconds`
+    sonra Instagram'daki son paylaşımlarla doğrulanır (BotRuntime.recover_claims).
+
+    Kira, yenileme isteği gönderilmeden önceki andan itibaren `lease_seconds - renew_seconds`
+    boyunca geçerli sayılır; böylece diğer örnekler kirayı devralmadan önce bu örnek paylaşım
+    yapmayı bırakır. Depoya ulaşılamazsa kira süresi dolana kadar lider kalınır.
+    """
+
+    def __init__(self, store, holder=None, lease_seconds=10, renew_seconds=2, stale_claim_seconds=600,
+                 clock=time.time, monotonic=time.monotonic):
+        self.store = store
+        self.holder = holder or default_instance_id()
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.stale_claim_seconds = stale_claim_seconds
+        self.clock = clock
+        self.monotonic = monotonic
+        self._valid_until = 0.0
+        self._leader = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='leader-lease', daemon=True)
+
+    @classmethod
+    def from_config(cls, config, supabase=None):
+        """Config.COORDINATION_BACKEND'e göre koordinatör kurar; kapalıysa None döner."""
+        backend = (config.COORDINATION_BACKEND or '').lower()
+        if not backend:
+            return None
+        if backend == 'sqlite':
+            store = SqliteClaimStore(config.COORDINATION_DB_PATH)
+        elif backend == 'supabase':
+            if supabase is None:
+                raise ValueError("COORDINATION_BACKEND='supabase' için Supabase bağlantısı gerekli.")
+            store = SupabaseClaimStore(supabase)
+        else:
+            raise ValueError(f"Bilinmeyen COORDINATION_BACKEND: {config.COORDINATION_BACKEND}")
+        return cls(
+            store,
+            holder=config.INSTANCE_ID or None,
+            lease_seconds=config.LEADER_LEASE_SECONDS,
+            renew_seconds=config.LEADER_RENEW_SECONDS,
+            stale_claim_seconds=config.CLAIM_STALE_MINUTES * 60,
+        )
+
+    def start(self):
+        self.renew()
+        self._thread.start()
+        return self
+
+    def stop(self, release=True, timeout: float = 5):
+        """Kira yenilemeyi durdurur; `release` ise kira hemen bırakılır ve yedek örnek beklemeden devralır."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        if release and self.is_leader():
+            try:
+                self.store.release_lease(LEADER_LEASE, self.holder)
+            except Exception as e:
+                logger.warning(f"Lider kirası bırakılamadı: {e}")
+        self._valid_until = 0.0
+        self._set_leader(False)
+
+    def is_leader(self) -> bool:
+        return self.monotonic() < self._valid_until
+
+    def renew(self) -> bool:
+        """Kirayı almayı ya da yenilemeyi bir kez dener; lider olup olmadığını döndürür."""
+        started = self.monotonic()
+        try:
+            acquired = self.store.acquire_lease(LEADER_LEASE, self.holder, self.clock(), self.lease_seconds)
+        except Exception as e:
+            logger.warning(f"Lider kirası yenilenemedi: {e}")
+            acquired = None
+        if acquired:
+            self._valid_until = started + self.lease_seconds - self.renew_seconds
+        elif acquired is False:
+            self._valid_until = 0.0
+        self._set_leader(self.is_leader())
+        return self._leader
+
+    def _set_leader(self, leader):
+        if leader == self._leader:
+            return
+        self._leader = leader
+        metrics.IS_LEADER.set(int(leader))
+        if leader:
+            metrics.LEADER_CHANGES.inc()
+            logger.info(f"Bu örnek ({self.holder}) lider oldu, paylaşım yapacak.")
+        else:
+            logger.warning(f"Bu örnek ({self.holder}) liderliği bıraktı, yedekte bekliyor.")
+
+    def _run(self):
+        while not self._stop.wait(self.renew_seconds):
+            self.renew()
+
+    def claim(self, earthquakes: Iterable[Dict]) -> Set[str]:
+        """
+        Depremleri bu örnek adına atomik olarak talep eder ve talebi alınan ID'leri döndürür.
+        Lider değilken ya da depoya ulaşılamazken hiçbir deprem talep edilmez.
+        """
+        earthquakes = list(earthquakes)
+        if not self.is_leader():
+            return set()
+        try:
+            owned = self.store.claim(earthquakes, self.holder, self.clock())
+        except Exception as e:
+            metrics.ERRORS.inc(stage='claim')
+            logger.error(f"Depremler talep edilemedi, bu paylaşım ertelendi: {e}")
+            return set()
+        conflicts = len(earthquakes) - len(owned)
+        if conflicts:
+            metrics.CLAIM_CONFLICTS.inc(conflicts)
+        return owned
+
+    def filter_unclaimed(self, kandilli_ids: Iterable[str]) -> Set[str]:
+        """Hiçbir örneğin talep etmediği ID'leri döndürür; depoya ulaşılamazsa boş küme."""
+        kandilli_ids = set(kandilli_ids)
+        if not kandilli_ids:
+            return set()
+        try:
+            return kandilli_ids - self.store.claimed_ids(kandilli_ids)
+        except Exception as e:
+            metrics.ERRORS.inc(stage='claim')
+            logger.error(f"Deprem talepleri sorgulanamadı, bu döngüde paylaşım yapılmayacak: {e}")
+            return set()
+
+    def mark_posted(self, kandilli_ids: Iterable[str], media_id: str, holder=None):
+        try:
+            self.store.mark_posted(list(kandilli_ids), holder or self.holder, media_id)
+        except Exception as e:
+            # Talep "claimed" kalır; süresi dolunca Instagram'da doğrulanıp kapatılır
+            logger.warning(f"Deprem talepleri paylaşıldı olarak işaretlenemedi: {e}")
+
+    def release(self, kandilli_ids: Iterable[str], holder=None):
+        try:
+            self.store.release(list(kandilli_ids), holder or self.holder)
+        except Exception as e:
+            logger.warning(f"Deprem talepleri bırakılamadı: {e}")
+
+    def stale_claims(self) -> List[Dict]:
+        """Paylaşımı `stale_claim_seconds`den uzun süredir tamamlanmamış talepler."""
+        try:
+            return self.store.stale_claims(self.clock() - self.stale_claim_seconds)
+        except Exception as e:
+            logger.warning(f"Yarım kalmış talepler sorgulanamadı: {e}")
+            return []
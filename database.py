@@ -1,88 +1,402 @@
 # Gerekli kütüphaneleri import et
 import os
+import json
+import time
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional, Set
 
-# Supabase kütüphanesini import et
-try:
-    from supabase import create_client, Client
-except ImportError:
-    print("HATA: 'supabase' kütüphanesi bulunamadı. Lütfen 'pip install supabase' ile yükleyin.")
-    exit()
+import metrics
+from local_store import LocalEarthquakeStore, REMOTE_COLUMNS
 
-# python-dotenv kütüphanesini import et
-try:
-    from dotenv import load_dotenv
-except ImportError:
-    print("HATA: 'python-dotenv' kütüphanesi bulunamadı. Lütfen 'pip install python-dotenv' ile yükleyin.")
-    exit()
 
 
-# Temel loglama ayarlarını yap
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+class PostedIdCache:
+    """
+    Paylaşıldığı bilinen kandilli_id'lerini bellekte tutan, boyutu ve süresi sınırlı önbellek.
 
-# .env dosyasını yükle ve Supabase değişkenlerini al
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
+    Normal bir döngüde Kandilli sayfasındaki önemli depremlerin neredeyse tamamı zaten
+    paylaşılmış olur; bu önbellek sayesinde bu depremler için veritabanına hiç gidilmez.
+    Sadece "paylaşıldı" bilgisi saklanır, "paylaşılmadı" bilgisi asla önbelleğe alınmaz.
+    İsteğe bağlı olarak bir JSON dosyasına yazılır, böylece yeniden başlatmadan sonra da geçerli kalır.
+
+    Dosya her eklemede değil, `save` çağrıldığında yazılır (BotRuntime'da her kontrol döngüsünde
+    bir kez ve kapanışta). Çökmede kaybolan kayıtlar sadece bir sonraki veritabanı sorgusunda
+    yeniden öğrenilir.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl_seconds: float = 7 * 24 * 3600, path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: "OrderedDict[str, float]" = OrderedDict()  # kandilli_id -> eklenme zamanı (epoch)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Aynı anda iki yazma geçici dosyayı bozmasın
+        self._dirty = False
+
+        if self.path:
+            self._load()
+
+    def __contains__(self, kandilli_id: str) -> bool:
+        with self._lock:
+            added_at = self._entries.get(kandilli_id)
+            if added_at is None:
+                return False
+            if time.time() - added_at > self.ttl_seconds:
+                del self._entries[kandilli_id]
+                self._dirty = True
+                return False
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, kandilli_id: str):
+        """ID'yi paylaşılmış olarak işaretler; en eski kayıtlar boyut sınırına göre atılır."""
+        with self._lock:
+            self._entries[kandilli_id] = time.time()
+            self._entries.move_to_end(kandilli_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def update(self, kandilli_ids: Iterable[str]):
+        for kandilli_id in kandilli_ids:
+            self.add(kandilli_id)
+
+    def save(self):
+        """Önbelleği (değiştiyse) diske yazar. Yazma atomik yapılır."""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                now = time.time()
+                data = {k: v for k, v in self._entries.items() if now - v <= self.ttl_seconds}
+                self._dirty = False
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                self._dirty = True
+                logging.warning(f"Paylaşılan ID önbelleği diske yazılamadı: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Paylaşılan ID önbelleği okunamadı, boş önbellekle devam ediliyor: {e}")
+            return
+
+        now = time.time()
+        for kandilli_id, added_at in sorted(data.items(), key=lambda item: item[1]):
+            if now - added_at <= self.ttl_seconds:
+                self._entries[kandilli_id] = added_at
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        logging.info(f"Paylaşılan ID önbelleği yüklendi: {len(self._entries)} kayıt.")
 
 
 class EarthquakeDatabase:
-    def __init__(self, url: str, key: str):
-        """Veritabanı bağlantısını kurar."""
+    def __init__(self, url: str, key: str, posted_cache: Optional[PostedIdCache] = None,
+                 local_store: Optional[LocalEarthquakeStore] = None, client=None):
+        """
+        Veritabanı bağlantısını kurar.
+
+        `local_store` verilirse tekrar kontrolleri ve kayıtlar yerel SQLite üzerinden yapılır,
+        Supabase'e gönderim sync_pending ile toplu ve arka planda yapılır. Supabase ayarları
+        yoksa yerel depo tek başına çalışır. `client` ile Supabase uyumlu başka bir istemci verilebilir.
+        """
+        self.posted_cache = posted_cache if posted_cache is not None else PostedIdCache()
+        self.local_store = local_store
+        self.supabase = client
+        # Dışarıdan verilen istemci yeniden kurulamaz (bkz. reset)
+        self._credentials = None
+
+        if self.supabase is not None:
+            return
+
         if not url or not key:
+            if local_store is not None:
+                logging.warning("Supabase ayarları bulunamadı, sadece yerel veritabanı kullanılacak.")
+                return
             logging.error("Supabase URL ve Key .env dosyasında bulunamadı!")
             raise ValueError("SUPABASE_URL ve SUPABASE_ANON_KEY ayarlanmalı.")
-        
+
+        # supabase kütüphanesi ağırdır; sadece yerel SQLite ile çalışırken hiç yüklenmez
+        try:
+            from supabase import create_client
+        except ImportError:
+            logging.error("HATA: 'supabase' kütüphanesi bulunamadı. Lütfen 'pip install supabase' ile yükleyin.")
+            raise ImportError("supabase")
+
         try:
-            self.supabase: Client = create_client(url, key)
+            self.supabase = create_client(url, key)
             logging.info("✅ Supabase bağlantısı başarıyla kuruldu.")
         except Exception as e:
             logging.error(f"❌ Supabase client oluşturulurken hata: {e}")
             raise
+        self._credentials = (url, key)
+
+    def reset(self):
+        """
+        Supabase istemcisini yenisiyle değiştirir (asılı kalan sorgu eski istemcide biter).
+        İstemci dışarıdan verildiyse ya da kurulamazsa mevcut istemci kullanılmaya devam eder.
+        """
+        if self._credentials is None:
+            return
+        from supabase import create_client
+
+        try:
+            self.supabase = create_client(*self._credentials)
+            logging.info("Supabase istemcisi yeniden kuruldu.")
+        except Exception as e:
+            logging.error(f"Supabase istemcisi yeniden kurulamadı: {e}")
+
+    def close(self):
+        """Yerel depoyu kapatır (bekleyen kayıtları önce BackgroundSyncer göndermelidir)."""
+        if self.local_store is not None:
+            self.local_store.close()
 
     def is_earthquake_posted(self, kandilli_id: str) -> bool:
-        """Verilen ID'ye sahip depremin veritabanında olup olmadığını kontrol eder."""
+        """
+        Verilen ID'ye sahip depremin veritabanında olup olmadığını kontrol eder.
+        Hata durumunda çift paylaşımı önlemek için paylaşılmış varsayılır.
+        """
         try:
-            response = self.supabase.table('earthquakes').select('id').eq('kandilli_id', kandilli_id).execute()
-            return len(response.data) > 0
+            return kandilli_id not in self._query_unposted([kandilli_id])
         except Exception as e:
             logging.error(f"Deprem kontrolü sırasında hata: {e}")
-            return False # Hata durumunda paylaşılmış varsaymak daha güvenli olabilir.
+            return True
+
+    def filter_unposted(self, kandilli_ids: Iterable[str], raise_errors: bool = False) -> Set[str]:
+        """
+        Verilen ID'lerden henüz paylaşılmamış olanları döndürür.
 
-    def save_earthquake(self, eq_data: Dict) -> bool:
-        """Yeni deprem verisini veritabanına kaydeder."""
+        Önce yerel önbelleğe bakılır, kalan ID'ler tek bir `in_` sorgusuyla çözülür.
+        Sorgu başarısız olursa boş küme döner: hata asla "paylaşılmadı" olarak yorumlanmaz,
+        depremler bir sonraki döngüde tekrar denenir. `raise_errors=True` ise hata fırlatılır.
+        """
         try:
-            # Proje planımızdaki tablo yapısıyla eşleşen veriyi hazırla
-            db_record = {
-                'kandilli_id': eq_data.get('kandilli_id'),
-                'magnitude': eq_data.get('magnitude'),
-                'depth': eq_data.get('depth'),
-                'location': eq_data.get('location'),
-                'earthquake_time': eq_data['earthquake_time'].isoformat(),
-                'latitude': eq_data.get('latitude'),
-                'longitude': eq_data.get('longitude'),
-                'posted_to_instagram': True, # Bu fonksiyon çağrıldığında paylaşılmış demektir.
-                'posted_at': datetime.now().isoformat()
-            }
-            
-            response = self.supabase.table('earthquakes').insert(db_record).execute()
-            
-            if len(response.data) > 0:
-                logging.info(f"✅ Deprem veritabanına kaydedildi: {db_record['location']}")
+            return self._query_unposted(kandilli_ids)
+        except Exception as e:
+            metrics.ERRORS.inc(stage='db_lookup')
+            if raise_errors:
+                raise
+            logging.error(f"Toplu deprem kontrolü sırasında hata, bu döngüde paylaşım yapılmayacak: {e}")
+            return set()
+
+    def _query_unposted(self, kandilli_ids: Iterable[str]) -> Set[str]:
+        candidates = {kandilli_id for kandilli_id in kandilli_ids if kandilli_id not in self.posted_cache}
+        if not candidates:
+            return set()
+
+        if self.local_store is not None:
+            unposted = self.local_store.filter_unposted(candidates)
+            self.posted_cache.update(candidates - unposted)
+            return unposted
+
+        response = self.supabase.table('earthquakes').select('kandilli_id').in_('kandilli_id', sorted(candidates)).execute()
+        posted = {row['kandilli_id'] for row in response.data}
+        if posted:
+            self.posted_cache.update(posted)
+        return candidates - posted
+
+    def save_earthquake(self, eq_data: Dict, posted_to_instagram: bool = True) -> bool:
+        """
+        Yeni deprem verisini veritabanına kaydeder.
+        Paylaşılmadan atlanan depremler de tekrar ele alınmamaları için `posted_to_instagram=False` ile kaydedilir.
+        """
+        try:
+            db_record = self._to_record(eq_data, posted_to_instagram)
+
+            # Yerel depo varsa kayıt oraya yazılır, Supabase'e arka planda gönderilir
+            if self.local_store is not None:
+                self.local_store.upsert(db_record)
+                self.posted_cache.add(db_record['kandilli_id'])
+                logging.debug("Deprem yerel veritabanına kaydedildi: %s", db_record['location'])
                 return True
+
+            # Satır zaten varsa (ör. süre sınırını aşıp bırakılan bir kayıt sonradan tamamlandıysa)
+            # dokunulmaz ve deprem kaydedilmiş sayılır; tekrar denemeler benzersiz anahtara takılmaz
+            response = self.supabase.table('earthquakes').upsert(
+                db_record, on_conflict='kandilli_id', ignore_duplicates=True
+            ).execute()
+
+            self.posted_cache.add(db_record['kandilli_id'])
+            if response.data:
+                logging.debug("Deprem veritabanına kaydedildi: %s", db_record['location'])
             else:
-                logging.error(f"Deprem kaydedilemedi. Supabase yanıtı: {response}")
-                return False
+                logging.debug("Deprem veritabanında zaten kayıtlı: %s", db_record['kandilli_id'])
+            return True
 
         except Exception as e:
             logging.error(f"❌ Deprem kaydı sırasında kritik hata: {e}")
             return False
 
+    def save_earthquakes_bulk(self, earthquakes: Iterable[Dict], posted_to_instagram: bool = False) -> int:
+        """
+        Depremleri tek istekte toplu kaydeder; veritabanında zaten olan kayıtlara dokunulmaz,
+        böylece paylaşılmış depremlerin kaydı ezilmez. Geçmiş verisiyle veritabanını doldurmak için kullanılır.
+        Gönderilen kayıt sayısını, hata durumunda 0 döndürür.
+        """
+        # Aynı toplu istekte bir ID'nin iki kez geçmesine izin verme
+        records = list({eq['kandilli_id']: self._to_record(eq, posted_to_instagram) for eq in earthquakes}.values())
+        if not records:
+            return 0
+        try:
+            if self.supabase is not None:
+                self.supabase.table('earthquakes').upsert(
+                    records, on_conflict='kandilli_id', ignore_duplicates=True
+                ).execute()
+            if self.local_store is not None:
+                # Supabase'e doğrudan yazıldıysa yerel kopya senkronize sayılır
+                self.local_store.insert_missing(records, synced=self.supabase is not None)
+            return len(records)
+        except Exception as e:
+            metrics.ERRORS.inc(stage='db_bulk')
+            logging.error(f"❌ Toplu deprem kaydı sırasında hata ({len(records)} kayıt): {e}")
+            return 0
+
+    @staticmethod
+    def _to_record(eq_data: Dict, posted_to_instagram: bool) -> Dict:
+        # Proje planımızdaki tablo yapısıyla eşleşen veriyi hazırla
+        return {
+            'kandilli_id': eq_data.get('kandilli_id'),
+            'magnitude': eq_data.get('magnitude'),
+            'depth': eq_data.get('depth'),
+            'location': eq_data.get('location'),
+            'earthquake_time': eq_data['earthquake_time'].isoformat(),
+            'latitude': eq_data.get('latitude'),
+            'longitude': eq_data.get('longitude'),
+            'posted_to_instagram': posted_to_instagram,
+            'posted_at': datetime.now().isoformat() if posted_to_instagram else None
+        }
+
+    def update_earthquake_revision(self, kandilli_id: str, revised: Dict) -> bool:
+        """
+        Daha önce kaydedilmiş depremin satırını Kandilli'nin revize ettiği değerlerle günceller.
+        Satır ilk kandilli_id'si ile kalır; revize ID'si önbelleğe paylaşılmış olarak eklenir.
+        """
+        try:
+            update = {
+                'magnitude': revised.get('magnitude'),
+                'depth': revised.get('depth'),
+                'location': revised.get('location'),
+                'earthquake_time': revised['earthquake_time'].isoformat(),
+                'latitude': revised.get('latitude'),
+                'longitude': revised.get('longitude'),
+            }
+            if self.local_store is not None:
+                self.local_store.update_fields(kandilli_id, update)
+            else:
+                self.supabase.table('earthquakes').update(update).eq('kandilli_id', kandilli_id).execute()
+            self.posted_cache.add(revised['kandilli_id'])
+            logging.info(f"Revize deprem kaydı güncellendi: {kandilli_id} -> M{revised.get('magnitude')} {revised.get('location')}")
+            return True
+        except Exception as e:
+            logging.error(f"Revize deprem kaydı güncellenemedi: {e}")
+            return False
+
+    def fetch_recent_earthquakes(self, since: datetime) -> List[Dict]:
+        """
+        Verilen zamandan sonra gerçekleşen ve Instagram'da paylaşılmış depremleri döndürür
+        (tekrar kontrol indeksi için); paylaşılmadan atlanan kayıtlar dahil edilmez.
+        """
+        if self.local_store is not None:
+            return self.local_store.recent(since, posted_only=True)
+        return self._fetch_remote_recent(
+            since, 'kandilli_id, magnitude, earthquake_time, latitude, longitude', posted_only=True
+        )
+
+    def _fetch_remote_recent(self, since: datetime, columns: str, posted_only: bool = False) -> List[Dict]:
+        query = self.supabase.table('earthquakes').select(columns).gte('earthquake_time', since.isoformat())
+        if posted_only:
+            query = query.eq('posted_to_instagram', True)
+        response = query.execute()
+        records = []
+        for row in response.data:
+            # Saat dilimi bilgisi varsa at: kayıtlar Kandilli'nin yerel saatiyle yazılır
+            row['earthquake_time'] = datetime.fromisoformat(row['earthquake_time']).replace(tzinfo=None)
+            records.append(row)
+        return records
+
+    def sync_pending(self, batch_size: int = 100) -> int:
+        """
+        Yerel depoda bekleyen en fazla `batch_size` kaydı tek bir upsert ile Supabase'e gönderir.
+        Uzakta paylaşıldı olarak işaretli satırların `posted_to_instagram`/`posted_at` değerleri
+        korunur. Gönderilen kayıt sayısını döndürür. Supabase tablosunda kandilli_id benzersiz olmalıdır.
+        """
+        if self.local_store is None or self.supabase is None:
+            return 0
+
+        pending = self.local_store.pending_sync(batch_size)
+        if not pending:
+            return 0
+
+        records = [{column: record[column] for column in REMOTE_COLUMNS} for record in pending]
+        for record in records:
+            record['posted_to_instagram'] = bool(record['posted_to_instagram'])
+
+        # "Paylaşıldı" bilgisi sadece ileri gider: başka bir örneğin paylaşıldı olarak kaydettiği
+        # satır, bu örneğin eski yerel kopyasıyla "paylaşılmadı"ya çevrilmez
+        response = (
+            self.supabase.table('earthquakes')
+            .select('kandilli_id, posted_to_instagram, posted_at')
+            .in_('kandilli_id', [record['kandilli_id'] for record in records])
+            .execute()
+        )
+        remote_posted = {row['kandilli_id']: row for row in response.data if row.get('posted_to_instagram')}
+        for record in records:
+            row = remote_posted.get(record['kandilli_id'])
+            if row is not None:
+                record['posted_to_instagram'] = True
+                record['posted_at'] = row.get('posted_at') or record['posted_at']
+
+        self.supabase.table('earthquakes').upsert(records, on_conflict='kandilli_id').execute()
+        self.local_store.mark_synced(pending)
+        logging.info(f"{len(pending)} deprem kaydı Supabase'e gönderildi.")
+        return len(pending)
+
+    def reconcile(self, since: datetime) -> bool:
+        """
+        Açılışta yerel depoyu Supabase ile eşitler: uzaktaki son kayıtlar yerel depoya alınır
+        (gönderilmemiş yerel değişiklikler korunur), ardından bekleyen yerel kayıtlar gönderilir.
+        Uzak veritabanına ulaşılamazsa False döner; bot yerel depoyla çalışmaya devam eder.
+        """
+        if self.local_store is None or self.supabase is None:
+            return False
+        try:
+            remote = self._fetch_remote_recent(since, ', '.join(REMOTE_COLUMNS))
+            for record in remote:
+                record['earthquake_time'] = record['earthquake_time'].isoformat()
+            self.local_store.upsert_many(remote, synced=True)
+            self.posted_cache.update(record['kandilli_id'] for record in remote)
+            self.posted_cache.save()
+
+            while self.sync_pending() > 0:
+                pass
+            logging.info(f"Yerel veritabanı Supabase ile eşitlendi ({len(remote)} uzak kayıt).")
+            return True
+        except Exception as e:
+            logging.warning(f"Supabase ile eşitleme yapılamadı, yerel veritabanıyla devam ediliyor: {e}")
+            return False
+
 
 # --- BU DOSYAYI DOĞRUDAN ÇALIŞTIRMAK İÇİN TEST ALANI ---
 if __name__ == "__main__":
+    from config import Config, configure_logging
+
+    configure_logging()
+    SUPABASE_URL, SUPABASE_KEY = Config.SUPABASE_URL, Config.SUPABASE_ANON_KEY
     print("\n--- Veritabanı Modülü Testi Başlatılıyor ---")
 
     # 1. Adım: .env dosyasından değişkenlerin okunup okunmadığını kontrol et
@@ -0,0 +1,163 @@
+import math
+import logging
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """İki nokta arasındaki büyük daire uzaklığı (km)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class SpatioTemporalIndex:
+    """
+    Yakın zamanda paylaşılan depremlerin zaman kovası + enlem/boylam ızgarası üzerindeki indeksi.
+
+    Kandilli bir depremi revize ettiğinde (REVIZE satırı, küçük büyüklük veya koordinat
+    değişikliği) kandilli_id de değişir. Bu indeks yeni bir adayı, zaman, uzaklık ve büyüklük
+    toleransları içindeki kayıtlı depremle sabit zamana yakın sürede eşleştirir.
+
+    Geniş toleranslar sadece Kandilli'nin REVIZE olarak işaretlediği satırlara uygulanır. İşaretsiz
+    satırlar için zaman ve uzaklık toleransı çok daha dardır (`unmarked_*`): fırtınadaki ayrı
+    artçılar geniş toleranslara sık sık uyar ve birbirinin revizyonu sayılmamalıdır.
+
+    Kovalar tolerans boyutundadır; bir aday için sadece komşu kovalara bakılır.
+    """
+
+    def __init__(self, time_tolerance_seconds=90, distance_km=30, magnitude_tolerance=0.6,
+                 unmarked_time_tolerance_seconds=5, unmarked_distance_km=10):
+        self.time_tolerance = time_tolerance_seconds
+        self.distance_km = distance_km
+        self.magnitude_tolerance = magnitude_tolerance
+        # Kovalar geniş toleransa göre kurulduğu için dar toleranslar ondan büyük olamaz
+        self.unmarked_time_tolerance = min(unmarked_time_tolerance_seconds, time_tolerance_seconds)
+        self.unmarked_distance_km = min(unmarked_distance_km, distance_km)
+        self.cell_degrees = distance_km / KM_PER_DEGREE
+
+        self._buckets = {}  # (zaman kovası, enlem hücresi, boylam hücresi) -> {kandilli_id: kayıt}
+        self._records = {}  # kandilli_id -> (kayıt, kova anahtarı)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, kandilli_id):
+        return kandilli_id in self._records
+
+    def _key(self, record):
+        return (
+            int(record['earthquake_time'].timestamp() // self.time_tolerance),
+            int(math.floor(record['latitude'] / self.cell_degrees)),
+            int(math.floor(record['longitude'] / self.cell_degrees)),
+        )
+
+    def add(self, record):
+        """Depremi indekse ekler (aynı kandilli_id varsa yerini alır)."""
+        kandilli_id = record['kandilli_id']
+        self.remove(kandilli_id)
+
+        entry = {
+            'kandilli_id': kandilli_id,
+            'earthquake_time': record['earthquake_time'],
+            'latitude': record['latitude'],
+            'longitude': record['longitude'],
+            'magnitude': record['magnitude'],
+            'is_revised': bool(record.get('is_revised')),
+        }
+        key = self._key(entry)
+        self._buckets.setdefault(key, {})[kandilli_id] = entry
+        self._records[kandilli_id] = (entry, key)
+
+    def remove(self, kandilli_id):
+        existing = self._records.pop(kandilli_id, None)
+        if existing is None:
+            return
+        _, key = existing
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pop(kandilli_id, None)
+            if not bucket:
+                del self._buckets[key]
+
+    def update(self, kandilli_id, revised):
+        """
+        Kayıtlı depremi revize edilmiş değerlerle günceller. Kayıt, veritabanındaki satırla
+        eşleşmeye devam etmesi için ilk kandilli_id'si altında tutulur.
+        """
+        self.add(dict(revised, kandilli_id=kandilli_id))
+
+    def match(self, candidate):
+        """Adayla aynı deprem sayılabilecek en yakın kaydı döndürür, yoksa None."""
+        time_bucket, lat_cell, lon_cell = self._key(candidate)
+
+        # Boylam derecesi kuzeye gidildikçe kısalır, gereken hücre sayısını buna göre hesapla
+        cos_lat = max(math.cos(math.radians(candidate['latitude'])), 0.01)
+        lon_span = math.ceil(1 / cos_lat)
+
+        best, best_score = None, None
+        for t in (time_bucket - 1, time_bucket, time_bucket + 1):
+            for la in (lat_cell - 1, lat_cell, lat_cell + 1):
+                for lo in range(lon_cell - lon_span, lon_cell + lon_span + 1):
+                    bucket = self._buckets.get((t, la, lo))
+                    if not bucket:
+                        continue
+                    for record in bucket.values():
+                        score = self._score(candidate, record)
+                        if score is not None and (best_score is None or score < best_score):
+                            best, best_score = record, score
+        return best
+
+    def _score(self, candidate, record):
+        if candidate.get('is_revised') or record.get('is_revised'):
+            time_tolerance, distance_km = self.time_tolerance, self.distance_km
+        else:
+            time_tolerance, distance_km = self.unmarked_time_tolerance, self.unmarked_distance_km
+        dt = abs((candidate['earthquake_time'] - record['earthquake_time']).total_seconds())
+        if dt > time_tolerance:
+            return None
+        dm = abs(candidate['magnitude'] - record['magnitude'])
+        if dm > self.magnitude_tolerance:
+            return None
+        distance = haversine_km(candidate['latitude'], candidate['longitude'], record['latitude'], record['longitude'])
+        if distance > distance_km:
+            return None
+        # Toleranslara göre normalize edilmiş toplam fark
+        return dt / self.time_tolerance + distance / self.distance_km + dm / self.magnitude_tolerance
+
+    def prune(self, older_than):
+        """Verilen zamandan eski depremleri indeksten çıkarır."""
+        stale = [k for k, (record, _) in self._records.items() if record['earthquake_time'] < older_than]
+        for kandilli_id in stale:
+            self.remove(kandilli_id)
+        return len(stale)
+
+    def rebuild(self, records):
+        """İndeksi verilen kayıtlardan (ör. veritabanındaki son depremler) baştan kurar."""
+        self._buckets.clear()
+        self._records.clear()
+        for record in records:
+            self.add(record)
+        logger.info(f"Tekrar kontrol indeksi {len(self._records)} depremle kuruldu.")
+
+    @staticmethod
+    def dedupe_batch(earthquakes, index_factory):
+        """
+        Aynı partide birbirinin revizyonu olan adaylardan sadece birini bırakır.
+        Revize satırlar ilksel olanlara tercih edilir.
+        """
+        batch_index = index_factory()
+        kept = []
+        for eq in sorted(earthquakes, key=lambda e: not e.get('is_revised', False)):
+            if batch_index.match(eq) is not None:
+                continue
+            batch_index.add(eq)
+            kept.append(eq)
+        kept_ids = {eq['kandilli_id'] for eq in kept}
+        return [eq for eq in earthquakes if eq['kandilli_id'] in kept_ids]
@@ -0,0 +1,205 @@
+import os
+import csv
+import math
+import struct
+import logging
+import threading
+from array import array
+from collections import namedtuple
+
+from dedup_index import haversine_km, KM_PER_DEGREE
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, "gazetteer", "tr_settlements.csv")
+
+CELL_DEGREES = 0.25  # Izgara hücresinin kenarı (derece)
+INDEX_MAGIC = b'GZT1'
+# Başlık: sihirli sözcük, yerleşim sayısı, ad bloğunun uzunluğu, hücre boyutu
+INDEX_HEADER = struct.Struct('<4sIIf')
+
+# Merkez üssünün yerleşime göre yönü (sekiz yön, kuzeyden saat yönünde) iyelik ekiyle
+DIRECTIONS = ('kuzeyi', 'kuzeydoğusu', 'doğusu', 'güneydoğusu', 'güneyi', 'güneybatısı', 'batısı', 'kuzeybatısı')
+NEARBY_KM = 2  # Bu uzaklıktan yakın depremler için yön verilmez
+
+Place = namedtuple('Place', 'name province distance_km bearing')
+
+
+def _index_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.idx'
+
+
+def _cell(latitude, longitude):
+    return int(math.floor(latitude / CELL_DEGREES)), int(math.floor(longitude / CELL_DEGREES))
+
+
+def bearing_degrees(lat1, lon1, lat2, lon2):
+    """Birinci noktadan ikinciye başlangıç yönü (kuzeyden saat yönünde, derece)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dlambda = math.radians(lon2 - lon1)
+    y = math.sin(dlambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlambda)
+    return math.degrees(math.atan2(y, x)) % 360
+
+
+def _genitive(name):
+    """Özel isme Türkçe tamlayan eki getirir: Sındırgı'nın, Van'ın, Ürgüp'ün."""
+    vowels = [c for c in name.lower() if c in 'aeıioöuü']
+    last = vowels[-1] if vowels else 'e'
+    suffix = {'a': 'ın', 'ı': 'ın', 'e': 'in', 'i': 'in', 'o': 'un', 'u': 'un', 'ö': 'ün', 'ü': 'ün'}[last]
+    if name[-1].lower() in 'aeıioöuü':
+        suffix = 'n' + suffix
+    return f"{name}'{suffix}"
+
+
+def describe(place: Place) -> str:
+    """Yeri 'Sındırgı'nın 12 km kuzeydoğusu (Balıkesir)' biçiminde yazar."""
+    province = '' if place.province == place.name else f" ({place.province})"
+    if place.distance_km < NEARBY_KM:
+        return f"{place.name}{province}"
+    direction = DIRECTIONS[int((place.bearing + 22.5) // 45) % 8]
+    return f"{_genitive(place.name)} {place.distance_km:.0f} km {direction}{province}"
+
+
+def build_index(csv_path=GAZETTEER_PATH, index_path=None):
+    """
+    Yerleşim listesini (CSV: name, province, latitude, longitude) ızgara hücresine göre sıralayıp
+    ikili dizin dosyasına yazar: başlık, enlemler ve boylamlar (float32), ad uzaklıkları (uint32)
+    ve UTF-8 ad bloğu ('ad\\til' satırları). Dosya açılışta kopyalanmadan dizilere okunur.
+    """
+    index_path = index_path or _index_path(csv_path)
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        rows = [
+            (float(row['latitude']), float(row['longitude']), f"{row['name'].strip()}\t{row['province'].strip()}")
+            for row in csv.DictReader(f)
+        ]
+    rows.sort(key=lambda row: _cell(row[0], row[1]))
+
+    latitudes, longitudes, offsets = array('f'), array('f'), array('I', [0])
+    names = bytearray()
+    for latitude, longitude, label in rows:
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        names += label.encode('utf-8')
+        offsets.append(len(names))
+
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(rows), len(names), CELL_DEGREES))
+        for values in (latitudes, longitudes, offsets):
+            f.write(values.tobytes())
+        f.write(names)
+    os.replace(temp_path, index_path)
+    logging.info(f"Yerleşim dizini oluşturuldu: {index_path} ({len(rows)} yerleşim)")
+    return index_path
+
+
+class Gazetteer:
+    """
+    Paketle gelen yerleşim listesi üzerinde en yakın yerleşim araması.
+
+    Yerleşimler CELL_DEGREES boyutlu enlem/boylam ızgarasına yerleştirilir; arama sorgu
+    hücresinden başlayıp halka halka genişler ve bulunan en yakın yerleşimden daha yakın bir
+    yerleşimin kalamayacağı halkada durur. Liste ilk açılışta ikili dizin dosyasına (.idx)
+    dönüştürülür, sonraki açılışlarda CSV ayrıştırılmadan bu dosya okunur.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path=GAZETTEER_PATH):
+        index_path = _index_path(path)
+        if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+            try:
+                build_index(path, index_path)
+            except OSError as e:
+                # Dizin yazılamıyorsa (salt okunur kurulum) geçici dizine yaz
+                logging.warning(f"Yerleşim dizini '{index_path}' yazılamadı, geçici dizin kullanılacak: {e}")
+                import tempfile
+                index_path = build_index(path, os.path.join(tempfile.gettempdir(), os.path.basename(index_path)))
+
+        with open(index_path, 'rb') as f:
+            data = f.read()
+        magic, count, names_length, cell_degrees = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or cell_degrees != CELL_DEGREES:
+            raise ValueError(f"Yerleşim dizini '{index_path}' tanınmayan biçimde")
+
+        position = INDEX_HEADER.size
+        self.latitudes, self.longitudes, self._offsets = array('f'), array('f'), array('I')
+        for values, length in ((self.latitudes, count), (self.longitudes, count), (self._offsets, count + 1)):
+            end = position + length * values.itemsize
+            values.frombytes(data[position:end])
+            position = end
+        self._names = data[position:position + names_length]
+
+        # Hücre -> (ilk, son + 1) kayıt aralığı; kayıtlar hücreye göre sıralı
+        self._cells = {}
+        for i in range(count):
+            key = _cell(self.latitudes[i], self.longitudes[i])
+            start, _ = self._cells.get(key, (i, i))
+            self._cells[key] = (start, i + 1)
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    @classmethod
+    def shared(cls, path=GAZETTEER_PATH):
+        """Yol başına bir kez yüklenen listeyi döndürür; dosya yoksa ya da okunamazsa None."""
+        with cls._lock:
+            if path not in cls._instances:
+                try:
+                    cls._instances[path] = cls(path)
+                except (OSError, ValueError, KeyError, struct.error) as e:
+                    logging.warning(f"Yerleşim listesi '{path}' yüklenemedi, konumlar zenginleştirilmeyecek: {e}")
+                    cls._instances[path] = None
+            return cls._instances[path]
+
+    def _label(self, i):
+        return self._names[self._offsets[i]:self._offsets[i + 1]].decode('utf-8').split('\t')
+
+    def nearest(self, latitude, longitude, max_distance_km=50):
+        """Verilen noktaya `max_distance_km` içindeki en yakın yerleşimi döndürür (yoksa None)."""
+        # Bir halka ilerisindeki yerleşimler en az bu kadar uzaktadır (boylam hücresi kuzeyde daralır)
+        ring_km = CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(min(abs(latitude) + CELL_DEGREES, 89)))
+        max_ring = int(max_distance_km / ring_km) + 1
+        row, column = _cell(latitude, longitude)
+
+        best, best_km = None, max_distance_km
+        for ring in range(max_ring + 1):
+            for dr in range(-ring, ring + 1):
+                step = 1 if abs(dr) == ring else 2 * ring or 1
+                for dc in range(-ring, ring + 1, step):
+                    start, end = self._cells.get((row + dr, column + dc), (0, 0))
+                    for i in range(start, end):
+                        distance = haversine_km(latitude, longitude, self.latitudes[i], self.longitudes[i])
+                        if distance <= best_km:
+                            best, best_km = i, distance
+            if best is not None and best_km <= ring * ring_km:
+                break
+
+        if best is None:
+            return None
+        name, province = self._label(best)
+        bearing = bearing_degrees(self.latitudes[best], self.longitudes[best], latitude, longitude)
+        return Place(name, province, best_km, bearing)
+
+
+def enrich(earthquake: dict, max_distance_km=50, gazetteer=None) -> dict:
+    """
+    Depreme en yakın yerleşimin açıklamasını 'nearest_place' olarak ekler (ör. "Sındırgı'nın
+    12 km kuzeydoğusu (Balıkesir)"). Yakında yerleşim yoksa ya da liste yüklenemediyse None olur.
+    """
+    if gazetteer is None:
+        gazetteer = Gazetteer.shared()
+    latitude, longitude = earthquake.get('latitude'), earthquake.get('longitude')
+    place = None
+    if gazetteer is not None and latitude is not None and longitude is not None:
+        place = gazetteer.nearest(latitude, longitude, max_distance_km)
+    earthquake['nearest_place'] = describe(place) if place is not None else None
+    return earthquake
+
+
+if __name__ == "__main__":
+    from config import configure_logging
+
+    configure_logging()
+    build_index()
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import logging
+import itertools
+import contextvars
+import threading
+import traceback
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimeout(Exception):
+    """
+    Aşama süre sınırını aştı. Çağrı iptal edilemez; `thread` arka planda sürmeye devam eden
+    (bırakılan) iş parçacığıdır ve sonucu atılır.
+    """
+
+    def __init__(self, stage, seconds, thread=None):
+        super().__init__(f"'{stage}' aşaması {seconds:g} sn içinde tamamlanmadı")
+        self.stage = stage
+        self.seconds = seconds
+        self.thread = thread
+
+
+def call_with_deadline(stage, seconds, func, *args, **kwargs):
+    """
+    `func`'ı ayrı bir (daemon) iş parçacığında, çağıranın bağlamıyla (log bağlamı dahil) çalıştırır
+    ve en fazla `seconds` bekler; süre dolarsa StageTimeout fırlatır. Asılı kalan çağrı süreç
+    kapanışını engellemez.
+    """
+    outcome = {}
+    done = threading.Event()
+    context = contextvars.copy_context()
+
+    def target():
+        try:
+            outcome['value'] = context.run(func, *args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=target, name=f'stage-{stage}', daemon=True)
+    thread.start()
+    if not done.wait(seconds):
+        raise StageTimeout(stage, seconds, thread)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+
+def when_finished(thread, callback):
+    """
+    `callback`'i bırakılan çağrının iş parçacığı (bkz. StageTimeout.thread) bittikten sonra çağırır;
+    iş parçacığı yoksa ya da bitmişse hemen çağırır. Bırakılan çağrının hâlâ kullandığı
+    kaynakları (ör. okunmakta olan geçici dosyalar) serbest bırakmak için kullanılır.
+    """
+    if thread is None or not thread.is_alive():
+        callback()
+        return
+
+    def wait():
+        thread.join()
+        callback()
+
+    threading.Thread(target=wait, name=f'{thread.name}-cleanup', daemon=True).start()
+
+
+def dump_stacks():
+    """Tüm iş parçacıklarının o anki yığın izlerini tek bir metin olarak döndürür."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    sections = []
+    for ident, frame in sys._current_frames().items():
+        stack = ''.join(traceback.format_stack(frame))
+        sections.append(f"--- {names.get(ident, ident)} ---\n{stack}")
+    return '\n'.join(sections)
+
+
+class Watchdog:
+    """
+    Döngünün ilerleyip ilerlemediğini izleyen bekçi.
+
+    Aşamalar `track` ile işaretlenir; bir aşama süre sınırı + `grace_seconds` (süre sınırı
+    olmayan aşamalarda `stall_seconds`) boyunca bitmezse döngü takılmış sayılır: tüm iş
+    parçacıklarının yığın izleri loglanır ve `on_stall` ile ilgili istemciler yeniden kurulur.
+
+    Canlılık (liveness): `liveness_seconds` içinde bir ilerleme olduysa ve takılmış aşama yoksa.
+    Hazırlık (readiness): canlıysa ve `ready_check` (ör. Kandilli'ye ulaşılabiliyor mu) doğruysa.
+    Durum `status()` ile alınır; `health_file` verilirse her turda bu dosyaya JSON olarak yazılır.
+    """
+
+    def __init__(self, deadlines=None, grace_seconds=30, stall_seconds=300, liveness_seconds=900,
+                 interval_seconds=5, health_file=None, on_stall=None, ready_check=None, clock=time.monotonic):
+        self.deadlines = dict(deadlines or {})
+        self.grace_seconds = grace_seconds
+        self.stall_seconds = stall_seconds
+        self.liveness_seconds = liveness_seconds
+        self.interval_seconds = interval_seconds
+        self.health_file = health_file
+        self.on_stall = on_stall
+        self.ready_check = ready_check
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._active = {}  # belirteç -> (aşama, başlangıç)
+        self._tokens = itertools.count()
+        self._reported = set()  # Yığın izi zaten loglanmış belirteçler
+        self._last_progress = clock()
+        self.stalls = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='watchdog', daemon=True)
+
+    @classmethod
+    def from_config(cls, config, on_stall=None, ready_check=None):
+        return cls(
+            deadlines=stage_deadlines(config),
+            grace_seconds=config.WATCHDOG_GRACE_SECONDS,
+            stall_seconds=config.WATCHDOG_STALL_SECONDS,
+            liveness_seconds=config.WATCHDOG_LIVENESS_SECONDS,
+            interval_seconds=config.WATCHDOG_INTERVAL_SECONDS,
+            health_file=config.HEALTH_FILE or None,
+            on_stall=on_stall,
+            ready_check=ready_check,
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def beat(self):
+        """Ana döngünün ilerlediğini bildirir."""
+        self._last_progress = self.clock()
+
+    @contextmanager
+    def track(self, stage):
+        """Bloğu `stage` aşaması olarak izler; girişte ve çıkışta ilerleme sayılır."""
+        token = next(self._tokens)
+        now = self.clock()
+        with self._lock:
+            self._active[token] = (stage, now)
+            self._last_progress = now
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._active[token]
+                self._reported.discard(token)
+                self._last_progress = self.clock()
+
+    def _limit(self, stage):
+        deadline = self.deadlines.get(stage)
+        return deadline + self.grace_seconds if deadline else self.stall_seconds
+
+    def stalled(self):
+        """Sınırını aşmış aşamalar: [(belirteç, aşama, süre)]."""
+        now = self.clock()
+        with self._lock:
+            active = list(self._active.items())
+        return [
+            (token, stage, now - started) for token, (stage, started) in active
+            if now - started > self._limit(stage)
+        ]
+
+    def check(self):
+        """Takılmış aşamaları bulur; her biri için bir kez yığın izi loglar ve istemcileri yeniden kurar."""
+        stalled = self.stalled()
+        fresh = [(token, stage, age) for token, stage, age in stalled if token not in self._reported]
+        if fresh:
+            self.stalls += len(fresh)
+            stages = sorted({stage for _, stage, _ in fresh})
+            for _, stage, age in fresh:
+                metrics.STALLS.inc(stage=stage)
+            logger.critical(
+                f"Döngü takıldı: {', '.join(f'{stage} ({age:.0f} sn)' for _, stage, age in fresh)}. "
+                f"İş parçacıklarının yığın izleri:\n{dump_stacks()}"
+            )
+            with self._lock:
+                self._reported.update(token for token, _, _ in fresh)
+            if self.on_stall is not None:
+                try:
+                    self.on_stall(stages)
+                except Exception as e:
+                    logger.error(f"Takılan aşamanın istemcileri yeniden kurulamadı: {e}", exc_info=True)
+        return stalled
+
+    def status(self):
+        now = self.clock()
+        with self._lock:
+            active = [{'stage': stage, 'seconds': round(now - started, 1)} for stage, started in self._active.values()]
+        idle = now - self._last_progress
+        stalled = self.stalled()
+        alive = idle < self.liveness_seconds and not stalled
+        ready = alive
+        if alive and self.ready_check is not None:
+            try:
+                ready = bool(self.ready_check())
+            except Exception:
+                ready = False
+        return {
+            'alive': alive,
+            'ready': ready,
+            'seconds_since_progress': round(idle, 1),
+            'active_stages': active,
+            'stalled_stages': [stage for _, stage, _ in stalled],
+            'stalls': self.stalls,
+            'time': time.time(),
+        }
+
+    def write_health_file(self, status=None):
+        """Durumu `health_file`'a atomik olarak yazar (exec/dosya tabanlı sağlık kontrolleri için)."""
+        if not self.health_file:
+            return
+        status = status or self.status()
+        temp_path = self.health_file + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(status, f)
+            os.replace(temp_path, self.health_file)
+        except OSError as e:
+            logger.warning(f"Sağlık dosyası yazılamadı: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
+            self.write_health_file()
+
+
+def stage_deadlines(config):
+    """Config'teki aşama süre sınırları (saniye); 0 olan aşamalar sınırsızdır."""
+    return {
+        'fetch': config.DEADLINE_FETCH_SECONDS,
+        'db_lookup': config.DEADLINE_DB_LOOKUP_SECONDS,
+        'render': config.DEADLINE_RENDER_SECONDS,
+        'upload': config.DEADLINE_UPLOAD_SECONDS,
+        'db_save': config.DEADLINE_DB_SAVE_SECONDS,
+    }
@@ -0,0 +1,244 @@
+import time
+import random
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Çekme sonuçları: "değişiklik yok" ile "kaynağa ulaşılamadı" ayrı tutulur
+OK = 'ok'
+NOT_MODIFIED = 'not_modified'
+UNAVAILABLE = 'unavailable'
+CIRCUIT_OPEN = 'circuit_open'
+
+# Tekrar denemeye değer HTTP durum kodları (diğer 4xx'ler tekrar denenmez)
+RETRY_STATUS_CODES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+
+class FetchResult(namedtuple('FetchResult', 'status response error attempts elapsed retry_after')):
+    """
+    Tek bir `get` çağrısının sonucu. `status` OK, NOT_MODIFIED, UNAVAILABLE ya da CIRCUIT_OPEN;
+    `response` sadece OK'de doludur. `retry_after`, devre açıkken bir sonraki denemeye kadar
+    beklenmesi gereken süredir (saniye).
+    """
+
+    @property
+    def available(self):
+        return self.status in (OK, NOT_MODIFIED)
+
+
+class CircuitBreaker:
+    """
+    Art arda `failure_threshold` başarısız çekmeden sonra devreyi açar; açıkken istek yapılmaz.
+    `reset_timeout` sonra tek bir deneme isteğine izin verilir (yarı açık): başarılıysa devre
+    kapanır, başarısızsa süre iki katına çıkarak (`max_reset_timeout` ile sınırlı) yeniden açılır.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60, max_reset_timeout=600, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = None
+        self._current_timeout = reset_timeout
+        self._probing = False
+
+    @property
+    def is_open(self):
+        return self._open_until is not None
+
+    def retry_after(self):
+        """Devre açıksa deneme isteğine kadar kalan süre (saniye), değilse 0."""
+        if self._open_until is None:
+            return 0.0
+        return max(0.0, self._open_until - self.clock())
+
+    def allow(self):
+        """İstek yapılabilir mi? Açık devrenin süresi dolduysa tek bir deneme isteğine izin verir."""
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self._probing or self.clock() < self._open_until:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._open_until is not None:
+                logger.info("Kandilli'ye yeniden ulaşıldı, devre kapatıldı.")
+            self._failures = 0
+            self._open_until = None
+            self._current_timeout = self.reset_timeout
+            self._probing = False
+            metrics.CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing:
+                # Deneme isteği de başarısız: daha uzun süre bekle
+                self._current_timeout = min(self.max_reset_timeout, self._current_timeout * 2)
+            elif self._failures < self.failure_threshold:
+                return
+            self._probing = False
+            self._open_until = self.clock() + self._current_timeout
+            logger.warning(
+                f"Kandilli'ye {self._failures} kez art arda ulaşılamadı, {self._current_timeout:.0f} sn istek yapılmayacak."
+            )
+            metrics.CIRCUIT_OPEN.set(1)
+
+
+class ResilientHttpClient:
+    """
+    Toplam gecikme bütçesi içinde tekrar deneyen, yavaş isteklere yedek (hedged) istek gönderen
+    ve kesinti sırasında devre kesiciyle hiç istek yapmayan HTTP GET istemcisi.
+
+    - Bağlantı ve okuma zaman aşımları ayrıdır; her denemenin okuma süresi kalan bütçeyle sınırlanır.
+    - Bağlantı hataları, zaman aşımları ve RETRY_STATUS_CODES tekrar denenir; denemeler arasında
+      üstel artan, tam rastgele (full jitter) bekleme yapılır.
+    - Bir istek `hedge_after` saniyede yanıt vermezse aynı isteğin ikinci bir kopyası gönderilir,
+      önce gelen başarılı yanıt kullanılır.
+    - `get` hiçbir durumda `budget` süresinden uzun beklemez; geç kalan istekler arka planda
+      tamamlanıp atılır.
+    """
+
+    def __init__(self, session=None, connect_timeout=3.05, read_timeout=10, budget=20, max_attempts=3,
+                 backoff_base=0.5, backoff_max=5, hedge_after=None, breaker=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.session = session or requests.Session()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.clock = clock
+        self.sleep = sleep
+        # Asılı kalan istekler çağıranı bekletmesin diye istekler ayrı iş parçacıklarında yapılır
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='kandilli-http')
+
+    @classmethod
+    def from_config(cls, config, session=None, clock=time.monotonic):
+        return cls(
+            session=session,
+            connect_timeout=config.KANDILLI_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=config.KANDILLI_READ_TIMEOUT_SECONDS,
+            budget=config.KANDILLI_FETCH_BUDGET_SECONDS,
+            max_attempts=config.KANDILLI_MAX_ATTEMPTS,
+            backoff_base=config.KANDILLI_BACKOFF_BASE_SECONDS,
+            hedge_after=config.KANDILLI_HEDGE_AFTER_SECONDS or None,
+            breaker=CircuitBreaker(
+                failure_threshold=config.KANDILLI_BREAKER_FAILURES,
+                reset_timeout=config.KANDILLI_BREAKER_RESET_SECONDS,
+                clock=clock,
+            ),
+            clock=clock,
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    def reset(self):
+        """
+        Oturumu ve istek iş parçacıklarını yenileriyle değiştirir (başlıklar korunur). Asılı
+        kalan istekler eski oturumda tamamlanıp atılır.
+        """
+        old_session, old_executor = self.session, self._executor
+        self.session = requests.Session()
+        self.session.headers.update(old_session.headers)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='kandilli-http')
+        old_executor.shutdown(wait=False)
+        old_session.close()
+
+    def get(self, url, headers=None) -> FetchResult:
+        start = self.clock()
+        if not self.breaker.allow():
+            return FetchResult(CIRCUIT_OPEN, None, None, 0, 0.0, self.breaker.retry_after())
+
+        deadline = start + self.budget
+        attempts, error = 0, None
+        for attempts in range(1, self.max_attempts + 1):
+            if attempts > 1:
+                metrics.FETCH_RETRIES.inc()
+            response, error = self._attempt(url, headers, deadline)
+            if response is not None:
+                self.breaker.record_success()
+                status = NOT_MODIFIED if response.status_code == 304 else OK
+                return FetchResult(status, response if status == OK else None, None, attempts, self.clock() - start, 0.0)
+            if attempts == self.max_attempts or not self._retryable(error):
+                break
+
+            # Tam rastgele üstel bekleme; bütçede bekleme + bir deneme için yer yoksa vazgeç
+            backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+            if self.clock() + backoff >= deadline - self.connect_timeout:
+                break
+            logger.debug(f"Kandilli isteği başarısız ({error}), {backoff:.2f} sn sonra tekrar denenecek")
+            self.sleep(backoff)
+
+        self.breaker.record_failure()
+        return FetchResult(UNAVAILABLE, None, error, attempts, self.clock() - start, self.breaker.retry_after())
+
+    def _attempt(self, url, headers, deadline):
+        """
+        Tek deneme (gerekirse yedek istekle). Başarılıysa (yanıt, None), değilse (None, hata) döner.
+        5xx gibi tekrar denenebilir durum kodları da hata sayılır.
+        """
+        futures = {self._executor.submit(self._request, url, headers, deadline)}
+        hedged = False
+        error = None
+        while futures:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return None, error or requests.exceptions.Timeout("Gecikme bütçesi aşıldı")
+
+            timeout = remaining
+            if self.hedge_after and not hedged:
+                timeout = min(remaining, self.hedge_after)
+            done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if self.hedge_after and not hedged:
+                    # İlk istek yavaş: ikinci bir kopya gönder, hangisi önce dönerse onu kullan
+                    hedged = True
+                    metrics.FETCH_HEDGES.inc()
+                    futures.add(self._executor.submit(self._request, url, headers, deadline))
+                continue
+
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    error = e
+                    continue
+                if response.status_code in RETRY_STATUS_CODES:
+                    error = requests.exceptions.HTTPError(f"{response.status_code} yanıtı", response=response)
+                    continue
+                if response.status_code >= 400:
+                    return None, requests.exceptions.HTTPError(f"{response.status_code} yanıtı", response=response)
+                for other in futures:
+                    other.cancel()
+                return response, None
+        return None, error
+
+    def _request(self, url, headers, deadline):
+        read_timeout = max(0.1, min(self.read_timeout, deadline - self.clock()))
+        return self.session.get(url, headers=headers, timeout=(self.connect_timeout, read_timeout))
+
+    @staticmethod
+    def _retryable(error):
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            return error.response.status_code in RETRY_STATUS_CODES
+        return isinstance(error, requests.exceptions.RequestException)
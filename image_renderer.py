@@ -0,0 +1,299 @@
+import io
+import os
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+from basemap import Basemap, BASEMAP_PATH
+from swarm import ALBUM_MAX_ITEMS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = os.path.join(BASE_DIR, "fonts", "OpenSans-VariableFont_wdth,wght.ttf")
+ICON_PATH = os.path.join(BASE_DIR, "uyari_isareti.png")
+
+# Görsel Ayarları
+WIDTH, HEIGHT = 1080, 1080
+BACKGROUND_COLOR = (255, 255, 255)
+TEXT_COLOR = (0, 0, 0)
+RED_COLOR = (200, 0, 0)
+GRAY_COLOR = (100, 100, 100)
+FOOTER_TEXT = "Kaynak: Kandilli Rasathanesi"
+JPEG_QUALITY = 75  # Pillow varsayılanı
+
+# Biçim düzenleri: görsel boyutu, yazıların dikey konumları ve harita kutusu (x, y, genişlik, yükseklik)
+Layout = namedtuple('Layout', 'size icon_y location_y magnitude_y place_y depth_y date_y footer_y map_box')
+LAYOUTS = {
+    'feed': Layout((WIDTH, HEIGHT), icon_y=200, location_y=350, magnitude_y=450, place_y=570, depth_y=650,
+                   date_y=750, footer_y=980, map_box=(760, 30, 290, 200)),
+    'story': Layout((1080, 1920), icon_y=560, location_y=710, magnitude_y=810, place_y=930, depth_y=1090,
+                    date_y=1190, footer_y=1780, map_box=(190, 1320, 700, 400)),
+}
+THUMBNAIL_REDUCE = 4  # Önizleme görseli, akış görselinin 1/4'ü (270x270)
+FORMATS = ('feed', 'story', 'thumbnail')
+# JPEG kodlaması GIL'i bıraktığı için biçimler paralel kodlanır (tek çekirdekte sırayla)
+ENCODE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Artçı fırtınası özet görseli
+HIGHLIGHT_COLOR = (255, 228, 228)
+SUMMARY_TABLE_TOP = 300
+SUMMARY_ROW_HEIGHT = 52
+SUMMARY_MAX_ROWS = 12
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _encode_pool():
+    """Tüm çizicilerin paylaştığı JPEG kodlama havuzu (ilk kullanımda oluşturulur)."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix='jpeg')
+        return _encoder
+
+
+def _encode_jpeg(image, output=None):
+    """Görseli verilen dosyaya ya da belleğe JPEG olarak yazar."""
+    if output is None:
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=JPEG_QUALITY)
+        output.seek(0)
+        return output
+    image.save(output, format="JPEG", quality=JPEG_QUALITY)
+    return output
+
+
+class EarthquakeImageRenderer:
+    """
+    Deprem görsellerini oluşturan, yeniden kullanılabilir çizici.
+
+    Fontlar ve uyarı işareti bir kez yüklenir; arka plan, ikon ve alt bilgiden oluşan sabit
+    şablon her biçim (akış, hikaye) için önceden çizilir. Her deprem için yazıların ölçüleri bir
+    kez hesaplanır ve istenen tüm biçimler aynı geçişte şablonların kopyalarına çizilir; önizleme
+    görseli akış görselinden küçültülür. Sonuçlar bellekte JPEG olarak döner, böylece eşzamanlı
+    çizimler birbirini ezmez.
+
+    Depremin enlem/boylamı biliniyorsa merkez üssü, belleğe eşlenmiş hazır haritadan kırpılan
+    küçük bir harita üzerinde gösterilir. `basemap_path=None` ile harita kapatılır.
+    """
+
+    def __init__(self, font_path=FONT_PATH, icon_path=ICON_PATH, basemap_path=BASEMAP_PATH):
+        # Türkçe karakterleri destekleyen Open Sans fontunu kullanıyoruz
+        self.font_large = ImageFont.truetype(font_path, size=90)
+        self.font_medium = ImageFont.truetype(font_path, size=60)
+        self.font_footer = ImageFont.truetype(font_path, size=30)
+        self.font_row = ImageFont.truetype(font_path, size=36)
+        try:
+            warning_icon = Image.open(icon_path).convert("RGBA").resize((100, 100))
+        except FileNotFoundError:
+            logging.warning(f"Uyarı işareti görseli '{icon_path}' bulunamadı.")
+            warning_icon = None
+        self.templates = {name: self._build_template(layout, warning_icon) for name, layout in LAYOUTS.items()}
+        self.basemap = Basemap.shared(basemap_path) if basemap_path else None
+
+    def _build_template(self, layout, warning_icon):
+        width, _ = layout.size
+        template = Image.new("RGB", layout.size, BACKGROUND_COLOR)
+        draw = ImageDraw.Draw(template)
+
+        # Uyarı İşareti Ekleme
+        if warning_icon is not None:
+            icon_x = (width - warning_icon.width) / 2
+            template.paste(warning_icon, (int(icon_x), layout.icon_y), warning_icon)
+
+        # Alt Bilgi
+        footer_bbox = draw.textbbox((0, 0), FOOTER_TEXT, font=self.font_footer)
+        footer_width = footer_bbox[2] - footer_bbox[0]
+        footer_x = (width - footer_width) / 2
+        draw.text((footer_x, layout.footer_y), FOOTER_TEXT, font=self.font_footer, fill=GRAY_COLOR)
+
+        return template
+
+    def _draw_centered(self, draw, text, font, y, fill):
+        bbox = draw.textbbox((0, 0), text, font=font)
+        x = (WIDTH - (bbox[2] - bbox[0])) / 2
+        draw.text((x, y), text, font=font, fill=fill)
+
+    def _measure(self, earthquake_data: dict) -> dict:
+        """Depremin yazılarını ve ortalanacak yazıların genişliklerini (biçimlerden bağımsız) bir kez hesaplar."""
+        magnitude = f"M {earthquake_data['magnitude']}"
+        location = earthquake_data['location'].upper()
+        place = earthquake_data.get('nearest_place') or ''
+        return {
+            'magnitude': (magnitude, self.font_large.getlength(magnitude)),
+            'location': (location, self.font_medium.getlength(location)),
+            'place': (place, self.font_row.getlength(place)),
+            'depth': f"Derinlik: {earthquake_data['depth']} km",
+            'date': f"Tarih: {earthquake_data['earthquake_time'].strftime('%d.%m.%Y %H:%M:%S')}",
+            'epicenter': (earthquake_data.get('latitude'), earthquake_data.get('longitude')),
+        }
+
+    def _draw_event(self, texts: dict, name: str) -> Image.Image:
+        layout = LAYOUTS[name]
+        image = self.templates[name].copy()
+        draw = ImageDraw.Draw(image)
+        width, _ = layout.size
+
+        # Lokasyon ve büyüklük (ortalı)
+        location, location_width = texts['location']
+        draw.text(((width - location_width) / 2, layout.location_y), location, font=self.font_medium, fill=TEXT_COLOR)
+        magnitude, magnitude_width = texts['magnitude']
+        draw.text(((width - magnitude_width) / 2, layout.magnitude_y), magnitude, font=self.font_large, fill=RED_COLOR)
+        # En yakın yerleşime göre tarif (ör. "Sındırgı'nın 12 km kuzeydoğusu (Balıkesir)")
+        place, place_width = texts['place']
+        if place:
+            draw.text(((width - place_width) / 2, layout.place_y), place, font=self.font_row, fill=GRAY_COLOR)
+
+        # Diğer Bilgiler
+        draw.text((150, layout.depth_y), texts['depth'], font=self.font_medium, fill=TEXT_COLOR)
+        draw.text((150, layout.date_y), texts['date'], font=self.font_medium, fill=TEXT_COLOR)
+
+        # Merkez üssü haritası
+        latitude, longitude = texts['epicenter']
+        if self.basemap is not None and latitude is not None and longitude is not None:
+            x, y, map_width, map_height = layout.map_box
+            inset = self.basemap.inset(latitude, longitude, (map_width, map_height))
+            if inset is not None:
+                image.paste(inset, (x, y))
+        return image
+
+    def render(self, earthquake_data: dict) -> Image.Image:
+        """Şablonun kopyasına depreme özel yazıları çizer ve akış (1080x1080) görselini döndürür."""
+        return self._draw_event(self._measure(earthquake_data), 'feed')
+
+    def render_formats(self, earthquake_data: dict, formats=('feed',)) -> dict:
+        """
+        İstenen biçimleri ('feed', 'story', 'thumbnail') tek geçişte çizer ve biçim adından
+        görsele bir sözlük döndürür. Yazı ölçüleri bir kez hesaplanır.
+        """
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Bilinmeyen görsel biçimi: {', '.join(sorted(unknown))}")
+
+        texts = self._measure(earthquake_data)
+        images = {}
+        for name in formats:
+            if name == 'thumbnail':
+                feed = images.get('feed') or self._draw_event(texts, 'feed')
+                images[name] = feed.reduce(THUMBNAIL_REDUCE)
+            elif name not in images:
+                images[name] = self._draw_event(texts, name)
+        return {name: images[name] for name in formats}
+
+    def render_variants(self, earthquake_data: dict, formats=FORMATS) -> dict:
+        """İstenen biçimleri çizer, paralel olarak JPEG'e kodlar ve biçim adından belleğe (BytesIO) sözlük döndürür."""
+        images = self.render_formats(earthquake_data, formats)
+        return dict(zip(images, self._encode_all(list(images.values()))))
+
+    def _encode_all(self, images, paths=None):
+        """Görselleri paralel olarak JPEG'e kodlar; `paths` verilirse dosyalara yazar."""
+        paths = paths or [None] * len(images)
+        if len(images) == 1 or ENCODE_WORKERS < 2:
+            return [_encode_jpeg(image, path) for image, path in zip(images, paths)]
+        return list(_encode_pool().map(_encode_jpeg, images, paths))
+
+    def render_summary(self, earthquakes) -> Image.Image:
+        """
+        Artçı fırtınası albümünün ilk görseli: depremlerin zaman sıralı tablosu, en büyük deprem
+        kırmızı ve vurgulu. Sığmayan satırlar "+N deprem daha" olarak belirtilir.
+        """
+        largest = max(earthquakes, key=lambda eq: eq['magnitude'])
+        rows = sorted(earthquakes, key=lambda eq: eq['earthquake_time'])
+
+        image = Image.new("RGB", (WIDTH, HEIGHT), BACKGROUND_COLOR)
+        draw = ImageDraw.Draw(image)
+
+        self._draw_centered(draw, f"{len(earthquakes)} DEPREM", self.font_large, 60, RED_COLOR)
+        self._draw_centered(draw, largest['location'].upper(), self.font_medium, 180, TEXT_COLOR)
+
+        hidden = max(0, len(rows) - SUMMARY_MAX_ROWS)
+        if hidden:
+            # En büyük deprem her zaman tabloda kalır
+            rows = rows[-SUMMARY_MAX_ROWS:]
+            if largest not in rows:
+                rows = sorted(rows[1:] + [largest], key=lambda eq: eq['earthquake_time'])
+
+        y = SUMMARY_TABLE_TOP
+        for earthquake in rows:
+            is_largest = earthquake is largest
+            if is_largest:
+                draw.rectangle((60, y - 6, WIDTH - 60, y + SUMMARY_ROW_HEIGHT - 10), fill=HIGHLIGHT_COLOR)
+            fill = RED_COLOR if is_largest else TEXT_COLOR
+            draw.text((80, y), earthquake['earthquake_time'].strftime('%H:%M:%S'), font=self.font_row, fill=fill)
+            draw.text((300, y), f"M {earthquake['magnitude']}", font=self.font_row, fill=fill)
+            draw.text((460, y), self._fit(draw, earthquake['location'], WIDTH - 540), font=self.font_row, fill=fill)
+            y += SUMMARY_ROW_HEIGHT
+
+        if hidden:
+            draw.text((80, y), f"+{hidden} deprem daha", font=self.font_row, fill=GRAY_COLOR)
+
+        footer_bbox = draw.textbbox((0, 0), FOOTER_TEXT, font=self.font_footer)
+        draw.text(((WIDTH - (footer_bbox[2] - footer_bbox[0])) / 2, 980), FOOTER_TEXT, font=self.font_footer, fill=GRAY_COLOR)
+        return image
+
+    def _fit(self, draw, text, max_width):
+        """Metni verilen genişliğe sığacak şekilde kısaltır."""
+        if draw.textlength(text, font=self.font_row) <= max_width:
+            return text
+        while text and draw.textlength(text + '…', font=self.font_row) > max_width:
+            text = text[:-1]
+        return text + '…'
+
+    def render_jpeg(self, earthquake_data: dict) -> io.BytesIO:
+        """Görseli bellekte JPEG olarak döndürür."""
+        return _encode_jpeg(self.render(earthquake_data))
+
+    def render_to_file(self, earthquake_data: dict, output_path=None) -> str:
+        """
+        Görseli diske yazar ve yolunu döndürür. Yol verilmezse her çağrıda benzersiz
+        bir geçici dosya oluşturulur; dosyayı silmek çağıranın sorumluluğundadır.
+        """
+        return self._save(self.render(earthquake_data), output_path)
+
+    def render_post_files(self, earthquake_data: dict, formats=('feed',)) -> dict:
+        """
+        Paylaşımın tüm görsellerini geçici dosyalara yazar ve biçim adından dosya yolları listesine
+        bir sözlük döndürür. Artçı fırtınası (`swarm_events`) için akış görselleri bir albümdür: ilk
+        görsel özet tablo, ardından en büyükten başlayarak depremlerin kendi görselleri. Hikaye ve
+        önizleme ana deprem için çizilir. Tüm görseller paralel kodlanır.
+        """
+        swarm_events = earthquake_data.get('swarm_events')
+        images = self.render_formats(earthquake_data, formats)
+
+        batch = []  # (biçim, görsel)
+        for name, image in images.items():
+            if name == 'feed' and swarm_events:
+                events = [earthquake_data] + swarm_events
+                batch.append((name, self.render_summary(events)))
+                for earthquake in sorted(events, key=lambda eq: eq['magnitude'], reverse=True)[:ALBUM_MAX_ITEMS - 1]:
+                    batch.append((name, image if earthquake is earthquake_data else self.render(earthquake)))
+            else:
+                batch.append((name, image))
+
+        paths = [_temp_path() for _ in batch]
+        try:
+            self._encode_all([image for _, image in batch], paths)
+        except Exception:
+            for path in paths:
+                os.remove(path)
+            raise
+
+        files = {name: [] for name in images}
+        for (name, _), path in zip(batch, paths):
+            files[name].append(path)
+        return files
+
+    def _save(self, image, output_path=None) -> str:
+        if output_path is None:
+            output_path = _temp_path()
+        return _encode_jpeg(image, output_path)
+
+
+def _temp_path():
+    fd, path = tempfile.mkstemp(prefix="deprem_", suffix=".jpg")
+    os.close(fd)
+    return path
@@ -1,129 +1,239 @@
 import os
-from PIL import Image, ImageDraw, ImageFont
+import sys
 import logging
 from datetime import datetime
 
-# Gerekli kütüphaneleri ve ayar dosyasını import et
-try:
-    from instagrapi import Client
-    from config import Config
-except ImportError as e:
-    print(f"HATA: Gerekli bir kütüphane eksik: {e}. Lütfen 'pip install instagrapi python-dotenv Pillow' komutunu çalıştırın.")
-    exit()
+from config import Config
+from publishers import Publisher
 
-# Temel loglama ayarlarını yap
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class InstagramPoster:
-    def __init__(self, username, password):
+def _instagrapi_client():
+    """
+    instagrapi Client sınıfını ilk gerçek istemci gerektiğinde yükler (kurulu değilse None).
+    instagrapi ağır bir bağımlılıktır; sahte istemcilerle (benchmark) ve Instagram'a ihtiyaç
+    duymayan komutlarda hiç import edilmez.
+    """
+    try:
+        from instagrapi import Client
+    except ImportError:
+        return None
+    return Client
+
+
+def _login_required(error):
+    """Hata instagrapi'nin LoginRequired hatası mı (instagrapi yüklenmediyse olamaz)."""
+    exceptions = sys.modules.get('instagrapi.exceptions')
+    return exceptions is not None and isinstance(error, exceptions.LoginRequired)
+
+
+class InstagramPoster(Publisher):
+    name = 'instagram'
+    _renderer = None
+
+    def __init__(self, username, password, session_path=None, client_factory=None):
         """
         Instagram istemcisini başlatır ve giriş yapar.
+
+        `session_path` verilirse instagrapi oturum ayarları bu dosyada saklanır; dosya varsa
+        şifreyle giriş yapılmadan kaydedilmiş oturum kullanılır. Oturum Instagram tarafından
+        reddedildiğinde ilk istekte yeniden giriş yapılır. `client_factory` ile instagrapi
+        Client yerine onunla uyumlu başka bir istemci kullanılabilir.
         """
         self.username = username
         self.password = password
+        self.session_path = session_path
+        self.client_factory = client_factory or _instagrapi_client()
         self.client = None
 
         if not username or not password:
             logging.warning("Instagram kullanıcı adı veya şifresi eksik. Giriş yapılamadı.")
             return
 
-        self.client = Client()
+        if self.client_factory is None:
+            logging.error("HATA: 'instagrapi' kütüphanesi bulunamadı. Lütfen 'pip install instagrapi' ile yükleyin.")
+            return
+
+        if self._resume_session():
+            return
+
+        self.login()
+
+    def reset(self):
+        """
+        İstemciyi bırakır ve kaydedilmiş oturumdan yenisini kurar (yoksa ilk yüklemede giriş
+        yapılır). Asılı kalan yükleme eski istemcide biter.
+        """
+        self.client = None
+        if self.client_factory is not None:
+            self._resume_session()
+
+    def _resume_session(self):
+        """Kaydedilmiş oturumu yükler. Oturumun geçerliliği ilk istekte anlaşılır."""
+        if not self.session_path or not os.path.exists(self.session_path):
+            return False
+
+        client = self.client_factory()
+        try:
+            client.load_settings(self.session_path)
+        except Exception as e:
+            logging.warning(f"Kaydedilmiş Instagram oturumu okunamadı, yeniden giriş yapılacak: {e}")
+            return False
+
+        self.client = client
+        logging.info(f"✅ Kaydedilmiş Instagram oturumu yüklendi: '{self.session_path}'")
+        return True
+
+    def login(self, relogin=False):
+        """
+        Kullanıcı adı ve şifreyle giriş yapar ve oturumu diske yazar.
+        `relogin=True` ise mevcut cihaz kimlikleri korunarak oturum sıfırlanır.
+        """
+        if not self.username or not self.password or self.client_factory is None:
+            return False
+
+        client = self.client_factory()
+        if relogin and self.client is not None:
+            # Aynı cihaz kimlikleriyle girmek, Instagram'ın doğrulama istemesini azaltır
+            old_settings = self.client.get_settings()
+            client.set_uuids(old_settings.get("uuids", {}))
+
         try:
             logging.info(f"'{self.username}' olarak Instagram'a giriş yapılıyor...")
-            self.client.login(self.username, self.password)
+            client.login(self.username, self.password)
             logging.info("✅ Instagram'a başarıyla giriş yapıldı.")
         except Exception as e:
             logging.error(f"❌ Instagram'a giriş yapılamadı: {e}")
             self.client = None
+            return False
+
+        self.client = client
+        self._save_session()
+        return True
+
+    def _save_session(self):
+        if not self.session_path or not self.client:
+            return
+        try:
+            self.client.dump_settings(self.session_path)
+        except Exception as e:
+            logging.warning(f"Instagram oturumu diske yazılamadı: {e}")
 
-    def create_earthquake_image(self, earthquake_data: dict, output_path="earthquake_post.jpg"):
+    def create_earthquake_image(self, earthquake_data: dict, output_path=None):
         """
         Verilen deprem verilerinden bir görsel oluşturur.
+        `output_path` verilmezse her görsel benzersiz bir geçici dosyaya yazılır.
         """
         logging.info(f"'{earthquake_data['location']}' için görsel oluşturuluyor...")
 
-        # Görsel Ayarları
-        width, height = 1080, 1080
-        background_color = (255, 255, 255)
-        text_color = (0, 0, 0)
-        red_color = (200, 0, 0)
-        gray_color = (100, 100, 100)
-
-        image = Image.new("RGB", (width, height), background_color)
-        draw = ImageDraw.Draw(image)
-
-        try:
-            # Türkçe karakterleri destekleyen Open Sans fontunu kullanıyoruz
-            # Dosya adını senin belirttiğin şekilde güncelledim.
-            font_path = "fonts/OpenSans-VariableFont_wdth,wght.ttf"
-            font_large = ImageFont.truetype(font_path, size=90)
-            font_medium = ImageFont.truetype(font_path, size=60)
-            font_footer = ImageFont.truetype(font_path, size=30)
-        except IOError:
-            logging.error(f"Font dosyası bulunamadı: {font_path}.")
+        renderer = self.get_renderer()
+        if renderer is None:
             return None
 
-        # Uyarı İşareti Ekleme
-        try:
-            warning_icon = Image.open("uyari_isareti.png").convert("RGBA").resize((100, 100))
-            icon_x = (width - warning_icon.width) / 2
-            icon_y = 200
-            image.paste(warning_icon, (int(icon_x), int(icon_y)), warning_icon)
-        except FileNotFoundError:
-            logging.warning("Uyarı işareti görseli 'uyari_isareti.png' bulunamadı.")
-
-        # Büyüklük
-        magnitude_text = f"M {earthquake_data['magnitude']}"
-        mag_bbox = draw.textbbox((0, 0), magnitude_text, font=font_large)
-        mag_width = mag_bbox[2] - mag_bbox[0]
-        mag_x = (width - mag_width) / 2
-        mag_y = 450
-        draw.text((mag_x, mag_y), magnitude_text, font=font_large, fill=red_color)
-
-        # Lokasyon
-        location_text = earthquake_data['location'].upper()
-        loc_bbox = draw.textbbox((0, 0), location_text, font=font_medium)
-        loc_width = loc_bbox[2] - loc_bbox[0]
-        loc_x = (width - loc_width) / 2
-        loc_y = 350
-        draw.text((loc_x, loc_y), location_text, font=font_medium, fill=text_color)
-        
-        # Diğer Bilgiler
-        depth_text = f"Derinlik: {earthquake_data['depth']} km"
-        date_str = earthquake_data['earthquake_time'].strftime('%d.%m.%Y %H:%M:%S')
-        draw.text((150, 650), depth_text, font=font_medium, fill=text_color)
-        draw.text((150, 750), f"Tarih: {date_str}", font=font_medium, fill=text_color)
-        
-        # Alt Bilgi
-        footer_text = "Kaynak: Kandilli Rasathanesi"
-        footer_bbox = draw.textbbox((0, 0), footer_text, font=font_footer)
-        footer_width = footer_bbox[2] - footer_bbox[0]
-        footer_x = (width - footer_width) / 2
-        draw.text((footer_x, 980), footer_text, font=font_footer, fill=gray_color)
-
-        image.save(output_path)
+        output_path = renderer.render_to_file(earthquake_data, output_path)
         logging.info(f"Görsel başarıyla '{output_path}' olarak kaydedildi.")
         return output_path
 
+    def create_post_images(self, earthquake_data: dict, formats=('feed',)):
+        """
+        Paylaşımın görsellerini benzersiz geçici dosyalara çizer ve biçim adından ('feed', 'story',
+        'thumbnail') yollara bir sözlük döndürür. Artçı fırtınası albümü için akış görselleri
+        özet tablo ve depremlerin görselleridir, aksi halde tek görsel.
+        """
+        renderer = self.get_renderer()
+        if renderer is None:
+            return None
+        return renderer.render_post_files(earthquake_data, formats)
+
+    @classmethod
+    def get_renderer(cls):
+        """Fontları ve şablonu bir kez yükleyen paylaşılan çiziciyi döndürür."""
+        if cls._renderer is None:
+            # Pillow ve fontlar ilk görsel çizileceği zaman yüklenir
+            from image_renderer import EarthquakeImageRenderer
+
+            try:
+                cls._renderer = EarthquakeImageRenderer()
+            except IOError as e:
+                logging.error(f"Font dosyası bulunamadı: {e}")
+                return None
+        return cls._renderer
+
     def post_image_to_instagram(self, image_path: str, caption: str):
         """
         Oluşturulan görseli verilen başlıkla Instagram'a gönderir.
         """
-        if not self.client:
+        return self.upload_photo(image_path, caption) is not None
+
+    def publish(self, publication):
+        """
+        Paylaşımın akış görsellerini (birden fazlaysa albüm olarak) başlığıyla gönderir ve medya
+        ID'sini döndürür, başarısızsa None. Hikaye görseli ayrıca `upload_story` ile gönderilir.
+        """
+        feed_paths = publication.images['feed']
+        if len(feed_paths) > 1:
+            return self.upload_album(feed_paths, publication.caption)
+        return self.upload_photo(feed_paths[0], publication.caption)
+
+    def upload_photo(self, image_path: str, caption: str):
+        """
+        Görseli Instagram'a gönderir ve oluşan medyanın ID'sini döndürür, başarısızsa None.
+        """
+        logging.info(f"'{image_path}' adresindeki görsel Instagram'a gönderiliyor...")
+        return self._upload(lambda client: client.photo_upload(image_path, caption=caption))
+
+    def upload_album(self, image_paths, caption: str):
+        """
+        Görselleri tek bir albüm (carousel) olarak gönderir ve medyanın ID'sini döndürür, başarısızsa None.
+        """
+        logging.info(f"{len(image_paths)} görsellik albüm Instagram'a gönderiliyor...")
+        return self._upload(lambda client: client.album_upload(list(image_paths), caption=caption))
+
+    def upload_story(self, image_path: str):
+        """
+        Görseli hikaye olarak gönderir ve medyanın ID'sini döndürür, başarısızsa None.
+        """
+        logging.info(f"'{image_path}' adresindeki görsel hikaye olarak gönderiliyor...")
+        return self._upload(lambda client: client.photo_upload_to_story(image_path))
+
+    def _upload(self, send):
+        if not self.client and not self.login():
             logging.warning("Instagram'a giriş yapılmadığı için post atılamadı.")
-            return False
+            return None
         try:
-            logging.info(f"'{image_path}' adresindeki görsel Instagram'a gönderiliyor...")
-            self.client.photo_upload(image_path, caption=caption)
+            try:
+                media = send(self.client)
+            except Exception as e:
+                if not _login_required(e):
+                    raise
+                logging.warning("Instagram oturumu reddedildi, yeniden giriş yapılıyor...")
+                if not self.login(relogin=True):
+                    return None
+                media = send(self.client)
             logging.info("✅ Görsel başarıyla Instagram'da paylaşıldı.")
-            return True
+            return str(media.pk)
         except Exception as e:
             logging.error(f"❌ Görsel Instagram'a gönderilemedi: {e}")
-            return False
+            return None
+
+    def find_recent_media(self, caption_markers, amount=20):
+        """
+        Hesabın son paylaşımları arasında başlığı verilen metinlerin hepsini içeren medyanın
+        ID'sini döndürür, yoksa None. Sorgu yapılamazsa hata fırlatır.
+        """
+        if not self.client and not self.login():
+            raise RuntimeError("Instagram'a giriş yapılamadı")
+        for media in self.client.user_medias(self.client.user_id, amount=amount):
+            caption = media.caption_text or ''
+            if all(marker in caption for marker in caption_markers):
+                return str(media.pk)
+        return None
 
 
 # --- CANLI TEST ALANI ---
 if __name__ == "__main__":
+    from config import configure_logging
+
+    configure_logging()
     print(f"--- Instagram Poster CANLI TEST (Yeni Font ile) ---")
 
     if not Config.INSTAGRAM_USERNAME or not Config.INSTAGRAM_PASSWORD:
@@ -0,0 +1,126 @@
+import re
+import html
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# Kandilli lst0.asp listesinin sabit sütun düzeni:
+# 2024.08.20 14:30:15  39.1234   27.5678        8.7      -.-  4.2  -.-   IZMIR-SEFERIHISAR (AEGEAN SEA)            İlksel
+# Tarih      Saat      Enlem     Boylam    Derinlik      MD   ML   Mw    Yer                                       Çözüm Niteliği
+_MAG = r'(-\.-|\d+\.\d+)'
+ROW_RE = re.compile(
+    r'(\d{4})\.(\d{2})\.(\d{2}) (\d{2}):(\d{2}):(\d{2})\s+'
+    r'(-?\d+\.\d+)\s+(-?\d+\.\d+)\s+(\d+(?:\.\d+)?)\s+'
+    + _MAG + r'\s+' + _MAG + r'\s+' + _MAG + r'\s+'
+    r'(\S.*)'
+)
+PRE_BLOCK_RE = re.compile(r'<pre[^>]*>(.*?)</pre>', re.IGNORECASE | re.DOTALL)
+PAREN_RE = re.compile(r'\([^)]*\)')
+SPACES_RE = re.compile(r'\s+')
+
+NO_MAGNITUDE = '-.-'
+
+# Kandilli zamanları Türkiye saatiyle (UTC+3, yaz saati uygulaması yok) yayınlanır
+KANDILLI_TZ = timezone(timedelta(hours=3))
+
+
+def kandilli_now():
+    """Kandilli listesindeki zamanlarla karşılaştırılabilir, saat dilimi bilgisiz şimdiki zaman."""
+    return datetime.now(KANDILLI_TZ).replace(tzinfo=None)
+
+
+def extract_pre_block(page_html):
+    """Sayfadaki <pre> bloğunun içeriğini DOM kurmadan döndürür, bulunamazsa None."""
+    match = PRE_BLOCK_RE.search(page_html)
+    if not match:
+        return None
+    return html.unescape(match.group(1))
+
+
+def _magnitude(value):
+    return None if value == NO_MAGNITUDE else float(value)
+
+
+def parse_row(line):
+    """
+    Tek bir deprem satırını sabit sütun düzenine göre parse eder. Başlık veya bozuk satırlar için None döner.
+
+    Üç büyüklük türü de (md, ml, mw) ayrı ayrı döner. Paylaşımda ve `kandilli_id`'de kullanılan
+    `magnitude`, eski parser'daki gibi MD, ML, Mw sırasıyla ilk geçerli (0.1-10) değerdir; bu seçim
+    değişirse daha önce paylaşılan depremlerin ID'leri de değişir.
+    """
+    match = ROW_RE.match(line)
+    if not match:
+        return None
+
+    (year, month, day, hour, minute, second, lat, lon, depth,
+     md, ml, mw, rest) = match.groups()
+
+    # Yer adı sabit genişlikte boşlukla doldurulur, çözüm niteliği en az iki boşluk sonra gelir
+    region, _, quality = rest.rstrip().partition('  ')
+    quality = quality.strip()
+
+    md, ml, mw = _magnitude(md), _magnitude(ml), _magnitude(mw)
+    magnitude = next((value for value in (md, ml, mw) if value is not None and 0.1 <= value <= 10.0), None)
+    if magnitude is None:
+        return None
+
+    earthquake_time = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+    latitude = float(lat)
+    longitude = float(lon)
+
+    # Parantez içindeki kısmı temizle, çoklu boşlukları tek boşluğa çevir
+    location = SPACES_RE.sub(' ', PAREN_RE.sub('', region)).strip() or "Bilinmeyen Konum"
+
+    # Unique ID oluştur (tarih+konum+büyüklük kombinasyonu)
+    kandilli_id = f"{year}{month}{day}_{hour}{minute}{second}_{latitude:.3f}_{longitude:.3f}_{magnitude}"
+
+    return {
+        'magnitude': magnitude,
+        'location': location,
+        'depth': float(depth),
+        'earthquake_time': earthquake_time,
+        'latitude': latitude,
+        'longitude': longitude,
+        'kandilli_id': kandilli_id,
+        'md': md,
+        'ml': ml,
+        'mw': mw,
+        'region': region,
+        'quality': quality,
+        'is_revised': bool(quality and quality.startswith('REVIZE')),
+    }
+
+
+def iter_rows(pre_text):
+    """<pre> bloğundaki deprem satırlarını sırayla (en yeniden eskiye) parse ederek üretir."""
+    return _iter_parsed(pre_text.split('\n'))
+
+
+def iter_text_rows(lines):
+    """
+    Satır satır okunan bir metinden (kaydedilmiş lst0 sayfası ya da aynı sütun düzenindeki
+    katalog dosyası) depremleri üretir. Dosyanın tamamı belleğe alınmaz; HTML karakter
+    kodları sadece içeren satırlarda çözülür.
+    """
+    return _iter_parsed(html.unescape(line) if '&' in line else line for line in lines)
+
+
+def _iter_parsed(lines):
+    for line in lines:
+        # Başlık satırlarını regex'e sokmadan ele
+        if not line[:1].isdigit():
+            continue
+        earthquake = parse_row(line)
+        if earthquake:
+            yield earthquake
+
+
+def parse_listing(page_html):
+    """Bütün lst0.asp sayfasını parse eder. <pre> bloğu yoksa boş liste döner."""
+    pre_text = extract_pre_block(page_html)
+    if pre_text is None:
+        logger.error("Pre tag bulunamadı - site yapısı değişmiş olabilir")
+        return []
+    return list(iter_rows(pre_text))
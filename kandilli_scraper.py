@@ -1,18 +1,30 @@
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
+import html
 import time
+import hashlib
 import logging
 
+import metrics
+from http_client import ResilientHttpClient, UNAVAILABLE, CIRCUIT_OPEN, NOT_MODIFIED
+from kandilli_parser import PRE_BLOCK_RE, extract_pre_block, iter_rows, parse_row
+from log_pipeline import RATE_LIMITED
+
 # Logger kurulumu
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Satır başındaki "2024.08.20 14:30:15" zaman damgası
+ROW_STAMP_RE = re.compile(r'\d{4}\.\d{2}\.\d{2} \d{2}:\d{2}:\d{2}')
+STAMP_FORMAT = '%Y.%m.%d %H:%M:%S'
+
 class KandilliScraper:
-    def __init__(self):
-        self.url = "http://www.koeri.boun.edu.tr/scripts/lst0.asp"
-        self.session = requests.Session()
+    def __init__(self, url=None, client=None, lookback_minutes=30):
+        self.url = url or "http://www.koeri.boun.edu.tr/scripts/lst0.asp"
+        # Geç yayımlanan satırlar için işaretin bu kadar altı da taranır (deprem zamanı, dakika)
+        self.lookback_minutes = lookback_minutes
+        # Tekrar deneme, gecikme bütçesi ve devre kesiciyle istek yapan istemci
+        self.client = client or ResilientHttpClient()
+        self.session = self.client.session
         
         # Headers ekle (bot olmadığımızı göstermek için)
         self.session.headers.update({
@@ -22,50 +34,180 @@ class KandilliScraper:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         })
+
+        # Artımlı mod durumu
+        self._etag = None
+        self._last_modified = None
+        self._pre_hash = None
+        # Görülen en yeni deprem zaman damgası ve geriye bakma penceresinde görülen kandilli_id'ler
+        self.high_water_mark = None
+        self._seen = {}  # kandilli_id -> zaman damgası
+        # Son çekme başarılı mı? Boş liste "deprem yok" ile "hata" ayrımı için
+        self.last_fetch_ok = None
+        # Son çekmenin sonucu (http_client.OK, NOT_MODIFIED, UNAVAILABLE ya da CIRCUIT_OPEN)
+        self.last_status = None
+        self.last_result = None
+
+    def restarted(self):
+        """
+        Aynı adresle, HTTP istemcisi yenilenmiş ve artımlı durumu sıfırlanmış yeni bir scraper
+        döndürür. Asılı kalan çekme eski nesnede biter; sonucu yeni nesnenin durumunu bozmaz.
+        """
+        self.client.reset()
+        return type(self)(self.url, self.client, self.lookback_minutes)
+
+    def _fetch(self, headers=None):
+        """
+        Listeyi ister ve yanıtı döndürür. Liste değişmemişse (304) ya da kaynağa ulaşılamadıysa
+        None döner; hangisi olduğu `last_status` ile anlaşılır.
+        """
+        result = self.client.get(self.url, headers=headers)
+        self.last_result = result
+        self.last_status = result.status
+        self.last_fetch_ok = result.available
+        metrics.FETCH_RESULTS.inc(status=result.status)
+        if result.attempts:
+            metrics.FETCH_SECONDS.observe(result.elapsed)
+
+        if result.status == UNAVAILABLE:
+            logger.error(f"Kandilli sitesine ulaşılamadı ({result.attempts} deneme, {result.elapsed:.1f} sn): {result.error}")
+            metrics.ERRORS.inc(stage='fetch')
+        elif result.status == CIRCUIT_OPEN:
+            logger.warning(f"Kandilli şu an erişilemez durumda, {result.retry_after:.0f} sn istek yapılmayacak.")
+        elif result.status == NOT_MODIFIED:
+            logger.debug("Kandilli listesi değişmemiş (304)")
+        return result.response
+
+    def _mark_failed(self, stage):
+        self.last_fetch_ok = False
+        self.last_status = UNAVAILABLE
+        metrics.ERRORS.inc(stage=stage)
     
     def get_latest_earthquakes(self):
         """Kandilli'den son depremleri çek"""
         try:
-            logger.info("Kandilli'den veri çekiliyor...")
+            logger.info("Kandilli'den veri çekiliyor...", extra=RATE_LIMITED)
             
             # Kandilli sitesine istek gönder
-            response = self.session.get(self.url, timeout=15)
-            response.raise_for_status()
+            response = self._fetch()
+            if response is None:
+                return []
             
             # Türkçe karakter sorunları için encoding ayarla
             response.encoding = 'utf-8'
             
-            # HTML'i parse et
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Pre tagını bul (Kandilli verileri burada)
-            pre_tag = soup.find('pre')
-            if not pre_tag:
+            # Pre bloğunu bul (Kandilli verileri burada) ve sabit sütun düzenine göre parse et
+            pre_text = extract_pre_block(response.text)
+            if pre_text is None:
                 logger.error("Pre tag bulunamadı - site yapısı değişmiş olabilir")
+                self._mark_failed('parse')
                 return []
-            
-            # Satırları ayır
-            lines = pre_tag.text.strip().split('\n')
-            
-            earthquakes = []
-            
-            for line in lines[7:]:  # İlk 7 satır başlık
-                earthquake = self.parse_earthquake_line(line)
-                if earthquake:
-                    earthquakes.append(earthquake)
-            
-            logger.info(f"{len(earthquakes)} deprem verisi çekildi")
+
+            with metrics.PARSE_SECONDS.time():
+                earthquakes = list(iter_rows(pre_text))
+            metrics.ROWS_PARSED.inc(len(earthquakes))
+
+            logger.info("%d deprem verisi çekildi", len(earthquakes), extra=RATE_LIMITED)
             return earthquakes
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Kandilli sitesine bağlanırken hata: {e}")
-            return []
         except Exception as e:
             logger.error(f"Beklenmeyen hata: {e}")
+            self._mark_failed('fetch')
             return []
     
+    def get_new_earthquakes(self):
+        """
+        Artımlı mod: Sadece bir önceki çağrıdan sonra listeye eklenen depremleri döndürür.
+
+        Sunucu destekliyorsa If-None-Match / If-Modified-Since ile koşullu istek yapılır.
+        Aksi halde <pre> bloğunun özeti bir öncekiyle aynıysa hiç parse edilmeden boş liste döner.
+        Liste en yeniden eskiye sıralı olduğu için okuma, yüksek su işaretinin (high-water mark)
+        `lookback_minutes` altına inince durur; penceredeki satırlar görülen ID'lerle elenir, böylece
+        Kandilli'nin geç yayımladığı (işaretten eski zamanlı) depremler de yakalanır. İlk çağrıda
+        tüm liste döner.
+        """
+        try:
+            headers = {}
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+
+            response = self._fetch(headers)
+            if response is None:
+                return []
+
+            self._etag = response.headers.get('ETag') or self._etag
+            self._last_modified = response.headers.get('Last-Modified') or self._last_modified
+
+            # Türkçe karakter sorunları için encoding ayarla
+            response.encoding = 'utf-8'
+
+            match = PRE_BLOCK_RE.search(response.text)
+            if not match:
+                logger.error("Pre tag bulunamadı - site yapısı değişmiş olabilir")
+                self._mark_failed('parse')
+                return []
+
+            pre_text = match.group(1)
+            digest = hashlib.sha1(pre_text.encode('utf-8')).hexdigest()
+            if digest == self._pre_hash:
+                logger.debug("Kandilli listesi değişmemiş (aynı içerik özeti)")
+                return []
+            self._pre_hash = digest
+
+            with metrics.PARSE_SECONDS.time():
+                earthquakes = self._parse_new_rows(html.unescape(pre_text).split('\n'))
+            metrics.ROWS_PARSED.inc(len(earthquakes))
+            logger.info("%d yeni deprem verisi çekildi", len(earthquakes), extra=RATE_LIMITED)
+            return earthquakes
+
+        except Exception as e:
+            logger.error(f"Beklenmeyen hata: {e}")
+            self._mark_failed('fetch')
+            return []
+
+    def _parse_new_rows(self, lines):
+        """
+        Geriye bakma penceresindeki satırlardan daha önce görülmemiş olanları parse eder, işareti
+        ilerletir ve pencereden çıkan ID'leri unutur.
+        """
+        cutoff = None
+        if self.high_water_mark:
+            mark = datetime.strptime(self.high_water_mark, STAMP_FORMAT)
+            cutoff = (mark - timedelta(minutes=self.lookback_minutes)).strftime(STAMP_FORMAT)
+
+        earthquakes = []
+        for line in lines:
+            stamp = line[:19]
+            if not ROW_STAMP_RE.fullmatch(stamp):
+                continue  # Başlık veya boş satır
+            if cutoff and stamp < cutoff:
+                break  # Buradan sonrası pencerenin dışında, daha önce görüldü
+
+            earthquake = parse_row(line)
+            if not earthquake or earthquake['kandilli_id'] in self._seen:
+                continue
+            self._seen[earthquake['kandilli_id']] = stamp
+            earthquakes.append(earthquake)
+
+        if earthquakes:
+            newest = max(eq['earthquake_time'] for eq in earthquakes).strftime(STAMP_FORMAT)
+            if not self.high_water_mark or newest > self.high_water_mark:
+                self.high_water_mark = newest
+                mark = datetime.strptime(newest, STAMP_FORMAT)
+                cutoff = (mark - timedelta(minutes=self.lookback_minutes)).strftime(STAMP_FORMAT)
+                self._seen = {kandilli_id: stamp for kandilli_id, stamp in self._seen.items() if stamp >= cutoff}
+
+        return earthquakes
+
     def parse_earthquake_line(self, line):
-        """Tek bir deprem satırını parse et"""
+        """
+        Tek bir deprem satırını parse et.
+
+        Eski, sütun tahminine dayalı parser; karşılaştırma ve geriye uyumluluk için duruyor.
+        Listeyi çeken metotlar kandilli_parser.parse_row kullanır.
+        """
         try:
             # Boş satırları atla
             if not line.strip():
@@ -133,13 +275,13 @@ class KandilliScraper:
             }
             
         except Exception as e:
-            logger.debug(f"Satır parse edilemedi: {line[:50]}... - Hata: {e}")
+            logger.debug("Satır parse edilemedi: %.50s... - Hata: %s", line, e, extra=RATE_LIMITED)
             return None
     
     def filter_significant_earthquakes(self, earthquakes, min_magnitude=4.0):
         """Belirli büyüklük ve üstündeki depremleri filtrele"""
         significant = [eq for eq in earthquakes if eq['magnitude'] >= min_magnitude]
-        logger.info(f"{min_magnitude}+ büyüklüğünde {len(significant)} deprem bulundu")
+        logger.info("%s+ büyüklüğünde %d deprem bulundu", min_magnitude, len(significant), extra=RATE_LIMITED)
         return significant
 
 # Test fonksiyonu
@@ -0,0 +1,240 @@
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Supabase 'earthquakes' tablosundaki sütunlar (senkronizasyonda gönderilenler)
+REMOTE_COLUMNS = (
+    'kandilli_id', 'magnitude', 'depth', 'location', 'earthquake_time',
+    'latitude', 'longitude', 'posted_to_instagram', 'posted_at',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS earthquakes (
+    kandilli_id TEXT PRIMARY KEY,
+    magnitude REAL,
+    depth REAL,
+    location TEXT,
+    earthquake_time TEXT,
+    latitude REAL,
+    longitude REAL,
+    posted_to_instagram INTEGER,
+    posted_at TEXT,
+    synced INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_earthquakes_unsynced ON earthquakes (synced) WHERE synced = 0;
+CREATE INDEX IF NOT EXISTS idx_earthquakes_time ON earthquakes (earthquake_time);
+"""
+
+# SQLite'ın tek sorguda kabul ettiği parametre sayısının güvenli altı
+QUERY_CHUNK_SIZE = 500
+
+
+class LocalEarthquakeStore:
+    """
+    Supabase 'earthquakes' tablosunun yerel SQLite (WAL) kopyası.
+
+    Tekrar kontrolleri buradan yanıtlanır, yeni kayıtlar önce buraya yazılır ve `synced=0`
+    olarak işaretlenir; uzak veritabanına toplu gönderim EarthquakeDatabase.sync_pending ile yapılır.
+    Bağlantı iş parçacıkları arasında bir kilitle paylaşılır.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._closed = False
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """WAL dosyasını veritabanına aktarır (checkpoint) ve bağlantıyı kapatır."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self.path != ':memory:':
+                try:
+                    self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                except sqlite3.Error as e:
+                    logger.warning(f"Yerel veritabanı checkpoint yapılamadı: {e}")
+            self._conn.close()
+
+    def filter_unposted(self, kandilli_ids: Iterable[str]) -> Set[str]:
+        """Yerel tabloda bulunmayan ID'leri döndürür."""
+        candidates = list(set(kandilli_ids))
+        known = set()
+        with self._lock:
+            for i in range(0, len(candidates), QUERY_CHUNK_SIZE):
+                chunk = candidates[i:i + QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT kandilli_id FROM earthquakes WHERE kandilli_id IN ({placeholders})', chunk
+                ).fetchall()
+                known.update(row['kandilli_id'] for row in rows)
+        return set(candidates) - known
+
+    def upsert(self, record: Dict, synced: bool = False):
+        """Tek kaydı yazar (varsa günceller)."""
+        self.upsert_many([record], synced=synced)
+
+    def upsert_many(self, records: List[Dict], synced: bool = False):
+        """
+        Kayıtları tek işlemde yazar. `synced=True` (uzaktan gelen kayıtlar) ise henüz
+        gönderilmemiş yerel değişikliklerin üzerine yazılmaz.
+        """
+        if not records:
+            return
+        now = time.time()
+        rows = [tuple(record.get(column) for column in REMOTE_COLUMNS) + (int(synced), now) for record in records]
+        conflict_guard = 'WHERE earthquakes.synced = 1' if synced else ''
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    f"""
+                    INSERT INTO earthquakes ({', '.join(REMOTE_COLUMNS)}, synced, updated_at)
+                    VALUES ({', '.join('?' * (len(REMOTE_COLUMNS) + 2))})
+                    ON CONFLICT (kandilli_id) DO UPDATE SET
+                        {', '.join(f'{c} = excluded.{c}' for c in REMOTE_COLUMNS[1:])},
+                        synced = excluded.synced,
+                        updated_at = excluded.updated_at
+                    {conflict_guard}
+                    """,
+                    rows,
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def insert_missing(self, records: List[Dict], synced: bool = False) -> int:
+        """
+        Tabloda olmayan kayıtları tek işlemde ekler, var olanlara dokunmaz.
+        Eklenen kayıt sayısını döndürür.
+        """
+        if not records:
+            return 0
+        now = time.time()
+        rows = [tuple(record.get(column) for column in REMOTE_COLUMNS) + (int(synced), now) for record in records]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                cursor = self._conn.executemany(
+                    f"""
+                    INSERT INTO earthquakes ({', '.join(REMOTE_COLUMNS)}, synced, updated_at)
+                    VALUES ({', '.join('?' * (len(REMOTE_COLUMNS) + 2))})
+                    ON CONFLICT (kandilli_id) DO NOTHING
+                    """,
+                    rows,
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return cursor.rowcount
+
+    def update_fields(self, kandilli_id: str, fields: Dict) -> bool:
+        """Kaydın verilen alanlarını günceller ve kaydı senkronize edilecek olarak işaretler."""
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f'UPDATE earthquakes SET {assignments}, synced = 0, updated_at = ? WHERE kandilli_id = ?',
+                list(fields.values()) + [time.time(), kandilli_id],
+            )
+        return cursor.rowcount > 0
+
+    def pending_sync(self, limit: int) -> List[Dict]:
+        """Uzak veritabanına henüz gönderilmemiş kayıtları (en eskiden başlayarak) döndürür."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(REMOTE_COLUMNS)}, updated_at FROM earthquakes WHERE synced = 0 ORDER BY updated_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_synced(self, records: List[Dict]):
+        """
+        Gönderilen kayıtları senkronize olarak işaretler. Gönderim sırasında tekrar değişmiş
+        kayıtlar (updated_at farklı) bir sonraki tura bırakılır.
+        """
+        with self._lock:
+            self._conn.executemany(
+                'UPDATE earthquakes SET synced = 1 WHERE kandilli_id = ? AND updated_at = ?',
+                [(record['kandilli_id'], record['updated_at']) for record in records],
+            )
+
+    def count_pending(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM earthquakes WHERE synced = 0').fetchone()[0]
+
+    def recent(self, since: datetime, posted_only: bool = False) -> List[Dict]:
+        """Verilen zamandan sonra gerçekleşen (`posted_only` ise sadece paylaşılmış) depremleri döndürür."""
+        posted_filter = ' AND posted_to_instagram = 1' if posted_only else ''
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT kandilli_id, magnitude, earthquake_time, latitude, longitude FROM earthquakes '
+                f'WHERE earthquake_time >= ?{posted_filter}',
+                (since.isoformat(),),
+            ).fetchall()
+        records = []
+        for row in rows:
+            record = dict(row)
+            record['earthquake_time'] = datetime.fromisoformat(record['earthquake_time'])
+            records.append(record)
+        return records
+
+
+class BackgroundSyncer:
+    """
+    Bekleyen yerel kayıtları belirli aralıklarla uzak veritabanına toplu gönderen iş parçacığı.
+    Durdurulurken bekleyen kayıtlar son bir kez gönderilir.
+    """
+
+    def __init__(self, database, interval_seconds: float = 15, batch_size: int = 100):
+        self.database = database
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='supabase-sync', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5) -> bool:
+        """Son gönderimi yapıp iş parçacığını durdurur; süre içinde durduysa True döner."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def wake(self):
+        """Bir sonraki turu beklemeden hemen senkronize et."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sync()
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+        # Kapanırken kuyrukta kalan kayıtlar bir sonraki açılışa bırakılmaz
+        self._sync()
+
+    def _sync(self):
+        try:
+            # Bekleyen kayıt kalmayana (ya da hata alınana) kadar toplu gönder
+            while self.database.sync_pending(self.batch_size) == self.batch_size:
+                pass
+        except Exception as e:
+            logger.warning(f"Supabase senkronizasyonu başarısız, sonra tekrar denenecek: {e}")
@@ -0,0 +1,235 @@
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Loglara eklenen bağlam: paylaşılan depremin ID'si, o anki aşama ve deprem için aşama süreleri
+_event_id = contextvars.ContextVar('log_event_id', default=None)
+_stage = contextvars.ContextVar('log_stage', default=None)
+_stage_ms = contextvars.ContextVar('log_stage_ms', default=None)
+
+# LogRecord'un kendi alanları; bunların dışındakiler (extra=...) JSON'a ayrı alan olarak yazılır
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'event_id', 'stage', 'stage_ms', 'suppressed', 'rate_limited',
+}
+
+# Döngü/satır başına tekrarlanan loglar `extra=RATE_LIMITED` ile işaretlenir; hız sınırı sadece bunlara uygulanır
+RATE_LIMITED = {'rate_limited': True}
+
+
+@contextmanager
+def log_context(event_id=None, stage=None):
+    """
+    Blok içinde atılan loglara deprem ID'si ve/veya aşama ekler. Bağlam asyncio görevlerine ve
+    `asyncio.to_thread`/`call_with_deadline` ile başlatılan çağrılara da geçer. `event_id` verilirse
+    o depremin aşama süreleri (bkz. record_stage) sıfırdan toplanır.
+    """
+    tokens = []
+    if event_id is not None:
+        tokens.append((_event_id, _event_id.set(event_id)))
+        tokens.append((_stage_ms, _stage_ms.set({})))
+    if stage is not None:
+        tokens.append((_stage, _stage.set(stage)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def record_stage(stage, seconds):
+    """Aşama süresini o anki depremin süresine ekler; deprem bağlamı dışında bir şey yapmaz."""
+    timings = _stage_ms.get()
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 3)
+
+
+class ContextFilter(logging.Filter):
+    """Kayda o anki deprem ID'sini, aşamayı ve aşama sürelerini (çağıranın bağlamından) ekler."""
+
+    def filter(self, record):
+        if getattr(record, 'event_id', None) is None:
+            record.event_id = _event_id.get()
+        if getattr(record, 'stage', None) is None:
+            record.stage = _stage.get()
+        timings = _stage_ms.get()
+        record.stage_ms = dict(timings) if timings else None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    `RATE_LIMITED` ile işaretlenmiş ve aynı satırdan atılan logları `interval` saniyede en fazla
+    `burst` kayıtla sınırlar (döngü ve satır başına loglar fırtınada binlerce kayıt üretir). İşaretsiz
+    kayıtlar ile `max_level` ve üzeri kayıtlar sınırlanmaz. Atlanan kayıt sayısı, o satırdan sonraki
+    pencerede geçen ilk kaydın `suppressed` alanına yazılır.
+    """
+
+    def __init__(self, burst=10, interval=60, max_level=logging.ERROR, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self.clock = clock
+        self.suppressed = 0
+        self._windows = {}  # (dosya, satır) -> [pencere başlangıcı, geçen, atlanan]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.max_level or not getattr(record, 'rate_limited', False):
+            return True
+        key = (record.pathname, record.lineno)
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                self._windows[key] = [now, 1, 0]
+                skipped = window[2] if window is not None else 0
+            elif window[1] < self.burst:
+                window[1] += 1
+                skipped = 0
+            else:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+        if skipped:
+            record.suppressed = skipped
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Her kaydı tek satırlık bir JSON nesnesi olarak yazar; `extra` ile verilen alanlar da eklenir."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for key in ('event_id', 'stage', 'stage_ms', 'suppressed'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Kaydı biçimlemeden kuyruğa atar; mesaj dinleyici iş parçacığında biçimlenir. Kuyruk doluysa
+    çağıran beklemez, kayıt atılır ve sayılır.
+    """
+
+    def __init__(self, log_queue, max_size):
+        super().__init__(log_queue)
+        self.max_size = max_size
+        self.records = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        # İstisna metni, yığın çerçeveleri henüz yaşarken çağıranın iş parçacığında üretilir
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+        self.records += 1
+
+
+class CountingStream:
+    """Yazılan bayt sayısını tutan akış sarmalayıcısı (log hacmini ölçmek için)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text.encode('utf-8'))
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class LogPipeline:
+    """
+    Kök loglayıcıya bağlanan kuyruk işleyicisi ve logları ayrı bir iş parçacığında yazan dinleyici.
+
+    Log atan iş parçacığı sadece filtreleri (işaretli loglarda hız sınırı, bağlam) çalıştırıp kaydı
+    kuyruğa koyar; mesajın biçimlenmesi, JSON'a çevrilmesi ve akışa yazılması dinleyicide olur.
+    """
+
+    def __init__(self, level=logging.INFO, style='json', stream=None, queue_size=10000,
+                 rate_burst=10, rate_interval_seconds=60, text_format=TEXT_FORMAT):
+        self.level = level
+        self.stream = CountingStream(stream or sys.stderr)
+        self.rate_limit = RateLimitFilter(rate_burst, rate_interval_seconds) if rate_burst else None
+
+        # SimpleQueue kilitsiz (C) kuyruktur; boyut sınırı işleyicide uygulanır
+        self.handler = _NonBlockingQueueHandler(queue.SimpleQueue(), queue_size)
+        if self.rate_limit is not None:
+            self.handler.addFilter(self.rate_limit)
+        self.handler.addFilter(ContextFilter())
+
+        output = logging.StreamHandler(self.stream)
+        output.setFormatter(JsonFormatter() if style == 'json' else logging.Formatter(text_format))
+        self.listener = QueueListener(self.handler.queue, output)
+        self._running = False
+
+    @classmethod
+    def from_config(cls, config, level=None, stream=None):
+        return cls(
+            level=level if level is not None else config.LOG_LEVEL,
+            style=config.LOG_STYLE,
+            stream=stream,
+            queue_size=config.LOG_QUEUE_SIZE,
+            rate_burst=config.LOG_RATE_BURST,
+            rate_interval_seconds=config.LOG_RATE_INTERVAL_SECONDS,
+        )
+
+    def start(self):
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+        self._running = True
+        return self
+
+    def stop(self):
+        """İşleyiciyi kök loglayıcıdan çıkarır ve kuyrukta kalan logları yazıp dinleyiciyi durdurur."""
+        logging.getLogger().removeHandler(self.handler)
+        if self._running:
+            self._running = False
+            self.listener.stop()
+
+    def stats(self):
+        """Kuyruğa giren, kuyruk dolu olduğu için atılan ve hız sınırına takılan kayıtlar; yazılan bayt."""
+        return {
+            'records': self.handler.records,
+            'dropped': self.handler.dropped,
+            'suppressed': self.rate_limit.suppressed if self.rate_limit is not None else 0,
+            'bytes': self.stream.bytes,
+        }
@@ -1,124 +1,178 @@
-import schedule
+import sys
 import time
 import logging
+import argparse
 from datetime import datetime
 
-# Kendi yazdığımız modülleri import edelim
-from kandilli_scraper import KandilliScraper
-from database import EarthquakeDatabase
-from instagram_poster import InstagramPoster
-from config import Config
+from config import Config, configure_logging
 
-# Temel loglama ayarlarını yap
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Komutlar ihtiyaç duydukları modülleri kendileri import eder; böylece örneğin `check-source`
+# instagrapi, supabase ve Pillow'u, `render-preview` ise requests ve asyncio'yu hiç yüklemez.
 
-def check_and_post_earthquakes():
+PREVIEW_EARTHQUAKE = {
+    'kandilli_id': 'onizleme',
+    'magnitude': 4.2,
+    'depth': 8.5,
+    'location': 'IZMIR KORFEZI (EGE DENIZI)',
+    'latitude': 38.45,
+    'longitude': 26.95,
+}
+
+
+def run_scheduled(runtime):
     """
-    Ana bot fonksiyonu: Depremleri kontrol eder ve yenilerini Instagram'a gönderir.
+    Sıralı mod: Tam bir kontrol döngüsü çalıştırır, ardından son sismik etkinliğe göre
+    belirlenen süre kadar bekler.
     """
-    logging.info("--- Yeni deprem kontrol döngüsü başlatıldı ---")
-    
-    try:
-        # 1. Gerekli tüm sınıflardan nesneler oluştur
-        scraper = KandilliScraper()
-        db = EarthquakeDatabase(url=Config.SUPABASE_URL, key=Config.SUPABASE_ANON_KEY)
-        poster = InstagramPoster(Config.INSTAGRAM_USERNAME, Config.INSTAGRAM_PASSWORD)
-
-        # Instagram'a giriş yapılamadıysa, işlemi durdur
-        if not poster.client:
-            logging.error("Instagram'a giriş yapılamadığı için bu döngü atlanıyor.")
-            return
-
-        # 2. Kandilli'den son depremleri çek
-        latest_earthquakes = scraper.get_latest_earthquakes()
-
-        if not latest_earthquakes:
-            logging.info("Kandilli'den yeni veri çekilemedi veya deprem yok.")
-            return
-
-        # 3. Sadece belirli büyüklük ve üzerindeki depremleri filtrele
-        significant_earthquakes = [eq for eq in latest_earthquakes if eq['magnitude'] >= Config.MIN_MAGNITUDE]
-
-        if not significant_earthquakes:
-            logging.info(f"{Config.MIN_MAGNITUDE} büyüklüğünde veya daha büyük yeni deprem bulunamadı.")
-            return
-        
-        logging.info(f"{len(significant_earthquakes)} adet {Config.MIN_MAGNITUDE}+ büyüklüğünde deprem bulundu.")
-
-        # 4. Bu depremlerden hangilerinin daha önce paylaşılmadığını veritabanından kontrol et
-        new_earthquakes_to_post = []
-        for eq in significant_earthquakes:
-            if not db.is_earthquake_posted(eq['kandilli_id']):
-                new_earthquakes_to_post.append(eq)
-        
-        if not new_earthquakes_to_post:
-            logging.info("Bulunan tüm önemli depremler daha önce paylaşılmış.")
-            return
-
-        logging.info(f"Paylaşılacak {len(new_earthquakes_to_post)} yeni deprem var!")
-
-        # 5. Paylaşılacak her yeni deprem için işlemleri yap (en eskiden başlayarak)
-        for earthquake in reversed(new_earthquakes_to_post):
-            logging.info(f"Yeni deprem paylaşılıyor: {earthquake['location']} - M{earthquake['magnitude']}")
-            
-            # A. Görseli oluştur
-            image_path = poster.create_earthquake_image(earthquake)
-            
-            if not image_path:
-                logging.error("Görsel oluşturulamadı, bu deprem atlanıyor.")
-                continue
-
-            # B. Deprem büyüklüğüne göre başlık (caption) oluştur
-            magnitude = earthquake['magnitude']
-            
-            caption_text = f"🚨 DEPREM BİLDİRİMİ\n\n"
-            caption_text += f"📍 Lokasyon: {earthquake['location']}\n"
-            caption_text += f"📊 Büyüklük: M {magnitude}\n"
-            caption_text += f"📏 Derinlik: {earthquake['depth']} km\n"
-            caption_text += f"📅 Tarih: {earthquake['earthquake_time'].strftime('%d.%m.%Y %H:%M:%S')}\n\n"
-            caption_text += "ℹ️ Kandilli Rasathanesi verisidir.\n\n"
-
-            if 4 <= magnitude < 5:
-                caption_text += "⚠️ Sevdiklerinize ulaşmakta zorlanıyorsanız, internet tabanlı mesajlaşma uygulamalarını kullanmayı deneyin.\n\n"
-            elif 5 <= magnitude < 6:
-                caption_text += "⚠️ Lütfen sığınaklara veya güvenli toplanma alanlarına gidin.\n"
-                caption_text += "⚠️ Sevdiklerinize ulaşmakta zorlanıyorsanız, internet tabanlı mesajlaşma uygulamalarını kullanmayı deneyin.\n\n"
-            elif magnitude >= 6:
-                caption_text += "⚠️ ACİL DURUM UYARISI! Lütfen güvenli bir yerde kalın ve konumunuzu güvendiğiniz kişilerle paylaşın.\n"
-                caption_text += "⚠️ Sığınaklara veya güvenli toplanma alanlarına gidin.\n"
-                caption_text += "⚠️ Sevdiklerinize ulaşmakta zorlanıyorsanız, internet tabanlı mesajlaşma uygulamalarını kullanın.\n\n"
-
-            caption_text += "#deprem #kandilli #türkiye #earthquake"
-
-            # C. Instagram'a gönder
-            post_success = poster.post_image_to_instagram(image_path, caption_text)
-
-            # D. Başarılı olduysa veritabanına kaydet
-            if post_success:
-                db.save_earthquake(earthquake)
-                logging.info(f"Deprem başarıyla paylaşıldı ve veritabanına kaydedildi: {earthquake['location']}")
-            else:
-                logging.error(f"Deprem paylaşılamadı, veritabanına kaydedilmeyecek: {earthquake['location']}")
-            
-            time.sleep(30) # Instagram'dan ban yememek için postlar arasına biraz zaman koyalım
-
-    except Exception as e:
-        logging.critical(f"!!! ANA DÖNGÜDE KRİTİK HATA: {e}", exc_info=True)
-
-    logging.info("--- Kontrol döngüsü tamamlandı ---")
+    while True:
+        runtime.run_cycle()
+        time.sleep(runtime.next_delay())
 
 
-# Ana program başlangıcı
-if __name__ == "__main__":
+def command_run(args):
+    """Botu çalıştırır: depremleri kontrol eder ve yenilerini Instagram'a gönderir."""
+    from bot_runtime import BotRuntime
+    from metrics import MetricsServer
+
     logging.info(">>> Deprem Instagram Bot'u başlatıldı. <<<")
-    logging.info(f"Kontrol sıklığı: {Config.CHECK_INTERVAL_MINUTES} dakika.")
-    
-    # Botu hemen ilk çalıştırmada bir kez çalıştır
-    check_and_post_earthquakes()
+    logging.info(f"Kontrol sıklığı: {Config.CHECK_INTERVAL_MINUTES} dakika (hareketli dönemde {Config.FAST_POLL_SECONDS} saniye).")
+
+    # Scraper, veritabanı ve Instagram oturumu döngüler arasında yeniden kullanılır
+    runtime = BotRuntime(Config)
+    # Takılan aşamaları bulur, sağlık dosyasını ve /healthz, /readyz uçlarını besler
+    runtime.watchdog.start()
+
+    profiler = runtime.profiler
+    if getattr(args, 'profile_mode', None):
+        profiler.mode = args.profile_mode
+    if getattr(args, 'profile_cycles', 0):
+        profiler.request(args.profile_cycles)
+    if profiler.install_signal(Config.PROFILE_SIGNAL_CYCLES):
+        logging.info(f"SIGUSR1 ile sonraki {Config.PROFILE_SIGNAL_CYCLES} döngü profillenir ({profiler.mode}, {profiler.output_dir}/).")
+
+    if Config.METRICS_PORT:
+        try:
+            MetricsServer(Config.METRICS_HOST, Config.METRICS_PORT, health=runtime.watchdog.status).start()
+        except OSError as e:
+            logging.warning(f"Metrik uç noktası başlatılamadı: {e}")
 
-    # Ardından her X dakikada bir çalışacak şekilde zamanla
-    schedule.every(Config.CHECK_INTERVAL_MINUTES).minutes.do(check_and_post_earthquakes)
+    try:
+        if Config.USE_PIPELINE:
+            import asyncio
+            from pipeline import EarthquakePipeline
+
+            # Çekme, çizme ve yükleme aşamalarını eşzamanlı çalıştır
+            asyncio.run(EarthquakePipeline(runtime, Config).run())
+        else:
+            run_scheduled(runtime)
+    except KeyboardInterrupt:
+        logging.info(">>> Bot durduruldu. <<<")
+    finally:
+        runtime.close()
+    return 0
+
+
+def command_check_source(args):
+    """Kandilli'den listeyi bir kez çeker ve son depremleri yazdırır (veritabanı ve Instagram'a dokunmaz)."""
+    from kandilli_scraper import KandilliScraper
+    from http_client import ResilientHttpClient
+    from gazetteer import enrich
+
+    scraper = KandilliScraper(args.url or Config.KANDILLI_URL, ResilientHttpClient.from_config(Config))
+    started = time.perf_counter()
+    earthquakes = scraper.get_latest_earthquakes()
+    elapsed = time.perf_counter() - started
+    attempts = scraper.last_result.attempts if scraper.last_result else 0
+    if not scraper.last_fetch_ok:
+        print(f"Kaynağa ulaşılamadı ya da sayfa okunamadı ({attempts} deneme, {elapsed:.1f} sn): {scraper.url}")
+        return 1
+
+    print(f"{len(earthquakes)} deprem okundu ({attempts} deneme, {elapsed * 1000:.0f} ms): {scraper.url}")
+    shown = [eq for eq in earthquakes if eq['magnitude'] >= args.min_magnitude][:args.limit]
+    for earthquake in shown:
+        enrich(earthquake, Config.GAZETTEER_MAX_DISTANCE_KM)
+        print(
+            f"  {earthquake['earthquake_time']:%d.%m.%Y %H:%M:%S}  M {earthquake['magnitude']:<4} "
+            f"{earthquake['depth']:>5} km  {earthquake['location']}"
+            + (f" — {earthquake['nearest_place']}" if earthquake['nearest_place'] else "")
+        )
+    return 0
+
+
+def command_render_preview(args):
+    """Örnek (ya da verilen) bir deprem için görselleri çizip dosyalara yazar; ağ bağlantısı gerekmez."""
+    from image_renderer import EarthquakeImageRenderer
+    from gazetteer import enrich
+
+    earthquake = dict(
+        PREVIEW_EARTHQUAKE,
+        earthquake_time=args.time or datetime.now().replace(microsecond=0),
+        **{key: value for key, value in vars(args).items()
+           if key in ('magnitude', 'depth', 'location', 'latitude', 'longitude') and value is not None},
+    )
+    enrich(earthquake, Config.GAZETTEER_MAX_DISTANCE_KM)
+
+    images = EarthquakeImageRenderer().render_variants(earthquake, args.formats.split(','))
+    for name, data in images.items():
+        path = f"{args.output}_{name}.jpg"
+        with open(path, 'wb') as f:
+            f.write(data.getbuffer())
+        print(f"{name}: {path}")
+    return 0
+
+
+def command_backfill(args):
+    """Geçmiş verisi yükleme ve yeniden oynatma (backfill.py) komutları."""
+    import backfill
+
+    return backfill.main(args.extra, prog='main.py backfill')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Kandilli depremlerini Instagram'da paylaşan bot")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help="Botu çalıştır (varsayılan)")
+    run_parser.add_argument('--profile-cycles', type=int, default=0, metavar='N',
+                            help="İlk N döngüyü profille (dosyalar Config.PROFILE_DIR'e yazılır)")
+    run_parser.add_argument('--profile-mode', choices=('collapsed', 'pstats'),
+                            help="'collapsed': tüm iş parçacıklarını örnekler, 'pstats': cProfile (varsayılan Config.PROFILE_MODE)")
+    run_parser.set_defaults(handler=command_run)
+
+    check_parser = subparsers.add_parser('check-source', help="Kandilli'yi bir kez çek ve son depremleri yazdır")
+    check_parser.add_argument('--url', help="Kandilli liste adresi (varsayılan Config.KANDILLI_URL)")
+    check_parser.add_argument('--limit', type=int, default=10, help="Yazdırılacak deprem sayısı")
+    check_parser.add_argument('--min-magnitude', type=float, default=0.0, help="Sadece bu büyüklük ve üzerini yazdır")
+    check_parser.set_defaults(handler=command_check_source)
+
+    preview_parser = subparsers.add_parser('render-preview', help="Örnek deprem görsellerini dosyaya çiz")
+    preview_parser.add_argument('--output', default='onizleme', help="Dosya adı öneki (<önek>_<biçim>.jpg)")
+    preview_parser.add_argument('--formats', default='feed,story,thumbnail', help="Çizilecek biçimler (virgülle)")
+    preview_parser.add_argument('--magnitude', type=float)
+    preview_parser.add_argument('--depth', type=float)
+    preview_parser.add_argument('--location')
+    preview_parser.add_argument('--latitude', type=float)
+    preview_parser.add_argument('--longitude', type=float)
+    preview_parser.add_argument('--time', type=datetime.fromisoformat, help="Deprem zamanı (YYYY-MM-DDTHH:MM:SS)")
+    preview_parser.set_defaults(handler=command_render_preview)
+
+    # Argümanları (--help dahil) backfill.py'nin kendi ayrıştırıcısı işler
+    backfill_parser = subparsers.add_parser('backfill', add_help=False, help="Geçmiş verisini yükle ya da yeniden oynat")
+    backfill_parser.set_defaults(handler=command_backfill, passthrough=True)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    args.extra = extra
+    if extra and not getattr(args, 'passthrough', False):
+        parser.error(f"tanınmayan argümanlar: {' '.join(args.extra)}")
+    configure_logging()
+    handler = getattr(args, 'handler', command_run)
+    return handler(args)
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
\ No newline at end of file
+
+# Ana program başlangıcı
+if __name__ == "__main__":
+    sys.exit(main())
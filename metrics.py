@@ -0,0 +1,292 @@
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Saniye cinsinden varsayılan histogram sınırları (Kandilli isteğinden Instagram yüklemesine kadar)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # etiket değerleri -> değer
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} için etiketler {self.labelnames} olmalı, verilen: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """(son ek, etiket değerleri, ek etiketler, değer) dörtlülerini döndürür."""
+        with self._lock:
+            return [('', key, (), value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return {self._label_string(key): value for key, value in self._values.items()}
+
+    def _label_string(self, key):
+        return ','.join(f'{name}={value}' for name, value in zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Sadece artan sayaç."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Son ölçülen değeri tutan gösterge."""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    """
+    Sabit sınırlı histogram. Her gözlem bir ikili arama ve bir kilitli toplamadan ibarettir,
+    bu yüzden sıcak yolda ölçüm maliyeti mikro saniyeler mertebesindedir.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Blok süresini ölçer; blok hata fırlatsa da gözlem kaydedilir."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), count))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        result = {}
+        for key, counts, total, count in items:
+            result[self._label_string(key)] = {
+                'count': count,
+                'sum': total,
+                'mean': total / count if count else None,
+                'buckets': {_format_value(float(b)): c for b, c in zip(self.buckets + (float('inf'),), counts)},
+            }
+        return result
+
+
+class MetricsRegistry:
+    """Metrikleri ada göre tutar ve Prometheus metin biçiminde ya da JSON olarak döker."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render_prometheus(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for suffix, key, extra, value in metric.samples():
+                labels = _format_labels(metric.labelnames, key, extra)
+                lines.append(f'{metric.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        return {
+            metric.name: {'type': metric.kind, 'help': metric.documentation, 'values': metric.snapshot()}
+            for metric in list(self._metrics.values())
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+# Aşama süreleri (saniye)
+FETCH_SECONDS = REGISTRY.histogram('kandilli_fetch_seconds', "Kandilli listesinin HTTP ile çekilme süresi")
+PARSE_SECONDS = REGISTRY.histogram('kandilli_parse_seconds', "Kandilli <pre> bloğunun parse süresi")
+DEDUP_SECONDS = REGISTRY.histogram('dedup_lookup_seconds', "Paylaşılmış deprem kontrolünün (önbellek + veritabanı) süresi")
+RENDER_SECONDS = REGISTRY.histogram('render_seconds', "Deprem görselinin çizilme süresi")
+UPLOAD_SECONDS = REGISTRY.histogram('upload_seconds', "Instagram yüklemesinin süresi")
+DB_SAVE_SECONDS = REGISTRY.histogram('db_save_seconds', "Deprem kaydının veritabanına yazılma süresi")
+
+# Sayaçlar
+ROWS_PARSED = REGISTRY.counter('kandilli_rows_parsed_total', "Parse edilen Kandilli satırı sayısı")
+EVENTS_POSTED = REGISTRY.counter('events_posted_total', "Instagram'da paylaşılan deprem sayısı")
+STORIES_POSTED = REGISTRY.counter('stories_posted_total', "Instagram'da paylaşılan hikaye sayısı")
+SWARM_ALBUMS_POSTED = REGISTRY.counter('swarm_albums_posted_total', "Artçı fırtınası için paylaşılan albüm sayısı")
+DUPLICATES_SKIPPED = REGISTRY.counter(
+    'duplicates_skipped_total', "Daha önce paylaşıldığı ya da revizyon olduğu için atlanan deprem sayısı", ('reason',)
+)
+ERRORS = REGISTRY.counter('errors_total', "Aşamaya göre hata sayısı", ('stage',))
+FETCH_RETRIES = REGISTRY.counter('kandilli_fetch_retries_total', "Kandilli isteklerinde yapılan tekrar deneme sayısı")
+FETCH_HEDGES = REGISTRY.counter('kandilli_fetch_hedged_total', "Yavaş Kandilli isteklerine gönderilen yedek istek sayısı")
+FETCH_RESULTS = REGISTRY.counter(
+    'kandilli_fetch_results_total', "Kandilli çekme sonuçları (ok, not_modified, unavailable, circuit_open)", ('status',)
+)
+SINK_DELIVERIES = REGISTRY.counter(
+    'sink_deliveries_total', "Ek kanallara gönderim sonuçları (ok, retry, failed, skipped)", ('sink', 'result')
+)
+SINK_SECONDS = REGISTRY.histogram('sink_publish_seconds', "Ek kanala tek gönderim denemesinin süresi", ('sink',))
+SINK_DELIVERY_DELAY_SECONDS = REGISTRY.histogram(
+    'sink_delivery_delay_seconds', "Paylaşımın kanal kuyruğuna girmesinden gönderilmesine kadar geçen süre", ('sink',)
+)
+SINK_QUEUE = REGISTRY.gauge('sink_queue_length', "Ek kanalın kuyruğunda (tekrar denemeler dahil) bekleyen paylaşım", ('sink',))
+STAGE_TIMEOUTS = REGISTRY.counter('stage_timeouts_total', "Süre sınırını aşan aşama çağrıları", ('stage',))
+STALLS = REGISTRY.counter('watchdog_stalls_total', "Bekçinin takılmış bulduğu aşamalar", ('stage',))
+IS_LEADER = REGISTRY.gauge('is_leader', "Bu örnek lider kirasını tutuyor mu (1: paylaşım yapıyor)")
+LEADER_CHANGES = REGISTRY.counter('leader_acquired_total', "Bu örneğin lider olduğu sayı")
+CLAIM_CONFLICTS = REGISTRY.counter('claim_conflicts_total', "Başka bir örnekçe talep edilmiş olduğu için alınamayan deprem talebi")
+CIRCUIT_OPEN = REGISTRY.gauge('kandilli_circuit_open', "Kandilli devre kesicisi açık mı (1: istek yapılmıyor)")
+
+# Algılamadan paylaşıma gecikme
+DETECTION_TO_POST_SECONDS = REGISTRY.gauge(
+    'detection_to_post_seconds', "Son paylaşımda deprem zamanı ile paylaşım zamanı arasındaki fark (saniye)"
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+    health = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        status = 200
+        if url.path in ('/healthz', '/readyz') and self.health is not None:
+            health = self.health()
+            if not health['alive' if url.path == '/healthz' else 'ready']:
+                status = 503
+            body = json.dumps(health, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        elif url.path not in ('/metrics', '/metrics.json'):
+            self.send_error(404)
+            return
+        elif url.path == '/metrics.json' or parse_qs(url.query).get('format') == ['json']:
+            body = json.dumps(self.registry.to_dict(), ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        else:
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Metrik isteği: " + format, *args)
+
+
+class MetricsServer:
+    """
+    Metrikleri yerel bir HTTP uç noktasında sunan arka plan sunucusu.
+    `/metrics` Prometheus metin biçimini, `/metrics.json` (ya da `?format=json`) JSON dökümünü döndürür.
+    `health` (ör. Watchdog.status) verilirse `/healthz` canlılık, `/readyz` hazırlık durumunu JSON
+    olarak döndürür; durum olumsuzsa yanıt kodu 503 olur.
+    """
+
+    def __init__(self, host='127.0.0.1', port=9108, registry=REGISTRY, health=None):
+        handler = type('MetricsHandler', (_MetricsHandler,), {
+            'registry': registry,
+            'health': staticmethod(health) if health is not None else None,
+        })
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True)
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Metrik uç noktası: http://{self.address[0]}:{self.address[1]}/metrics")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
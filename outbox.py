@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'      # Yüklemeden önce yazılır
+UPLOADED = 'uploaded'    # Instagram medya ID'si alındı, veritabanına henüz kaydedilmedi
+COMMITTED = 'committed'  # Veritabanına kaydedildi, kayıt kapandı
+RELEASED = 'released'    # Yükleme yapılmadığı kesin, deprem tekrar paylaşılabilir
+
+OPEN_STATES = (PENDING, UPLOADED)
+
+# Bu kadar satır birikince kapanmış kayıtlar dosyadan atılır
+COMPACT_AFTER_LINES = 1000
+
+
+def _serialize_earthquake(earthquake: Dict) -> Dict:
+    data = {key: value for key, value in earthquake.items() if key not in ('merged_events', 'swarm_events')}
+    data['earthquake_time'] = earthquake['earthquake_time'].isoformat()
+    return data
+
+
+def _deserialize_earthquake(data: Dict) -> Dict:
+    return dict(data, earthquake_time=datetime.fromisoformat(data['earthquake_time']))
+
+
+class PostingOutbox:
+    """
+    Paylaşım ile veritabanı kaydı arasındaki boşluğu kapatan, sadece sona eklenen (append-only) günlük.
+
+    Her deprem yüklemeden önce "pending", medya ID'si alınınca "uploaded", veritabanına
+    kaydedilince "committed" olarak yazılır. Süreç arada çökse bile açılışta açık kayıtlar
+    yeniden yüklenmeden tamamlanır.
+
+    Yüklemeyi koruyan "pending" ve "uploaded" satırları diske hemen (fsync ile) yazılır;
+    "committed" ve "released" satırları tamponda birikir ve bir sonraki kalıcı yazmayla
+    birlikte toplu olarak yazılır. Bunların kaybolması sadece kurtarmada aynı kaydın
+    tekrar kapatılmasına yol açar.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}  # kandilli_id -> {'state', 'earthquake', 'media_id'}
+        self._buffer: List[str] = []
+        self._lines = 0
+
+        self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        valid_bytes, torn = 0, False
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        torn = True  # Çökme sırasında yarım kalmış son satır
+                        break
+                    valid_bytes += len(line)
+                    self._lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(record)
+        except FileNotFoundError:
+            return
+
+        if torn:
+            # Yarım satır kesilir; yoksa sonraki kayıt onun devamına yazılıp okunamaz hale gelir
+            logger.warning("Paylaşım günlüğünün yarım kalmış son satırı atıldı.")
+            os.truncate(self.path, valid_bytes)
+
+        open_count = len(self.open_entries())
+        if open_count:
+            logger.warning(f"Paylaşım günlüğünde tamamlanmamış {open_count} kayıt bulundu.")
+
+    def _apply(self, record: Dict):
+        kandilli_id = record['id']
+        state = record['state']
+        if state in (COMMITTED, RELEASED):
+            self._entries.pop(kandilli_id, None)
+            return
+
+        entry = self._entries.setdefault(kandilli_id, {})
+        entry['state'] = state
+        if 'earthquake' in record:
+            entry['earthquake'] = _deserialize_earthquake(record['earthquake'])
+        if record.get('media_id') is not None:
+            entry['media_id'] = record['media_id']
+
+    def _append(self, records: Iterable[Dict], durable: bool):
+        with self._lock:
+            for record in records:
+                record.setdefault('ts', time.time())
+                self._apply(record)
+                self._buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+            if durable:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        self._file.writelines(self._buffer)
+        self._lines += len(self._buffer)
+        self._buffer.clear()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        if self._lines >= COMPACT_AFTER_LINES:
+            self._compact_locked()
+
+    def flush(self):
+        """Tampondaki kayıtları diske yazar."""
+        with self._lock:
+            self._flush_locked()
+
+    def mark_pending(self, earthquakes: Iterable[Dict]):
+        """Yüklemeden önce depremleri kalıcı olarak "pending" yazar (tek fsync)."""
+        self._append(
+            [{'id': eq['kandilli_id'], 'state': PENDING, 'earthquake': _serialize_earthquake(eq)} for eq in earthquakes],
+            durable=True,
+        )
+
+    def mark_uploaded(self, kandilli_ids: Iterable[str], media_id: str):
+        """Yükleme başarılı: medya ID'siyle birlikte kalıcı olarak yazar."""
+        self._append([{'id': k, 'state': UPLOADED, 'media_id': str(media_id)} for k in kandilli_ids], durable=True)
+
+    def mark_committed(self, kandilli_ids: Iterable[str]):
+        """Veritabanına kaydedildi: kaydı kapatır (toplu yazılır)."""
+        self._append([{'id': k, 'state': COMMITTED} for k in kandilli_ids], durable=False)
+
+    def release(self, kandilli_ids: Iterable[str]):
+        """Yükleme yapılmadı: kaydı kapatır, deprem tekrar paylaşılabilir (toplu yazılır)."""
+        self._append([{'id': k, 'state': RELEASED} for k in kandilli_ids], durable=False)
+
+    def in_flight_ids(self):
+        """Açık (pending/uploaded) kayıtların ID'leri; bunlar tekrar kuyruğa alınmamalıdır."""
+        with self._lock:
+            return set(self._entries)
+
+    def open_entries(self, state: Optional[str] = None) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                kandilli_id: dict(entry) for kandilli_id, entry in self._entries.items()
+                if state is None or entry['state'] == state
+            }
+
+    def state(self, kandilli_id: str) -> Optional[str]:
+        """Kaydın açık durumu (pending/uploaded); kayıt kapanmışsa ya da yoksa None."""
+        with self._lock:
+            entry = self._entries.get(kandilli_id)
+            return entry['state'] if entry else None
+
+    def compact(self):
+        with self._lock:
+            self._flush_locked()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Dosyayı sadece açık kayıtlarla atomik olarak yeniden yazar."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for kandilli_id, entry in self._entries.items():
+                record = {'id': kandilli_id, 'state': entry['state'], 'ts': time.time()}
+                if 'earthquake' in entry:
+                    record['earthquake'] = _serialize_earthquake(entry['earthquake'])
+                if 'media_id' in entry:
+                    record['media_id'] = entry['media_id']
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lines = len(self._entries)
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import metrics
+from bot_runtime import post_events, discard_images
+from log_pipeline import log_context
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Her iş parçacığı/süreç kendi çizicisini kullanır (FreeType fontları paylaşılmaz)
+_worker_state = threading.local()
+
+
+def render_in_worker(earthquake, formats=('feed',)):
+    """Çizim havuzunda çalışır: paylaşımın görsellerini benzersiz geçici dosyalara çizip biçime göre yollarını döndürür."""
+    from image_renderer import EarthquakeImageRenderer
+
+    renderer = getattr(_worker_state, 'renderer', None)
+    if renderer is None:
+        renderer = _worker_state.renderer = EarthquakeImageRenderer()
+    return renderer.render_post_files(earthquake, formats)
+
+
+class EarthquakePipeline:
+    """
+    Çekme → çizme → yükleme aşamalarını sınırlı kuyruklarla bağlayan asyncio boru hattı.
+
+    - Çekici (fetcher) yüklemeler sürerken de uyarlanabilir aralıklarla Kandilli'yi kontrol eder ve
+      yeni depremleri runtime'ın öncelikli paylaşım zamanlayıcısına ekler.
+    - Çizici (renderer) zamanlayıcıdan en öncelikli depremi alır ve görselini iş parçacığı ya da
+      süreç havuzunda hazırlar; bir sonraki depremin görseli, mevcut deprem yüklenirken çizilir.
+    - Yükleyici (uploader) her paylaşımdan önce runtime'ın jeton kovasından izin bekler.
+
+    Aşama işlerinin kendisi BotRuntime'dadır; boru hattı sadece onları zamanlar.
+    """
+
+    def __init__(self, runtime, config=Config):
+        self.runtime = runtime
+        self.config = config
+        self.upload_queue = None
+        self._work_available = None
+        self._in_flight = set()  # Zamanlayıcıda, kuyrukta ya da yüklenmekte olan kandilli_id'ler
+
+        workers = config.PIPELINE_RENDER_WORKERS
+        if config.PIPELINE_RENDER_IN_PROCESSES:
+            self.render_executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.render_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render')
+
+    async def run(self):
+        """Boru hattını iptal edilene kadar çalıştırır."""
+        self._work_available = asyncio.Event()
+        self.upload_queue = asyncio.Queue(maxsize=self.config.PIPELINE_UPLOAD_QUEUE_SIZE)
+
+        tasks = [asyncio.create_task(self._fetcher(), name='fetcher')]
+        tasks += [
+            asyncio.create_task(self._renderer(), name=f'renderer-{i}')
+            for i in range(self.config.PIPELINE_RENDER_WORKERS)
+        ]
+        tasks.append(asyncio.create_task(self._uploader(), name='uploader'))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.render_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def poll_once(self):
+        """Kandilli'yi bir kez kontrol eder ve yeni depremleri paylaşım zamanlayıcısına ekler."""
+        if not await asyncio.to_thread(self.runtime.is_active):
+            return 0
+        try:
+            earthquakes = await asyncio.to_thread(self.runtime.collect_new_earthquakes)
+        except Exception as e:
+            metrics.ERRORS.inc(stage='cycle')
+            logger.error(f"Deprem kontrolü sırasında hata: {e}", exc_info=True)
+            return 0
+
+        fresh = [earthquake for earthquake in earthquakes if earthquake['kandilli_id'] not in self._in_flight]
+        queued = self.runtime.enqueue(fresh)
+        self._in_flight.update(earthquake['kandilli_id'] for earthquake in queued)
+
+        dropped = await asyncio.to_thread(self.runtime.skip_dropped)
+        self._release(dropped)
+
+        if queued:
+            self._work_available.set()
+        return len(queued)
+
+    def _release(self, earthquakes):
+        for earthquake in earthquakes:
+            self._in_flight.discard(earthquake['kandilli_id'])
+
+    async def _next_earthquake(self):
+        """Zamanlayıcıdaki en öncelikli depremi, yoksa yenisi gelene kadar bekleyip döndürür."""
+        while True:
+            earthquake = self.runtime.next_post()
+            if earthquake is not None:
+                return earthquake
+            self._work_available.clear()
+            await self._work_available.wait()
+
+    async def _fetcher(self):
+        while True:
+            self.runtime.watchdog.beat()
+            # Profilde bir "döngü", bir kontrolden sonrakine kadar tüm aşamalardır
+            with self.runtime.profiler.cycle('poll'):
+                await self.poll_once()
+                await asyncio.sleep(self.runtime.next_delay())
+
+    async def _renderer(self):
+        while True:
+            earthquake = await self._next_earthquake()
+            # Bu paylaşımın logları deprem ID'siyle yazılır
+            with log_context(event_id=earthquake['kandilli_id']):
+                prepared = await self._prepare(earthquake)
+            if prepared is not None:
+                await self.upload_queue.put(prepared)
+
+    async def _prepare(self, earthquake):
+        """Paylaşımı talep eder ve görsellerini çizer; (deprem, görseller) ya da atlanacaksa None döndürür."""
+        events = post_events(earthquake)
+        earthquake = await asyncio.to_thread(self.runtime.claim, earthquake)
+        if earthquake is None:
+            self._release(events)
+            return None
+        claimed = {eq['kandilli_id'] for eq in post_events(earthquake)}
+        self._release([eq for eq in events if eq['kandilli_id'] not in claimed])
+        try:
+            logger.info("Görsel hazırlanıyor: %s - M%s", earthquake['location'], earthquake['magnitude'])
+            with metrics.RENDER_SECONDS.time(), self.runtime.watchdog.track('render'), \
+                    self.runtime.profiler.span('render'):
+                images = await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(
+                        self.render_executor, render_in_worker, earthquake, self.runtime.post_formats
+                    ),
+                    self.runtime.stage_deadlines.get('render') or None,
+                )
+        except asyncio.TimeoutError:
+            # Havuzdaki çizim durdurulamaz; biterse sonucu atılır
+            metrics.STAGE_TIMEOUTS.inc(stage='render')
+            metrics.ERRORS.inc(stage='render')
+            logger.error(f"Görsel süre sınırı içinde çizilemedi, bu deprem atlanıyor: {earthquake['location']}")
+            await self._abandon(earthquake)
+            return None
+        except Exception as e:
+            metrics.ERRORS.inc(stage='render')
+            logger.error(f"Görsel oluşturulamadı, bu deprem atlanıyor: {e}")
+            await self._abandon(earthquake)
+            return None
+        return earthquake, images
+
+    async def _abandon(self, earthquake):
+        """Yüklemeye geçmeden vazgeçilen paylaşımın taleplerini ve kuyruk kayıtlarını bırakır."""
+        try:
+            await asyncio.to_thread(self.runtime.release_claim, earthquake)
+        finally:
+            self._release(post_events(earthquake))
+
+    async def _uploader(self):
+        while True:
+            earthquake, images = await self.upload_queue.get()
+            try:
+                with log_context(event_id=earthquake['kandilli_id']):
+                    await self._wait_for_rate_limit()
+                    await self._upload(earthquake, images)
+            finally:
+                self._release(post_events(earthquake))
+                self.upload_queue.task_done()
+
+    async def _wait_for_rate_limit(self):
+        rate_limiter = self.runtime.rate_limiter
+        while not rate_limiter.try_consume():
+            await asyncio.sleep(rate_limiter.wait_time())
+
+    async def _upload(self, earthquake, images):
+        try:
+            ready = await asyncio.to_thread(self.runtime.ensure_poster)
+            if not ready:
+                logger.error("Instagram'a giriş yapılamadığı için paylaşım ertelendi.")
+                discard_images(images)
+                await asyncio.to_thread(self.runtime.release_claim, earthquake)
+                return
+
+            if await asyncio.to_thread(self.runtime.publish, earthquake, images):
+                await asyncio.to_thread(self.runtime.commit, earthquake)
+        except Exception as e:
+            metrics.ERRORS.inc(stage='upload')
+            logger.critical(f"!!! YÜKLEME AŞAMASINDA KRİTİK HATA: {e}", exc_info=True)
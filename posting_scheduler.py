@@ -0,0 +1,156 @@
+import time
+import heapq
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Paylaşım hızını sınırlayan jeton kovası.
+
+    Kova saatte `rate_per_hour` jetonla dolar ve en fazla `burst` jeton biriktirir;
+    her paylaşım bir jeton harcar. Başlangıçta kova doludur.
+    """
+
+    def __init__(self, rate_per_hour: float, burst: int, clock=time.monotonic):
+        self.rate_per_second = rate_per_hour / 3600.0
+        self.capacity = max(1, burst)
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self._updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def try_consume(self) -> bool:
+        """Jeton varsa harcar ve True döner."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Bir sonraki jeton için beklenmesi gereken süre (saniye)."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate_per_second
+
+
+class PostingScheduler:
+    """
+    Paylaşılacak depremleri büyüklük ve yeniliğe göre sıralayan öncelik kuyruğu.
+
+    En büyük deprem önce, eşit büyüklükte en yeni deprem önce çıkar. Kuyruk `max_backlog`
+    sınırını aştığında `stale_age_seconds` süresinden uzun bekleyen ve büyüklüğü
+    `stale_max_magnitude` altında kalan depremler için politika uygulanır:
+      - "drop": deprem kuyruktan atılır ve `drain_dropped()` ile alınabilir.
+      - "merge": deprem, kuyruktan çıkan bir sonraki paylaşıma `merged_events` olarak eklenir.
+    """
+
+    POLICIES = ('drop', 'merge')
+
+    def __init__(self, max_backlog=20, stale_age_seconds=1800, stale_max_magnitude=5.0,
+                 policy='drop', clock=time.monotonic):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Bilinmeyen birikme politikası: {policy}")
+        self.max_backlog = max_backlog
+        self.stale_age_seconds = stale_age_seconds
+        self.stale_max_magnitude = stale_max_magnitude
+        self.policy = policy
+        self.clock = clock
+
+        self._heap = []
+        self._entries = {}  # kandilli_id -> (deprem, kuyruğa girme zamanı)
+        self._counter = itertools.count()
+        self._dropped = []
+        self._merged = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, kandilli_id):
+        return kandilli_id in self._entries
+
+    def push(self, earthquake: dict) -> bool:
+        """Depremi kuyruğa ekler. Zaten kuyruktaysa False döner."""
+        kandilli_id = earthquake['kandilli_id']
+        if kandilli_id in self._entries:
+            return False
+
+        self._entries[kandilli_id] = (earthquake, self.clock())
+        priority = (-earthquake['magnitude'], -earthquake['earthquake_time'].timestamp(), next(self._counter))
+        heapq.heappush(self._heap, (priority, kandilli_id))
+
+        if len(self._entries) > self.max_backlog:
+            self._apply_backlog_policy()
+        return True
+
+    def pop(self):
+        """En öncelikli depremi döndürür, kuyruk boşsa None."""
+        while self._heap:
+            _, kandilli_id = heapq.heappop(self._heap)
+            entry = self._entries.pop(kandilli_id, None)
+            if entry is None:
+                continue  # Politika ile çıkarılmış
+            earthquake = entry[0]
+            if self._merged:
+                earthquake = dict(earthquake, merged_events=self._merged)
+                self._merged = []
+            return earthquake
+        return None
+
+    def take(self, predicate, limit=None, min_count=1):
+        """
+        Koşulu sağlayan depremleri öncelik sırasıyla (en fazla `limit` tane) kuyruktan çıkarıp döndürür.
+        En az `min_count` deprem bulunamazsa kuyruğa dokunulmaz ve boş liste döner.
+        """
+        matches, seen = [], set()
+        for _, kandilli_id in sorted(self._heap):
+            entry = self._entries.get(kandilli_id)
+            if entry is None or kandilli_id in seen:
+                continue
+            seen.add(kandilli_id)
+            if predicate(entry[0]):
+                matches.append(entry[0])
+                if limit is not None and len(matches) >= limit:
+                    break
+        if len(matches) < min_count:
+            return []
+        for earthquake in matches:
+            del self._entries[earthquake['kandilli_id']]  # Yığından pop sırasında atlanır
+        return matches
+
+    def drain_dropped(self):
+        """Politika ile atılan depremleri döndürür ve listeyi boşaltır."""
+        dropped, self._dropped = self._dropped, []
+        return dropped
+
+    def _apply_backlog_policy(self):
+        now = self.clock()
+        stale = [
+            (earthquake, queued_at) for earthquake, queued_at in self._entries.values()
+            if earthquake['magnitude'] < self.stale_max_magnitude and now - queued_at > self.stale_age_seconds
+        ]
+        if not stale:
+            return
+
+        # Önce en küçük ve en eski depremler, sadece sınırın altına inene kadar
+        stale.sort(key=lambda item: (item[0]['magnitude'], item[1]))
+        excess = len(self._entries) - self.max_backlog
+        for earthquake, _ in stale[:excess]:
+            del self._entries[earthquake['kandilli_id']]
+            if self.policy == 'merge':
+                self._merged.append(earthquake)
+            else:
+                self._dropped.append(earthquake)
+
+        logger.warning(
+            f"Paylaşım kuyruğu {self.max_backlog} sınırını aştı, "
+            f"{min(excess, len(stale))} eski küçük deprem için '{self.policy}' uygulandı."
+        )
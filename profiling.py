@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import logging
+import itertools
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MODES = ('collapsed', 'pstats')
+
+# Boşta bekleyen iş parçacıklarının en üst çerçeveleri (dosya adı, fonksiyon); örneklemede atlanır
+IDLE_FRAMES = frozenset((
+    ('threading.py', 'wait'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('thread.py', '_worker'),
+    ('socketserver.py', 'serve_forever'),
+))
+
+_NO_SPAN = nullcontext()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Tüm iş parçacıklarının yığınlarını `interval` saniyede bir örnekleyen profilci. Sonuç,
+    flamegraph araçlarının (flamegraph.pl, speedscope) okuduğu katlanmış yığın (collapsed stack)
+    biçimindedir: 'iş parçacığı;dış çerçeve;...;iç çerçeve örnek_sayısı'. Boşta bekleyen iş
+    parçacıkları (`include_idle` verilmezse) atlanır; ağ beklemeleri soket çerçeveleri olarak görünür.
+    """
+
+    def __init__(self, interval=0.005, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name.replace(' ', '_') for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CycleProfiler:
+    """
+    İstendiğinde sonraki kontrol döngülerini profilleyen kanca.
+
+    `request(n)` (SIGUSR1 işleyicisinden ya da `main.py run --profile-cycles n` ile) sonraki n
+    döngüyü işaretler. Profillenen her döngü için `output_dir`'e şunlar yazılır:
+      - 'collapsed' kipinde tüm iş parçacıklarının örneklenmiş yığınları (.collapsed),
+      - 'pstats' kipinde döngü iş parçacığının cProfile çıktısı (.prof, `python -m pstats` ile okunur),
+      - her iki kipte aşama süreleri (.spans.json).
+    İstek yokken `cycle` tek bir sayı kontrolü, `span` hazır bir boş bağlam döndürür.
+    """
+
+    def __init__(self, output_dir='profiles', mode='collapsed', sample_interval=0.005):
+        if mode not in MODES:
+            raise ValueError(f"Bilinmeyen profil kipi: {mode} ({', '.join(MODES)} olmalı)")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.active = False
+        self.written = []  # Yazılan profil dosyaları
+
+        # Sinyal işleyicisi kilit almadan sadece bu sayıyı yazar
+        self._requested = 0
+        self._cycles = itertools.count(1)
+        self._lock = threading.Lock()
+        self._spans = []
+        self._started = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            output_dir=config.PROFILE_DIR,
+            mode=config.PROFILE_MODE,
+            sample_interval=config.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+        )
+
+    @property
+    def deterministic(self):
+        """cProfile şu an açık mı? (cProfile sadece döngü iş parçacığını görür.)"""
+        return self.active and self.mode == 'pstats'
+
+    def request(self, cycles=1):
+        """Sonraki `cycles` döngüyü profiller (bekleyen isteğin yerine geçer)."""
+        self._requested = cycles
+
+    def install_signal(self, cycles=3, signum=None):
+        """
+        Sinyal (varsayılan SIGUSR1) geldiğinde sonraki `cycles` döngüyü profiller. Sinyal bu
+        platformda yoksa (Windows) ya da ana iş parçacığında değilsek False döner.
+        """
+        import signal
+
+        signum = signum if signum is not None else getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            return False
+        try:
+            signal.signal(signum, lambda *_: self.request(cycles))
+        except ValueError:
+            return False
+        return True
+
+    @contextmanager
+    def cycle(self, name='cycle'):
+        """Bloğu, istenmişse profillenen bir döngü olarak çalıştırır."""
+        if not self._requested or self.active:
+            yield
+            return
+
+        self._requested -= 1
+        index = next(self._cycles)
+        if self.mode == 'pstats':
+            import cProfile
+
+            profiler = cProfile.Profile()
+        else:
+            profiler = StackSampler(self.sample_interval)
+        with self._lock:
+            self._spans = []
+        self._started = time.perf_counter()
+        self.active = True
+        if self.mode == 'pstats':
+            profiler.enable()
+        else:
+            profiler.start()
+        try:
+            with self._span(name):
+                yield
+        finally:
+            if self.mode == 'pstats':
+                profiler.disable()
+            else:
+                profiler.stop()
+            self.active = False
+            self._write(index, profiler, time.perf_counter() - self._started)
+
+    def span(self, stage):
+        """Aşamanın süresini profillenen döngünün aşama sürelerine ekler; profil yokken bir şey yapmaz."""
+        if not self.active:
+            return _NO_SPAN
+        return self._span(stage)
+
+    @contextmanager
+    def _span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._spans.append({
+                    'stage': stage,
+                    'thread': threading.current_thread().name,
+                    'start_ms': round((start - self._started) * 1000, 3),
+                    'duration_ms': round((end - start) * 1000, 3),
+                })
+
+    def stage_totals(self):
+        """Son profillenen döngüde aşama başına toplam süre (ms)."""
+        totals = Counter()
+        with self._lock:
+            for span in self._spans:
+                totals[span['stage']] += span['duration_ms']
+        return dict(totals)
+
+    def _write(self, index, profiler, elapsed):
+        prefix = os.path.join(self.output_dir, f"cycle-{datetime.now():%Y%m%d-%H%M%S}-{index:03d}")
+        profile_path = prefix + ('.prof' if self.mode == 'pstats' else '.collapsed')
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            if self.mode == 'pstats':
+                profiler.dump_stats(profile_path)
+            else:
+                profiler.write(profile_path)
+            with self._lock:
+                spans = list(self._spans)
+            with open(prefix + '.spans.json', 'w', encoding='utf-8') as f:
+                json.dump({'elapsed_ms': round(elapsed * 1000, 3), 'mode': self.mode, 'spans': spans}, f, indent=1)
+        except OSError as e:
+            logger.warning(f"Profil dosyası yazılamadı: {e}")
+            return
+
+        self.written += [profile_path, prefix + '.spans.json']
+        stages = ', '.join(
+            f"{stage} {ms:.0f} ms" for stage, ms in sorted(self.stage_totals().items(), key=lambda item: -item[1])
+        )
+        logger.info(f"Döngü profillendi ({stages}): {profile_path}")
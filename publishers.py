@@ -0,0 +1,402 @@
+import json
+import time
+import heapq
+import random
+import logging
+import threading
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from posting_scheduler import TokenBucket
+
+# Tek bir paylaşım: ana deprem (albümdeki/başlığa eklenen depremlerle), başlık ve çizilmiş
+# görsellerin biçim adından yollara sözlüğü ('feed' her zaman vardır)
+Publication = namedtuple('Publication', 'earthquake caption images')
+
+TELEGRAM_CAPTION_LIMIT = 1024  # Telegram fotoğraf başlığı için en fazla karakter
+TELEGRAM_ALBUM_LIMIT = 10  # sendMediaGroup ile tek seferde gönderilebilecek en fazla görsel
+
+
+class PublishError(Exception):
+    """
+    Kanala gönderim başarısız. `retryable` False ise (ör. geçersiz istek) tekrar denenmez;
+    `retry_after` verilmişse bir sonraki deneme en erken bu kadar saniye sonra yapılır.
+    """
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class Publisher:
+    """
+    Paylaşım kanalı arayüzü. `publish` paylaşımı gönderir ve kanaldaki kimliğini döndürür;
+    başarısızsa None döndürür ya da PublishError fırlatır.
+
+    Instagram (InstagramPoster) da bir Publisher'dır, ancak SinkWorker kuyruğuna verilmez:
+    BotRuntime.publish onu doğrudan çağırır. Instagram'ın medya ID'si veritabanı kaydını,
+    paylaşım günlüğünü ve talepleri kapatır; başarısız yükleme bellekteki bir kuyrukta değil,
+    günlük ve talep bırakılarak sonraki döngüde tekrar denenir (süreç çökse de kaybolmaz).
+    Hız sınırı runtime'ın jeton kovasıdır. SinkWorker'ın "bir kez gönder" kuralı ise
+    Instagram'da tekrar denemeyi engellerdi.
+    """
+
+    name = 'publisher'
+
+    def publish(self, publication: Publication):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _event_payload(earthquake):
+    return {
+        'kandilli_id': earthquake['kandilli_id'],
+        'earthquake_time': earthquake['earthquake_time'].isoformat(),
+        'magnitude': earthquake['magnitude'],
+        'depth': earthquake['depth'],
+        'location': earthquake['location'],
+        'latitude': earthquake.get('latitude'),
+        'longitude': earthquake.get('longitude'),
+        'nearest_place': earthquake.get('nearest_place'),
+    }
+
+
+def _raise_for_status(response, channel):
+    if response.status_code < 400:
+        return
+    retry_after = response.headers.get('Retry-After')
+    retryable = response.status_code in (408, 425, 429) or response.status_code >= 500
+    raise PublishError(
+        f"{channel} {response.status_code} yanıtı verdi",
+        retryable=retryable,
+        retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+    )
+
+
+class WebhookPublisher(Publisher):
+    """
+    Paylaşımı bir HTTP uç noktasına multipart POST olarak gönderir: 'payload' alanında depremlerin
+    JSON'u ve başlık, 'image' alanında ilk akış görseli. 2xx dışındaki yanıtlar hata sayılır.
+    """
+
+    name = 'webhook'
+
+    def __init__(self, url, session=None, timeout=10, name=None):
+        import requests
+
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        if name:
+            self.name = name
+
+    def publish(self, publication):
+        import requests
+
+        earthquake = publication.earthquake
+        payload = {
+            'event': _event_payload(earthquake),
+            'swarm_events': [_event_payload(eq) for eq in earthquake.get('swarm_events', [])],
+            'merged_events': [_event_payload(eq) for eq in earthquake.get('merged_events', [])],
+            'caption': publication.caption,
+        }
+        try:
+            with open(publication.images['feed'][0], 'rb') as image:
+                response = self.session.post(
+                    self.url,
+                    data={'payload': json.dumps(payload, ensure_ascii=False)},
+                    files={'image': ('deprem.jpg', image, 'image/jpeg')},
+                    timeout=self.timeout,
+                )
+        except requests.exceptions.RequestException as e:
+            raise PublishError(f"Webhook'a ulaşılamadı: {e}") from e
+        _raise_for_status(response, 'Webhook')
+        try:
+            return str(response.json().get('id') or response.status_code)
+        except ValueError:
+            return str(response.status_code)
+
+    def close(self):
+        self.session.close()
+
+
+class TelegramPublisher(Publisher):
+    """
+    Paylaşımı Telegram Bot API'si biçimindeki bir uç noktaya gönderir: tek görsel sendPhoto,
+    albüm sendMediaGroup ile (başlık ilk görselde). Başlık Telegram sınırına göre kısaltılır;
+    429 yanıtındaki `retry_after` bir sonraki denemenin zamanını belirler.
+    """
+
+    name = 'telegram'
+
+    def __init__(self, token, chat_id, api_url='https://api.telegram.org', session=None, timeout=10):
+        import requests
+
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.chat_id = chat_id
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def publish(self, publication):
+        import requests
+
+        caption = publication.caption
+        if len(caption) > TELEGRAM_CAPTION_LIMIT:
+            caption = caption[:TELEGRAM_CAPTION_LIMIT - 1] + '…'
+        paths = publication.images['feed'][:TELEGRAM_ALBUM_LIMIT]
+
+        files = {}
+        try:
+            for i, path in enumerate(paths):
+                files[f'photo{i}'] = (f'deprem{i}.jpg', open(path, 'rb'), 'image/jpeg')
+            if len(paths) > 1:
+                method = 'sendMediaGroup'
+                media = [{'type': 'photo', 'media': f'attach://photo{i}'} for i in range(len(paths))]
+                media[0]['caption'] = caption
+                data = {'chat_id': self.chat_id, 'media': json.dumps(media, ensure_ascii=False)}
+            else:
+                method = 'sendPhoto'
+                files = {'photo': files['photo0']}
+                data = {'chat_id': self.chat_id, 'caption': caption}
+            response = self.session.post(f"{self.base_url}/{method}", data=data, files=files, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise PublishError(f"Telegram'a ulaşılamadı: {e}") from e
+        finally:
+            for _, image, _ in files.values():
+                image.close()
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code == 429:
+            retry_after = (body.get('parameters') or {}).get('retry_after')
+            raise PublishError("Telegram hız sınırı", retry_after=retry_after)
+        _raise_for_status(response, 'Telegram')
+        if not body.get('ok'):
+            raise PublishError(f"Telegram isteği reddetti: {body.get('description')}", retryable=False)
+        result = body['result']
+        if isinstance(result, list):
+            result = result[0]
+        return str(result['message_id'])
+
+    def close(self):
+        self.session.close()
+
+
+class ImageLease:
+    """
+    Görsel dosyalarını, onları kullanan tüm kanallar işini bitirene kadar tutar.
+    `holders` kez `release` çağrıldığında `discard` ile dosyalar silinir.
+    """
+
+    def __init__(self, images, holders, discard):
+        self.images = images
+        self.discard = discard
+        self._holders = holders
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            self._holders -= 1
+            if self._holders:
+                return
+        try:
+            self.discard(self.images)
+        except OSError as e:
+            logging.warning(f"Geçici görseller silinemedi: {e}")
+
+
+class _Job:
+    __slots__ = ('publication', 'on_done', 'attempts', 'submitted_at')
+
+    def __init__(self, publication, on_done, submitted_at):
+        self.publication = publication
+        self.on_done = on_done
+        self.attempts = 0
+        self.submitted_at = submitted_at
+
+
+class SinkWorker:
+    """
+    Bir kanalın gönderim kuyruğu: kendi iş parçacığı havuzu, hız sınırı (jeton kovası) ve
+    tekrar deneme kuyruğu vardır; yavaş ya da hata veren bir kanal diğerlerini bekletmez.
+
+    Başarısız gönderimler üstel artan, tam rastgele beklemeyle (ya da kanalın istediği
+    `retry_after` sonra) `max_attempts` kez denenir. Aynı deprem bir kanala bir kez gönderilir;
+    Instagram'a yüklenemeyip sonraki döngüde tekrar paylaşılan depremler yeniden gönderilmez.
+    Kuyruk bellektedir: süreç kapanırsa bekleyen gönderimler kaybolur.
+    """
+
+    def __init__(self, publisher, workers=1, posts_per_hour=3600, burst=5, max_attempts=5,
+                 retry_base=2.0, retry_max=300, seen_size=1000, clock=time.monotonic):
+        self.publisher = publisher
+        self.name = publisher.name
+        self.workers = max(1, workers)
+        self.rate_limiter = TokenBucket(posts_per_hour, burst, clock=clock)
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.seen_size = seen_size
+        self.clock = clock
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'sink-{self.name}')
+        self._condition = threading.Condition()
+        self._queue = []  # (zamanı, sıra, iş) yığını
+        self._sequence = 0
+        self._in_flight = 0
+        self._seen = OrderedDict()
+        self._closed = False
+        self._dispatcher = None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._queue) + self._in_flight
+
+    @classmethod
+    def from_config(cls, config, publisher, posts_per_hour):
+        return cls(
+            publisher,
+            workers=config.SINK_WORKERS,
+            posts_per_hour=posts_per_hour,
+            burst=config.SINK_BURST,
+            max_attempts=config.SINK_MAX_ATTEMPTS,
+            retry_base=config.SINK_RETRY_BASE_SECONDS,
+            retry_max=config.SINK_RETRY_MAX_SECONDS,
+        )
+
+    def submit(self, publication, on_done=None) -> bool:
+        """
+        Paylaşımı kuyruğa ekler ve hemen döner. `on_done` gönderim başarılı olduğunda ya da
+        vazgeçildiğinde bir kez çağrılır. Deprem bu kanala zaten gönderildiyse False döner.
+        """
+        key = publication.earthquake['kandilli_id']
+        with self._condition:
+            if self._closed or key in self._seen:
+                metrics.SINK_DELIVERIES.inc(sink=self.name, result='skipped')
+                return False
+            self._seen[key] = True
+            if len(self._seen) > self.seen_size:
+                self._seen.popitem(last=False)
+            self._push(_Job(publication, on_done, self.clock()), self.clock())
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name=f'sink-{self.name}-dispatch', daemon=True)
+                self._dispatcher.start()
+        return True
+
+    def drain(self, timeout=None) -> bool:
+        """Kuyruk boşalana (tekrar denemeler dahil) kadar bekler; süre dolarsa False döner."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self):
+        """Kanalı kapatır; gönderilmeyi bekleyen paylaşımlardan vazgeçilir, sürmekte olanlar tamamlanır."""
+        with self._condition:
+            self._closed = True
+            abandoned = [job for _, _, job in self._queue]
+            self._queue.clear()
+            self._condition.notify_all()
+        for job in abandoned:
+            if job.on_done is not None:
+                job.on_done()
+        self._executor.shutdown(wait=False)
+        self.publisher.close()
+
+    def _push(self, job, due):
+        heapq.heappush(self._queue, (due, self._sequence, job))
+        self._sequence += 1
+        metrics.SINK_QUEUE.set(len(self._queue), sink=self.name)
+        self._condition.notify_all()
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    if self._queue and self._in_flight < self.workers:
+                        delay = self._queue[0][0] - self.clock()
+                        if delay <= 0:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+                _, _, job = heapq.heappop(self._queue)
+                self._in_flight += 1
+                metrics.SINK_QUEUE.set(len(self._queue), sink=self.name)
+
+            # Kanalın hız sınırı: jeton beklenirken diğer kanallar etkilenmez
+            while not self.rate_limiter.try_consume():
+                time.sleep(self.rate_limiter.wait_time())
+            try:
+                self._executor.submit(self._deliver, job)
+            except RuntimeError:
+                # Kanal bu arada kapatıldı
+                if job.on_done is not None:
+                    job.on_done()
+                return
+
+    def _deliver(self, job):
+        job.attempts += 1
+        started = time.perf_counter()
+        retry_after = None
+        try:
+            message_id = self.publisher.publish(job.publication)
+            retryable = True
+        except PublishError as e:
+            message_id, retryable, retry_after = None, e.retryable, e.retry_after
+            logging.warning(f"'{self.name}' kanalına gönderilemedi ({job.attempts}. deneme): {e}")
+        except Exception as e:
+            message_id, retryable = None, True
+            logging.error(f"'{self.name}' kanalına gönderim sırasında hata: {e}", exc_info=True)
+        metrics.SINK_SECONDS.observe(time.perf_counter() - started, sink=self.name)
+
+        earthquake = job.publication.earthquake
+        finished = True
+        if message_id:
+            metrics.SINK_DELIVERIES.inc(sink=self.name, result='ok')
+            metrics.SINK_DELIVERY_DELAY_SECONDS.observe(self.clock() - job.submitted_at, sink=self.name)
+            logging.info(f"'{self.name}' kanalına gönderildi: {earthquake['location']} ({message_id})")
+        elif retryable and job.attempts < self.max_attempts:
+            finished = False
+            metrics.SINK_DELIVERIES.inc(sink=self.name, result='retry')
+            if retry_after is None:
+                retry_after = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1)))
+        else:
+            metrics.SINK_DELIVERIES.inc(sink=self.name, result='failed')
+            metrics.ERRORS.inc(stage=f'sink_{self.name}')
+            logging.error(f"'{self.name}' kanalına {job.attempts} denemede gönderilemedi, vazgeçildi: {earthquake['location']}")
+
+        with self._condition:
+            self._in_flight -= 1
+            if not finished and not self._closed:
+                self._push(job, self.clock() + retry_after)
+            else:
+                finished = True
+            self._condition.notify_all()
+        if finished and job.on_done is not None:
+            job.on_done()
+
+
+def build_sinks(config):
+    """Config'te tanımlı ek kanallar (webhook, Telegram) için SinkWorker listesi döndürür."""
+    sinks = []
+    for i, url in enumerate(url for url in config.WEBHOOK_URLS.split(',') if url.strip()):
+        publisher = WebhookPublisher(url.strip(), timeout=config.SINK_TIMEOUT_SECONDS, name=f'webhook{i or ""}')
+        sinks.append(SinkWorker.from_config(config, publisher, config.WEBHOOK_POSTS_PER_HOUR))
+    if config.TELEGRAM_BOT_TOKEN and config.TELEGRAM_CHAT_ID:
+        publisher = TelegramPublisher(
+            config.TELEGRAM_BOT_TOKEN, config.TELEGRAM_CHAT_ID, config.TELEGRAM_API_URL, timeout=config.SINK_TIMEOUT_SECONDS
+        )
+        sinks.append(SinkWorker.from_config(config, publisher, config.TELEGRAM_POSTS_PER_HOUR))
+    return sinks
@@ -0,0 +1,130 @@
+import time
+import logging
+from collections import deque
+from datetime import timedelta
+
+from dedup_index import haversine_km
+
+logger = logging.getLogger(__name__)
+
+ALBUM_MAX_ITEMS = 10  # Instagram albümündeki en fazla görsel (özet dahil)
+# Albümde ilk görsel özet tablodur; her depremin kendi görseli de albüme sığmalıdır
+SWARM_MAX_EVENTS_LIMIT = ALBUM_MAX_ITEMS - 1
+
+
+class SwarmAggregator:
+    """
+    Artçı fırtınalarında birbirine yakın depremleri tek bir albüm paylaşımında toplar.
+
+    İki deprem `window_seconds` içinde ve merkez üsleri arasında en fazla `distance_km` varsa
+    ilişkili sayılır. Paylaşım sırası gelen (en büyük) depremle ilişkili olan ve kuyrukta bekleyen
+    depremler en az `min_events` olacak şekilde bir araya gelirse tek albüm olarak paylaşılır.
+
+    Devam eden bir fırtınada (yakın zamanda paylaşılmış ilişkili bir deprem varsa),
+    `hold_max_magnitude` altındaki yeni depremler en fazla `hold_seconds` bekletilir; böylece
+    aynı sırada gelen artçılar ayrı ayrı değil birlikte paylaşılır. Bekletme süresi dolan
+    deprem, kendisiyle ilişkili bekleyen tüm depremlerle birlikte bırakılır.
+
+    `max_events` en fazla SWARM_MAX_EVENTS_LIMIT olabilir: albüme görseli sığmayan bir deprem
+    paylaşılmış sayılmamalıdır. Daha büyük değer verilirse uyarı loglanır ve sınır kullanılır.
+    """
+
+    def __init__(self, distance_km=50, window_seconds=1800, min_events=3, max_events=12,
+                 hold_seconds=120, hold_max_magnitude=5.0, clock=time.monotonic):
+        self.distance_km = distance_km
+        self.window_seconds = window_seconds
+        if max_events > SWARM_MAX_EVENTS_LIMIT:
+            logger.warning(
+                f"SWARM_MAX_EVENTS={max_events} albüme sığmaz (özetle birlikte en fazla {ALBUM_MAX_ITEMS} görsel), "
+                f"{SWARM_MAX_EVENTS_LIMIT} kullanılacak."
+            )
+        self.min_events = min(max(2, min_events), SWARM_MAX_EVENTS_LIMIT)
+        self.max_events = max(self.min_events, min(max_events, SWARM_MAX_EVENTS_LIMIT))
+        self.hold_seconds = hold_seconds
+        self.hold_max_magnitude = hold_max_magnitude
+        self.clock = clock
+
+        self._held = {}  # kandilli_id -> (deprem, bırakılma zamanı)
+        self._recent = deque(maxlen=500)  # Yakın zamanda paylaşılan depremler
+
+    @classmethod
+    def from_config(cls, config, clock=time.monotonic):
+        return cls(
+            distance_km=config.SWARM_DISTANCE_KM,
+            window_seconds=config.SWARM_WINDOW_MINUTES * 60,
+            min_events=config.SWARM_MIN_EVENTS,
+            max_events=config.SWARM_MAX_EVENTS,
+            hold_seconds=config.SWARM_HOLD_SECONDS,
+            hold_max_magnitude=config.SWARM_HOLD_MAX_MAGNITUDE,
+            clock=clock,
+        )
+
+    def __len__(self):
+        return len(self._held)
+
+    def related(self, a, b):
+        """İki depremin aynı fırtınaya ait sayılıp sayılmayacağı."""
+        if abs((a['earthquake_time'] - b['earthquake_time']).total_seconds()) > self.window_seconds:
+            return False
+        return haversine_km(a['latitude'], a['longitude'], b['latitude'], b['longitude']) <= self.distance_km
+
+    def admit(self, earthquakes):
+        """
+        Yeni depremleri alır; hemen paylaşılabilecekleri ve bekletme süresi dolanları döndürür.
+        Zaten bekletilmekte olan depremler tekrar verilirse yok sayılır.
+        """
+        ready = []
+        release_at = self.clock() + self.hold_seconds
+        for earthquake in earthquakes:
+            kandilli_id = earthquake['kandilli_id']
+            if kandilli_id in self._held:
+                continue
+            if self._should_hold(earthquake):
+                self._held[kandilli_id] = (earthquake, release_at)
+            else:
+                ready.append(earthquake)
+        return ready + self.release_due()
+
+    def _should_hold(self, earthquake):
+        if self.hold_seconds <= 0 or earthquake['magnitude'] >= self.hold_max_magnitude:
+            return False
+        return any(self.related(earthquake, posted) for posted in self._recent)
+
+    def release_due(self):
+        """Bekletme süresi dolan depremleri, ilişkili bekleyenlerle birlikte döndürür."""
+        now = self.clock()
+        released = [eq for eq, release_at in self._held.values() if release_at <= now]
+        if not released:
+            return []
+
+        for earthquake in released:
+            self._held.pop(earthquake['kandilli_id'], None)
+        # Dolan depremle ilişkili olanlar da beklemeden birlikte bırakılır
+        for kandilli_id, (earthquake, _) in list(self._held.items()):
+            if any(self.related(earthquake, other) for other in released):
+                del self._held[kandilli_id]
+                released.append(earthquake)
+        return released
+
+    def group(self, earthquake, scheduler):
+        """
+        Paylaşım sırası gelen depremle ilişkili olup kuyrukta bekleyenleri alır. Toplam en az
+        `min_events` deprem olursa bunlar `swarm_events` olarak eklenir, aksi halde kuyruğa dokunulmaz.
+        """
+        members = scheduler.take(
+            lambda queued: self.related(earthquake, queued),
+            limit=self.max_events - 1,
+            min_count=self.min_events - 1,
+        )
+        if not members:
+            return earthquake
+        logger.info("Artçı fırtınası: %d deprem tek albümde paylaşılacak (%s).", len(members) + 1, earthquake['location'])
+        return dict(earthquake, swarm_events=members)
+
+    def record_posted(self, earthquakes):
+        """Paylaşılan depremleri, sonraki depremlerin bekletilip bekletilmeyeceği için hatırlar."""
+        self._recent.extend(earthquakes)
+        newest = max(eq['earthquake_time'] for eq in self._recent)
+        horizon = newest - timedelta(seconds=self.window_seconds)
+        while self._recent and self._recent[0]['earthquake_time'] < horizon:
+            self._recent.popleft()
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import shutil
+from datetime import datetime
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from fakes import FakeInstagramClient, build_offline_runtime, offline_config
+from outbox import PENDING
+
+
+class FeedFailingInstagram(FakeInstagramClient):
+    """Akış yüklemesi her zaman başarısız olan, hikaye yüklemesi başarılı olan sahte istemci."""
+
+    def photo_upload(self, path, caption=''):
+        raise ConnectionError("Sahte Instagram: yükleme başarısız")
+
+
+def _earthquake(kandilli_id='20250820_131622_37.288_37.043_4.2'):
+    return {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': datetime(2025, 8, 20, 13, 16, 22),
+        'latitude': 37.288,
+        'longitude': 37.043,
+        'magnitude': 4.2,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+    }
+
+
+def _images(work_dir, formats=('feed', 'story')):
+    images = {}
+    for name in formats:
+        path = os.path.join(work_dir, f'{name}.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'jpeg')
+        images[name] = [path]
+    return images
+
+
+@pytest.fixture
+def make_runtime():
+    created = []
+
+    def make(instagram=None, **overrides):
+        config = offline_config(**{'GAZETTEER_ENABLED': False, 'POST_STORY': True, **overrides})
+        instagram = instagram if instagram is not None else FakeInstagramClient()
+        runtime = build_offline_runtime(config, 'http://127.0.0.1:9/', instagram=instagram)
+        assert runtime.ensure_poster()
+        created.append(runtime)
+        return runtime, instagram
+
+    yield make
+    for runtime in created:
+        runtime.close()
+        shutil.rmtree(runtime.config.WORK_DIR, ignore_errors=True)
+
+
+def test_story_is_uploaded_after_feed(make_runtime):
+    runtime, instagram = make_runtime()
+    images = _images(runtime.config.WORK_DIR)
+
+    assert runtime.publish(_earthquake(), images)
+    runtime.close()
+    assert len(instagram.media) == 1
+    assert len(instagram.stories) == 1
+    assert not any(os.path.exists(paths[0]) for paths in images.values())
+
+
+def test_story_is_not_uploaded_when_feed_fails(make_runtime):
+    runtime, instagram = make_runtime(FeedFailingInstagram())
+    images = _images(runtime.config.WORK_DIR)
+
+    assert runtime.publish(_earthquake(), images) is None
+    runtime.close()
+    assert instagram.stories == []
+    assert not any(os.path.exists(paths[0]) for paths in images.values())
+    # Deprem tekrar paylaşılabilir: günlükte açık kayıt kalmaz
+    assert runtime.outbox.open_entries(PENDING) == {}
+
+
+def test_timed_out_upload_keeps_images_until_thread_finishes(make_runtime):
+    instagram = FakeInstagramClient(latency=0.5)
+    runtime, _ = make_runtime(instagram, DEADLINE_UPLOAD_SECONDS=0.05, POST_STORY=False)
+    images = _images(runtime.config.WORK_DIR, formats=('feed',))
+
+    assert runtime.publish(_earthquake(), images) is None
+    # Bırakılan yükleme hâlâ görseli okuyabilir
+    assert os.path.exists(images['feed'][0])
+    (thread, _), = runtime._abandoned_uploads
+    thread.join(5)
+    deadline = time.monotonic() + 5
+    while os.path.exists(images['feed'][0]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not os.path.exists(images['feed'][0])
+    assert len(instagram.media) == 1
+    assert set(runtime.outbox.open_entries(PENDING)) == {_earthquake()['kandilli_id']}
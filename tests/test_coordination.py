@@ -0,0 +1,147 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from fakes import InMemorySupabase
+from coordination import CLAIMED, Coordinator, SqliteClaimStore, SupabaseClaimStore
+
+
+class ManualClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _earthquake(kandilli_id):
+    return {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': datetime(2025, 8, 20, 13, 16, 22),
+        'location': 'PAZARCIK',
+    }
+
+
+@pytest.fixture(params=['sqlite', 'supabase'])
+def make_coordinator(request, tmp_path):
+    if request.param == 'sqlite':
+        store = SqliteClaimStore(str(tmp_path / 'coordination.db'))
+    else:
+        store = SupabaseClaimStore(InMemorySupabase())
+    clock = ManualClock()
+
+    def make(holder):
+        # Duvar saati ve monoton saat aynı elle ilerletilen saattir
+        return Coordinator(store, holder=holder, lease_seconds=10, renew_seconds=2, stale_claim_seconds=600,
+                           clock=clock, monotonic=clock)
+
+    yield make, clock
+    store.close()
+
+
+def test_only_one_instance_holds_the_lease(make_coordinator):
+    make, clock = make_coordinator
+    first, second = make('a'), make('b')
+
+    assert first.renew()
+    assert not second.renew()
+    # Yenileme kirayı uzatır, diğer örnek devralamaz
+    clock.now += 5
+    assert first.renew()
+    clock.now += 5
+    assert not second.renew()
+
+
+def test_lease_is_valid_until_renew_margin(make_coordinator):
+    make, clock = make_coordinator
+    leader = make('a')
+    assert leader.renew()
+
+    clock.now += 7.9
+    assert leader.is_leader()
+    # Kira depoda 10 sn geçerli, ama örnek 8 sn sonra paylaşımı bırakır
+    clock.now += 0.2
+    assert not leader.is_leader()
+
+
+def test_expired_lease_is_stolen(make_coordinator):
+    make, clock = make_coordinator
+    first, second = make('a'), make('b')
+    assert first.renew()
+
+    clock.now += 11
+    assert second.renew()
+    assert not first.renew()
+    assert not first.is_leader()
+
+
+def test_released_lease_is_taken_over_immediately(make_coordinator):
+    make, clock = make_coordinator
+    first, second = make('a'), make('b')
+    assert first.renew()
+
+    first.stop(release=True)
+    assert not first.is_leader()
+    assert second.renew()
+
+
+def test_claim_is_exclusive(make_coordinator):
+    make, clock = make_coordinator
+    first, second = make('a'), make('b')
+    assert first.renew()
+    assert first.claim([_earthquake('x'), _earthquake('y')]) == {'x', 'y'}
+
+    # Kirası elinden giden eski lider ile yeni lider aynı depremi talep edemez
+    clock.now += 11
+    assert second.renew()
+    assert second.claim([_earthquake('y'), _earthquake('z')]) == {'z'}
+    assert second.filter_unclaimed({'x', 'y', 'z', 'w'}) == {'w'}
+
+
+def test_claim_requires_leadership(make_coordinator):
+    make, clock = make_coordinator
+    follower = make('b')
+    assert follower.claim([_earthquake('x')]) == set()
+    assert follower.filter_unclaimed({'x'}) == {'x'}
+
+
+def test_release_frees_claim_but_not_posted(make_coordinator):
+    make, clock = make_coordinator
+    leader = make('a')
+    assert leader.renew()
+    assert leader.claim([_earthquake('x'), _earthquake('y')]) == {'x', 'y'}
+
+    leader.mark_posted(['y'], 'media')
+    leader.release(['x', 'y'])
+    # Paylaşılmış talep bırakılamaz; paylaşılmamış deprem tekrar talep edilebilir
+    assert leader.filter_unclaimed({'x', 'y'}) == {'x'}
+    assert leader.claim([_earthquake('x')]) == {'x'}
+
+
+def test_other_holder_cannot_release_claim(make_coordinator):
+    make, clock = make_coordinator
+    first, second = make('a'), make('b')
+    assert first.renew()
+    assert first.claim([_earthquake('x')]) == {'x'}
+
+    second.release(['x'])
+    assert first.filter_unclaimed({'x'}) == set()
+
+
+def test_stale_claims_are_reported(make_coordinator):
+    make, clock = make_coordinator
+    leader = make('a')
+    assert leader.renew()
+    assert leader.claim([_earthquake('x'), _earthquake('y')]) == {'x', 'y'}
+    leader.mark_posted(['y'], 'media')
+
+    assert leader.stale_claims() == []
+    clock.now += 601
+    stale = leader.stale_claims()
+    assert [(claim['kandilli_id'], claim['holder'], claim['state']) for claim in stale] == [('x', 'a', CLAIMED)]
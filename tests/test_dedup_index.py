@@ -0,0 +1,101 @@
+import os
+import sys
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from dedup_index import SpatioTemporalIndex
+from fakes import InMemorySupabase, build_offline_runtime, offline_config
+
+BASE_TIME = datetime(2025, 8, 20, 13, 16, 22)
+
+
+def _earthquake(kandilli_id, seconds=0, latitude=37.288, longitude=37.043, magnitude=4.2, is_revised=False):
+    return {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': BASE_TIME + timedelta(seconds=seconds),
+        'latitude': latitude,
+        'longitude': longitude,
+        'magnitude': magnitude,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+        'is_revised': is_revised,
+    }
+
+
+@pytest.fixture
+def runtime():
+    config = offline_config(GAZETTEER_ENABLED=False, SWARM_ENABLED=False)
+    supabase = InMemorySupabase()
+    runtime = build_offline_runtime(config, 'http://127.0.0.1:9/', supabase=supabase)
+    runtime.now = lambda: BASE_TIME + timedelta(minutes=5)
+    runtime.supabase = supabase
+    yield runtime
+    runtime.close()
+    shutil.rmtree(config.WORK_DIR, ignore_errors=True)
+
+
+def test_unmarked_swarm_shocks_do_not_match():
+    index = SpatioTemporalIndex()
+    index.add(_earthquake('a'))
+    # 40 sn sonra, ~8 km uzakta ve 0.2 büyük: geniş toleranslara uyar ama ayrı bir artçıdır
+    assert index.match(_earthquake('b', seconds=40, latitude=37.36, magnitude=4.4)) is None
+
+
+def test_revised_row_matches_within_wide_tolerances():
+    index = SpatioTemporalIndex()
+    index.add(_earthquake('a'))
+    match = index.match(_earthquake('a-rev', seconds=40, latitude=37.36, magnitude=4.4, is_revised=True))
+    assert match['kandilli_id'] == 'a'
+
+
+def test_unmarked_row_matches_only_when_nearly_identical():
+    index = SpatioTemporalIndex()
+    index.add(_earthquake('a'))
+    assert index.match(_earthquake('a-copy', seconds=2, latitude=37.29))['kandilli_id'] == 'a'
+
+
+def test_dedupe_batch_keeps_distinct_swarm_shocks():
+    batch = [_earthquake('a'), _earthquake('b', seconds=40, latitude=37.36, magnitude=4.4)]
+    assert SpatioTemporalIndex.dedupe_batch(batch, SpatioTemporalIndex) == batch
+
+
+def test_distinct_swarm_shock_is_posted_after_first(runtime):
+    first = _earthquake('a')
+    runtime.commit(first)
+
+    second = _earthquake('b', seconds=40, latitude=37.36, magnitude=4.4)
+    assert runtime._resolve_revisions([second]) == [second]
+    row = runtime.supabase.table('earthquakes').rows['a']
+    assert row['magnitude'] == 4.2
+    assert row['earthquake_time'] == first['earthquake_time'].isoformat()
+
+
+def test_revision_updates_row_without_reposting(runtime):
+    runtime.commit(_earthquake('a'))
+
+    revised = _earthquake('a-rev', seconds=3, latitude=37.30, magnitude=4.5, is_revised=True)
+    assert runtime._resolve_revisions([revised]) == []
+    rows = runtime.supabase.table('earthquakes').rows
+    assert set(rows) == {'a'}
+    assert rows['a']['magnitude'] == 4.5
+    assert rows['a']['latitude'] == 37.30
+    assert 'a-rev' in runtime.posted_cache
+
+
+def test_dropped_events_are_not_indexed(runtime):
+    dropped = _earthquake('dropped')
+    runtime.scheduler._dropped.append(dropped)
+    runtime.skip_dropped()
+    assert 'dropped' not in runtime.dedup_index
+
+    # İndeks veritabanından yeniden kurulduğunda da paylaşılmayan kayıt alınmaz
+    runtime._dedup_index_ready = False
+    revised = _earthquake('dropped-rev', seconds=3, magnitude=4.3, is_revised=True)
+    assert runtime._resolve_revisions([revised]) == [revised]
+    assert runtime.supabase.table('earthquakes').rows['dropped']['magnitude'] == 4.2
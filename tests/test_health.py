@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from health import StageTimeout, Watchdog, call_with_deadline, when_finished
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_call_with_deadline_returns_value():
+    assert call_with_deadline('render', 1, lambda a, b=0: a + b, 1, b=2) == 3
+
+
+def test_call_with_deadline_reraises_error():
+    def fail():
+        raise KeyError('kandilli_id')
+
+    with pytest.raises(KeyError):
+        call_with_deadline('db_save', 1, fail)
+
+
+def test_call_with_deadline_abandons_slow_call():
+    release = threading.Event()
+
+    with pytest.raises(StageTimeout) as error:
+        call_with_deadline('upload', 0.05, release.wait, 5)
+    assert error.value.stage == 'upload'
+    assert error.value.thread.is_alive()
+    assert error.value.thread.daemon
+
+    release.set()
+    error.value.thread.join(5)
+    assert not error.value.thread.is_alive()
+
+
+def test_when_finished_runs_immediately_without_live_thread():
+    calls = []
+    when_finished(None, lambda: calls.append('none'))
+    thread = threading.Thread(target=lambda: None)
+    thread.start()
+    thread.join()
+    when_finished(thread, lambda: calls.append('dead'))
+    assert calls == ['none', 'dead']
+
+
+def test_when_finished_waits_for_abandoned_thread():
+    release = threading.Event()
+    done = threading.Event()
+    with pytest.raises(StageTimeout) as error:
+        call_with_deadline('upload', 0.05, release.wait, 5)
+
+    when_finished(error.value.thread, done.set)
+    assert not done.wait(0.1)
+    release.set()
+    assert done.wait(5)
+
+
+def test_watchdog_detects_stalled_stage_once():
+    clock = ManualClock()
+    stalls = []
+    watchdog = Watchdog(deadlines={'upload': 10}, grace_seconds=5, stall_seconds=100, clock=clock,
+                        on_stall=stalls.append)
+
+    with watchdog.track('upload'):
+        clock.now = 15
+        assert watchdog.check() == []
+        clock.now = 16
+        assert [stage for _, stage, _ in watchdog.check()] == ['upload']
+        # Aynı takılma için yığın izi ve yeniden kurulum bir kez yapılır
+        watchdog.check()
+        assert stalls == [['upload']]
+        assert watchdog.stalls == 1
+    assert watchdog.check() == []
+
+
+def test_watchdog_uses_stall_seconds_without_deadline():
+    clock = ManualClock()
+    watchdog = Watchdog(deadlines={'upload': 0}, stall_seconds=100, clock=clock)
+
+    with watchdog.track('upload'):
+        clock.now = 100
+        assert watchdog.stalled() == []
+        clock.now = 101
+        assert len(watchdog.stalled()) == 1
+
+
+def test_watchdog_survives_failing_on_stall():
+    clock = ManualClock()
+
+    def on_stall(stages):
+        raise RuntimeError('yeniden kurulamadı')
+
+    watchdog = Watchdog(stall_seconds=1, clock=clock, on_stall=on_stall)
+    with watchdog.track('fetch'):
+        clock.now = 2
+        assert len(watchdog.check()) == 1
+
+
+def test_watchdog_status_liveness_and_readiness():
+    clock = ManualClock()
+    ready = [True]
+    watchdog = Watchdog(stall_seconds=60, liveness_seconds=100, clock=clock, ready_check=lambda: ready[0])
+
+    status = watchdog.status()
+    assert status['alive'] and status['ready']
+
+    ready[0] = False
+    assert watchdog.status()['ready'] is False
+
+    clock.now = 100
+    status = watchdog.status()
+    assert not status['alive'] and not status['ready']
+    watchdog.beat()
+    assert watchdog.status()['alive']
+
+    with watchdog.track('fetch'):
+        clock.now = 161
+        status = watchdog.status()
+        assert not status['alive']
+        assert status['stalled_stages'] == ['fetch']
+        assert status['active_stages'] == [{'stage': 'fetch', 'seconds': 61.0}]
+
+
+def test_watchdog_writes_health_file(tmp_path):
+    path = str(tmp_path / 'health.json')
+    watchdog = Watchdog(health_file=path, clock=ManualClock())
+    watchdog.write_health_file()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f)['alive'] is True
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_watchdog_thread_checks_periodically():
+    clock = ManualClock()
+    stalled = threading.Event()
+    watchdog = Watchdog(stall_seconds=1, interval_seconds=0.01, clock=clock, on_stall=lambda stages: stalled.set())
+
+    watchdog.start()
+    try:
+        with watchdog.track('render'):
+            clock.now = 2
+            assert stalled.wait(5)
+    finally:
+        watchdog.stop()
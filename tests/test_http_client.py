@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+
+import pytest
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from fakes import FakeKandilliServer
+from http_client import CIRCUIT_OPEN, NOT_MODIFIED, OK, UNAVAILABLE, CircuitBreaker, ResilientHttpClient
+
+PAGE = '<pre>deprem listesi</pre>'
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedKandilliServer(FakeKandilliServer):
+    """Her istekte sıradaki (gecikme, hata) adımını uygulayan yerel Kandilli sunucusu; adımlar bitince hızlı ve başarılı."""
+
+    def __init__(self, steps):
+        super().__init__(PAGE)
+        self.steps = list(steps)
+
+    def delay_and_fail(self):
+        with self._lock:
+            self.calls += 1
+            delay, fail = self.steps.pop(0) if self.steps else (0.0, False)
+            if fail:
+                self.failures += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(server):
+        servers.append(server.start())
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def _client(**kwargs):
+    kwargs.setdefault('backoff_base', 0.01)
+    kwargs.setdefault('budget', 5)
+    return ResilientHttpClient(**kwargs)
+
+
+def test_breaker_opens_after_threshold():
+    clock = ManualClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert not breaker.is_open and breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+    assert breaker.retry_after() == 10
+
+
+def test_breaker_half_open_allows_single_probe():
+    clock = ManualClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.allow()
+    # Deneme isteği sürerken başka istek yapılmaz
+    assert not breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_doubles_timeout_up_to_max():
+    clock = ManualClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, max_reset_timeout=30, clock=clock)
+    breaker.record_failure()
+
+    for expected in (20, 30, 30):
+        clock.now += breaker.retry_after()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.retry_after() == expected
+
+    # Başarılı deneme süreyi başa döndürür
+    clock.now += breaker.retry_after()
+    assert breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.retry_after() == 10
+
+
+def test_get_retries_server_errors(serve):
+    server = serve(ScriptedKandilliServer([(0.0, True), (0.0, True)]))
+    client = _client(max_attempts=3)
+
+    result = client.get(server.url)
+    assert result.status == OK
+    assert result.attempts == 3
+    assert result.response.text == PAGE
+    client.close()
+
+
+def test_get_honours_etag(serve):
+    server = serve(ScriptedKandilliServer([]))
+    client = _client()
+
+    first = client.get(server.url)
+    second = client.get(server.url, headers={'If-None-Match': first.response.headers['ETag']})
+    assert second.status == NOT_MODIFIED
+    assert second.available and second.response is None
+    client.close()
+
+
+def test_open_circuit_skips_requests(serve):
+    server = serve(ScriptedKandilliServer([(0.0, True)] * 4))
+    client = _client(max_attempts=2, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    assert client.get(server.url).status == UNAVAILABLE
+    assert client.get(server.url).status == UNAVAILABLE
+    assert server.calls == 4
+
+    result = client.get(server.url)
+    assert result.status == CIRCUIT_OPEN
+    assert not result.available
+    assert result.attempts == 0
+    assert result.retry_after > 0
+    assert server.calls == 4
+    client.close()
+
+
+def test_slow_request_is_hedged(serve):
+    server = serve(ScriptedKandilliServer([(2.0, False)]))
+    client = _client(hedge_after=0.1)
+
+    started = time.monotonic()
+    result = client.get(server.url)
+    assert result.status == OK
+    assert result.attempts == 1
+    # Yedek istek yavaş ilk isteği beklemeden döndü
+    assert time.monotonic() - started < 1.5
+    assert server.calls == 2
+    client.close()
+
+
+def test_get_never_exceeds_budget(serve):
+    server = serve(ScriptedKandilliServer([(2.0, False)] * 4))
+    client = _client(budget=0.3, read_timeout=5, hedge_after=0.1)
+
+    started = time.monotonic()
+    result = client.get(server.url)
+    assert result.status == UNAVAILABLE
+    assert time.monotonic() - started < 1.0
+    client.close()
+
+
+def test_client_error_is_not_retried():
+    class NotFoundSession(requests.Session):
+        calls = 0
+
+        def get(self, url, **kwargs):
+            self.calls += 1
+            response = requests.Response()
+            response.status_code = 404
+            return response
+
+    session = NotFoundSession()
+    client = _client(session=session, max_attempts=3)
+
+    result = client.get('http://kandilli.invalid/')
+    assert result.status == UNAVAILABLE
+    assert result.error.response.status_code == 404
+    assert session.calls == 1
+    client.close()
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from kandilli_parser import extract_pre_block, parse_listing, parse_row
+from kandilli_scraper import KandilliScraper
+
+FIXTURE_DIR = os.path.join(ROOT_DIR, 'fixtures', 'kandilli')
+FIXTURES = sorted(name for name in os.listdir(FIXTURE_DIR) if name.endswith('.html'))
+
+
+def _read(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _legacy_parse(page_html):
+    """Sabit sütunlu parser'dan önceki yol: satırları tek tek KandilliScraper.parse_earthquake_line'a verir."""
+    scraper = KandilliScraper()
+    earthquakes = []
+    for line in extract_pre_block(page_html).strip().split('\n'):
+        earthquake = scraper.parse_earthquake_line(line)
+        if earthquake:
+            earthquakes.append(earthquake)
+    return earthquakes
+
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_parse_listing_matches_legacy_ids_and_magnitudes(name):
+    page_html = _read(name)
+    legacy = _legacy_parse(page_html)
+    parsed = parse_listing(page_html)
+
+    assert parsed
+    assert [eq['kandilli_id'] for eq in parsed] == [eq['kandilli_id'] for eq in legacy]
+    assert [eq['magnitude'] for eq in parsed] == [eq['magnitude'] for eq in legacy]
+
+
+def test_magnitude_prefers_md_over_ml():
+    earthquake = parse_row(
+        '2025.08.20 13:16:22  35.5454   28.3486          5.3      3.9  4.1  -.-   AKDENIZ                                   İlksel'
+    )
+    assert earthquake['magnitude'] == 3.9
+    assert earthquake['ml'] == 4.1
+    assert earthquake['kandilli_id'] == '20250820_131622_35.545_28.349_3.9'
+
+
+def test_magnitude_falls_back_when_md_missing():
+    earthquake = parse_row(
+        '2025.08.20 14:12:03  37.0803   36.6976          7.7      -.-  2.8  -.-   NURDAGI (GAZIANTEP)                       İlksel'
+    )
+    assert earthquake['magnitude'] == 2.8
+    assert earthquake['location'] == 'NURDAGI'
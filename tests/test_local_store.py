@@ -0,0 +1,96 @@
+import os
+import sys
+import shutil
+import threading
+from datetime import datetime
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from database import EarthquakeDatabase, PostedIdCache
+from local_store import LocalEarthquakeStore, BackgroundSyncer
+from fakes import InMemorySupabase, build_offline_runtime, offline_config
+
+
+def _earthquake(kandilli_id='20250820_131622_37.288_37.043_4.2', magnitude=4.2):
+    return {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': datetime(2025, 8, 20, 13, 16, 22),
+        'latitude': 37.288,
+        'longitude': 37.043,
+        'magnitude': magnitude,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+    }
+
+
+@pytest.fixture
+def work_dir(tmp_path):
+    return str(tmp_path)
+
+
+def test_close_flushes_pending_rows_and_checkpoints(work_dir):
+    config = offline_config(LOCAL_DB_PATH=os.path.join(work_dir, 'local.db'))
+    supabase = InMemorySupabase()
+    store = LocalEarthquakeStore(config.LOCAL_DB_PATH)
+    runtime = build_offline_runtime(config, 'http://127.0.0.1:9/', supabase=supabase, local_store=store)
+    db = runtime.db
+    first_sync = threading.Event()
+    sync_pending = db.sync_pending
+
+    def tracked_sync(*args):
+        try:
+            return sync_pending(*args)
+        finally:
+            first_sync.set()
+
+    db.sync_pending = tracked_sync
+    # Açılıştaki ilk turdan sonra bir saat tur atmayan senkronizasyon: kayıt ancak kapanışta gönderilir
+    runtime._syncer = BackgroundSyncer(db, interval_seconds=3600).start()
+    assert first_sync.wait(5)
+
+    assert db.save_earthquake(_earthquake())
+    assert store.count_pending() == 1
+
+    runtime.close()
+    shutil.rmtree(config.WORK_DIR, ignore_errors=True)
+    assert set(supabase.table('earthquakes').rows) == {_earthquake()['kandilli_id']}
+    assert not os.path.exists(config.LOCAL_DB_PATH + '-wal') or os.path.getsize(config.LOCAL_DB_PATH + '-wal') == 0
+
+    reopened = LocalEarthquakeStore(config.LOCAL_DB_PATH)
+    assert reopened.count_pending() == 0
+    reopened.close()
+
+
+def test_sync_does_not_unmark_remote_posted_row():
+    supabase = InMemorySupabase()
+    db = EarthquakeDatabase(
+        url=None, key=None, posted_cache=PostedIdCache(), local_store=LocalEarthquakeStore(':memory:'), client=supabase
+    )
+    earthquake = _earthquake()
+    # Başka bir örnek depremi paylaştı ve kaydetti
+    remote = EarthquakeDatabase._to_record(earthquake, posted_to_instagram=True)
+    supabase.table('earthquakes').upsert(remote).execute()
+    # Bu örneğin yerel kopyası eski: "paylaşılmadı"
+    db.local_store.upsert(EarthquakeDatabase._to_record(earthquake, posted_to_instagram=False))
+
+    assert db.sync_pending() == 1
+    row = supabase.table('earthquakes').rows[earthquake['kandilli_id']]
+    assert row['posted_to_instagram'] is True
+    assert row['posted_at'] == remote['posted_at']
+
+
+def test_sync_sends_local_changes_for_unposted_rows():
+    supabase = InMemorySupabase()
+    db = EarthquakeDatabase(
+        url=None, key=None, posted_cache=PostedIdCache(), local_store=LocalEarthquakeStore(':memory:'), client=supabase
+    )
+    earthquake = _earthquake()
+    supabase.table('earthquakes').upsert(EarthquakeDatabase._to_record(earthquake, posted_to_instagram=False)).execute()
+    assert db.save_earthquake(earthquake)
+
+    db.sync_pending()
+    assert supabase.table('earthquakes').rows[earthquake['kandilli_id']]['posted_to_instagram'] is True
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+from datetime import datetime
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import outbox
+from outbox import COMMITTED, PENDING, RELEASED, UPLOADED, PostingOutbox
+
+
+def _earthquake(kandilli_id):
+    return {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': datetime(2025, 8, 20, 13, 16, 22),
+        'latitude': 37.288,
+        'longitude': 37.043,
+        'magnitude': 4.2,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+        'merged_events': [{'kandilli_id': 'merged'}],
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'outbox.jsonl')
+
+
+def _lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_restores_open_entries(path):
+    box = PostingOutbox(path)
+    box.mark_pending([_earthquake(k) for k in ('pending', 'uploaded', 'committed', 'released')])
+    box.mark_uploaded(['uploaded', 'committed'], 17)
+    box.mark_committed(['committed'])
+    box.release(['released'])
+    box.close()
+
+    replayed = PostingOutbox(path)
+    entries = replayed.open_entries()
+    assert set(entries) == {'pending', 'uploaded'}
+    assert replayed.state('pending') == PENDING
+    assert replayed.state('uploaded') == UPLOADED
+    assert replayed.state('committed') is None
+    assert replayed.state('released') is None
+    assert entries['uploaded']['media_id'] == '17'
+    assert entries['pending']['earthquake']['earthquake_time'] == datetime(2025, 8, 20, 13, 16, 22)
+    # Albüme eklenen depremler günlüğe yazılmaz
+    assert 'merged_events' not in entries['pending']['earthquake']
+    replayed.close()
+
+
+def test_closing_records_are_buffered_until_next_durable_write(path):
+    box = PostingOutbox(path)
+    box.mark_pending([_earthquake('a')])
+    box.release(['a'])
+    assert [record['state'] for record in _lines(path)] == [PENDING]
+
+    box.mark_pending([_earthquake('b')])
+    assert [record['state'] for record in _lines(path)] == [PENDING, RELEASED, PENDING]
+    box.close()
+
+
+def test_lost_closing_record_only_reopens_entry(path):
+    box = PostingOutbox(path)
+    box.mark_pending([_earthquake('a')])
+    box.mark_uploaded(['a'], 'media')
+    box.mark_committed(['a'])
+    # Çökme: tampondaki "committed" satırı diske yazılmadı
+    box._buffer.clear()
+    box._file.close()
+
+    replayed = PostingOutbox(path)
+    assert replayed.open_entries(UPLOADED)['a']['media_id'] == 'media'
+    replayed.close()
+
+
+def test_compaction_keeps_only_open_entries(path, monkeypatch):
+    monkeypatch.setattr(outbox, 'COMPACT_AFTER_LINES', 10)
+    box = PostingOutbox(path)
+    for i in range(4):
+        box.mark_pending([_earthquake(f'closed{i}')])
+        box.mark_committed([f'closed{i}'])
+    box.mark_pending([_earthquake('open')])
+    box.mark_uploaded(['open'], 'media')
+    box.flush()
+
+    # 4 * 2 + 2 = 10 satır: dosya yeniden yazıldı
+    assert [(record['id'], record['state']) for record in _lines(path)] == [('open', UPLOADED)]
+    assert _lines(path)[0]['earthquake']['kandilli_id'] == 'open'
+    assert not os.path.exists(path + '.tmp')
+
+    box.mark_committed(['open'])
+    box.compact()
+    assert _lines(path) == []
+    box.close()
+
+    assert PostingOutbox(path).open_entries() == {}
+
+
+def test_torn_final_line_is_ignored_and_truncated(path):
+    box = PostingOutbox(path)
+    box.mark_pending([_earthquake('a')])
+    box.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "b", "state": "pen')
+
+    replayed = PostingOutbox(path)
+    assert set(replayed.open_entries()) == {'a'}
+    replayed.mark_pending([_earthquake('c')])
+    replayed.close()
+
+    # Yarım satırdan sonra yazılan kayıt okunabilir kalır
+    assert set(PostingOutbox(path).open_entries()) == {'a', 'c'}
+    assert [record['id'] for record in _lines(path)] == ['a', 'c']
+
+
+def test_committed_without_pending_is_noop(path):
+    box = PostingOutbox(path)
+    box.mark_committed(['unknown'])
+    box.close()
+    assert PostingOutbox(path).open_entries() == {}
+    assert [record['state'] for record in _lines(path)] == [COMMITTED]
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import shutil
+from datetime import datetime
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from database import EarthquakeDatabase, PostedIdCache
+from local_store import LocalEarthquakeStore
+from fakes import InMemorySupabase, build_offline_runtime, offline_config
+
+
+def _earthquake(kandilli_id):
+    return {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': datetime(2025, 8, 20, 13, 16, 22),
+        'latitude': 37.288,
+        'longitude': 37.043,
+        'magnitude': 4.2,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+    }
+
+
+def _saved_ids(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(json.load(f))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'posted_ids.json')
+
+
+@pytest.mark.parametrize('local', [True, False])
+def test_database_writes_do_not_rewrite_cache_file(path, local):
+    cache = PostedIdCache(path=path)
+    db = EarthquakeDatabase(
+        url=None, key=None, posted_cache=cache, client=InMemorySupabase(),
+        local_store=LocalEarthquakeStore(':memory:') if local else None,
+    )
+    for i in range(3):
+        assert db.save_earthquake(_earthquake(f'eq{i}'))
+    assert db.update_earthquake_revision('eq0', _earthquake('eq0-revised'))
+    assert db.filter_unposted(['eq1', 'eq9']) == {'eq9'}
+
+    assert not os.path.exists(path)
+    cache.save()
+    assert _saved_ids(path) == {'eq0', 'eq1', 'eq2', 'eq0-revised'}
+
+
+def test_save_skips_unchanged_cache(path):
+    cache = PostedIdCache(path=path)
+    cache.add('eq0')
+    cache.save()
+    os.remove(path)
+
+    cache.save()
+    assert not os.path.exists(path)
+    cache.add('eq1')
+    cache.save()
+    assert _saved_ids(path) == {'eq0', 'eq1'}
+    assert 'eq1' in PostedIdCache(path=path)
+
+
+def test_runtime_saves_cache_once_per_cycle_and_on_close(tmp_path):
+    config = offline_config(POSTED_CACHE_PATH=str(tmp_path / 'posted_ids.json'), GAZETTEER_ENABLED=False)
+    runtime = build_offline_runtime(config, 'http://127.0.0.1:9/', supabase=InMemorySupabase())
+    saves = []
+    save = runtime.posted_cache.save
+    runtime.posted_cache.save = lambda: saves.append(1) or save()
+    try:
+        runtime.posted_cache.add('eq0')
+        runtime.collect_new_earthquakes()
+        assert len(saves) == 1
+        assert _saved_ids(config.POSTED_CACHE_PATH) == {'eq0'}
+
+        runtime.posted_cache.add('eq1')
+        runtime.close()
+        assert len(saves) == 2
+        assert _saved_ids(config.POSTED_CACHE_PATH) == {'eq0', 'eq1'}
+    finally:
+        shutil.rmtree(config.WORK_DIR, ignore_errors=True)
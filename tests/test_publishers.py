@@ -0,0 +1,164 @@
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from fakes import FakeSinkServer
+from instagram_poster import InstagramPoster
+from publishers import (
+    ImageLease, Publication, Publisher, PublishError, SinkWorker, TelegramPublisher, WebhookPublisher,
+)
+
+
+class FlakySinkServer(FakeSinkServer):
+    """İlk `failures` isteğe 503 dönen, sonrakileri kabul eden yerel kanal sunucusu."""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.remaining_failures = failures
+
+    def delay_and_fail(self):
+        with self._lock:
+            self.calls += 1
+            if self.remaining_failures:
+                self.remaining_failures -= 1
+                self.failures += 1
+                return True
+        return False
+
+
+def _publication(tmp_path, kandilli_id='20250820_131622_37.288_37.043_4.2', feed_count=1):
+    paths = []
+    for i in range(feed_count):
+        path = tmp_path / f'{kandilli_id}_{i}.jpg'
+        path.write_bytes(b'jpeg')
+        paths.append(str(path))
+    earthquake = {
+        'kandilli_id': kandilli_id,
+        'earthquake_time': datetime(2025, 8, 20, 13, 16, 22),
+        'latitude': 37.288,
+        'longitude': 37.043,
+        'magnitude': 4.2,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+    }
+    return Publication(earthquake, 'DEPREM BİLDİRİMİ', {'feed': paths})
+
+
+@pytest.fixture
+def server_factory():
+    servers = []
+
+    def make(server):
+        servers.append(server.start())
+        return server
+
+    yield make
+    for server in servers:
+        server.stop()
+
+
+def _worker(publisher, **kwargs):
+    kwargs.setdefault('posts_per_hour', 10 ** 9)
+    kwargs.setdefault('retry_base', 0.01)
+    return SinkWorker(publisher, **kwargs)
+
+
+def test_instagram_is_a_publisher():
+    assert issubclass(InstagramPoster, Publisher)
+
+
+def test_webhook_delivers_once(server_factory, tmp_path):
+    server = server_factory(FakeSinkServer())
+    publisher = WebhookPublisher(server.webhook_url)
+    assert publisher.publish(_publication(tmp_path)) == '1'
+    path, size, _ = server.received[0]
+    assert path == '/hooks/deprem'
+    assert size > 0
+    publisher.close()
+
+
+def test_telegram_album_uses_media_group(server_factory, tmp_path):
+    server = server_factory(FakeSinkServer())
+    publisher = TelegramPublisher('TOKEN', '1', server.base_url)
+    assert publisher.publish(_publication(tmp_path, feed_count=3)) == '1'
+    assert server.received[0][0] == '/botTOKEN/sendMediaGroup'
+    publisher.close()
+
+
+def test_webhook_server_error_is_retryable(server_factory, tmp_path):
+    server = server_factory(FlakySinkServer(failures=1))
+    publisher = WebhookPublisher(server.webhook_url)
+    with pytest.raises(PublishError) as error:
+        publisher.publish(_publication(tmp_path))
+    assert error.value.retryable
+    publisher.close()
+
+
+@pytest.mark.parametrize('kind', ['webhook', 'telegram'])
+def test_sink_retries_until_delivered(server_factory, tmp_path, kind):
+    server = server_factory(FlakySinkServer(failures=2))
+    if kind == 'webhook':
+        publisher = WebhookPublisher(server.webhook_url)
+    else:
+        publisher = TelegramPublisher('TOKEN', '1', server.base_url)
+    worker = _worker(publisher, max_attempts=5)
+    done = threading.Event()
+
+    assert worker.submit(_publication(tmp_path), done.set)
+    assert worker.drain(timeout=10)
+    assert done.is_set()
+    assert server.failures == 2
+    assert len(server.received) == 1
+    worker.close()
+
+
+def test_sink_gives_up_after_max_attempts(server_factory, tmp_path):
+    server = server_factory(FlakySinkServer(failures=10))
+    worker = _worker(WebhookPublisher(server.webhook_url), max_attempts=3)
+    done = threading.Event()
+
+    assert worker.submit(_publication(tmp_path), done.set)
+    assert worker.drain(timeout=10)
+    assert done.is_set()
+    assert server.calls == 3
+    assert server.received == []
+    worker.close()
+
+
+def test_sink_suppresses_duplicate_events(server_factory, tmp_path):
+    server = server_factory(FakeSinkServer())
+    worker = _worker(WebhookPublisher(server.webhook_url))
+    publication = _publication(tmp_path)
+
+    assert worker.submit(publication)
+    # Instagram'a yüklenemeyip tekrar paylaşılan deprem kanala ikinci kez gitmez
+    assert not worker.submit(publication)
+    assert worker.drain(timeout=10)
+    assert len(server.received) == 1
+    worker.close()
+
+
+def test_lease_discards_images_after_all_sinks(server_factory, tmp_path):
+    servers = [server_factory(FakeSinkServer()) for _ in range(2)]
+    workers = [_worker(WebhookPublisher(server.webhook_url)) for server in servers]
+    publication = _publication(tmp_path)
+    discarded = threading.Event()
+    lease = ImageLease(publication.images, len(workers) + 1, lambda images: discarded.set())
+
+    for worker in workers:
+        assert worker.submit(publication, lease.release)
+    for worker in workers:
+        assert worker.drain(timeout=10)
+    assert not discarded.is_set()
+    lease.release()
+    assert discarded.is_set()
+    assert [len(server.received) for server in servers] == [1, 1]
+    for worker in workers:
+        worker.close()
@@ -0,0 +1,68 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from posting_scheduler import PostingScheduler
+from swarm import ALBUM_MAX_ITEMS, SWARM_MAX_EVENTS_LIMIT, SwarmAggregator
+from config import Config
+
+BASE_TIME = datetime(2023, 2, 6, 4, 17, 0)
+
+
+def _shock(i, magnitude=4.0):
+    return {
+        'kandilli_id': f'shock{i}',
+        'earthquake_time': BASE_TIME + timedelta(minutes=i),
+        'latitude': 37.288 + i * 0.01,
+        'longitude': 37.043,
+        'magnitude': magnitude,
+        'depth': 7.0,
+        'location': 'PAZARCIK',
+    }
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_config_fits_album():
+    assert Config.SWARM_MAX_EVENTS <= ALBUM_MAX_ITEMS - 1
+
+
+def test_max_events_is_capped_to_album_size():
+    aggregator = SwarmAggregator(max_events=12)
+    assert aggregator.max_events == SWARM_MAX_EVENTS_LIMIT == ALBUM_MAX_ITEMS - 1
+
+
+def test_group_leaves_overflow_queued():
+    clock = ManualClock()
+    scheduler = PostingScheduler(max_backlog=100, clock=clock)
+    for i in range(15):
+        scheduler.push(_shock(i, magnitude=4.0 + i / 100))
+    aggregator = SwarmAggregator(max_events=12, clock=clock)
+
+    album = aggregator.group(scheduler.pop(), scheduler)
+    assert 1 + len(album['swarm_events']) == SWARM_MAX_EVENTS_LIMIT
+    # Albüme girmeyen depremler bir sonraki paylaşım için kuyrukta kalır
+    assert len(scheduler) == 15 - SWARM_MAX_EVENTS_LIMIT
+
+
+def test_every_album_event_gets_an_image():
+    from image_renderer import EarthquakeImageRenderer
+    from bot_runtime import discard_images
+
+    shocks = [_shock(i, magnitude=4.0 + i / 10) for i in range(SWARM_MAX_EVENTS_LIMIT)]
+    earthquake = dict(shocks[-1], swarm_events=shocks[:-1])
+    images = EarthquakeImageRenderer().render_post_files(earthquake, ('feed',))
+    try:
+        # Özet tablo + her deprem için bir görsel
+        assert len(images['feed']) == len(shocks) + 1 <= ALBUM_MAX_ITEMS
+    finally:
+        discard_images(images)